@@ -2,26 +2,31 @@
 import json
 import os
 import os.path
-from typing import Any, Dict, List
-
-import requests
-import urllib3
-from chaoslib.discovery.discover import (
-    discover_actions,
-    discover_probes,
-    initialize_discovery_result,
-)
+import threading
+from typing import Any, Dict, List, Tuple
+
 from chaoslib.exceptions import FailedActivity
 from chaoslib.types import Configuration, DiscoveredActivities, Discovery, Secrets
 from logzero import logger
-from oauthlib.oauth2 import LegacyApplicationClient
-from oauthlib.oauth2.rfc6749.errors import OAuth2Error
-from requests_oauthlib import OAuth2Session
 
-urllib3.disable_warnings()
+from chaoscf.cache import TTLCache
+from chaoscf.retry import TransientError, get_retry_policy, raise_for_transient, send
+from chaoscf.session import get_session
 
 __version__ = "0.7.3"
-__all__ = ["__version__", "auth", "discover"]
+__all__ = ["__version__", "auth", "clear_tokens", "discover", "get_api_info"]
+
+# seconds before the advertised expiry at which a cached token is considered
+# stale, so that it never expires while a request is in flight
+TOKEN_EXPIRY_LEEWAY = 30
+
+# seconds the API information document is cached for by default
+DEFAULT_API_INFO_TTL = 300
+
+_api_info = TTLCache(maxsize=16)
+_tokens = TTLCache(maxsize=64)
+_tokens_locks = {}
+_tokens_locks_guard = threading.Lock()
 
 
 def auth(configuration: Configuration, secrets: Secrets) -> Dict[str, str]:
@@ -43,6 +48,11 @@ def auth(configuration: Configuration, secrets: Secrets) -> Dict[str, str]:
 
     Returns a mapping with the `access_token` and `refresh_token` keys as per
     http://docs.cloudfoundry.org/api/uaa/version/4.8.0/index.html#password-grant
+
+    Tokens are cached process-wide per API URL, username and client id, and
+    reused until `TOKEN_EXPIRY_LEEWAY` seconds before they expire. Set
+    `"cf_cache_tokens"` to `False` in the `configuration` to always query a
+    new token.
     """
 
     api_url = configuration.get("cf_api_url")
@@ -53,8 +63,57 @@ def auth(configuration: Configuration, secrets: Secrets) -> Dict[str, str]:
     client_id = secrets.get("cf_client_id", "cf")
     client_secret = secrets.get("cf_client_secret", "")
 
-    logger.debug("Querying a new access token for client '{c}'".format(c=client_id))
-    return get_tokens(api_url, username, password, client_id, client_secret, verify_ssl)
+    if not configuration.get("cf_cache_tokens", True):
+        logger.debug("Querying a new access token for client '{c}'".format(c=client_id))
+        return get_tokens(
+            api_url,
+            username,
+            password,
+            client_id,
+            client_secret,
+            verify_ssl,
+            configuration=configuration,
+        )
+
+    key = _tokens_key(configuration, secrets)
+    with _get_tokens_lock(key):
+        tokens = _tokens.get(key)
+        if tokens is not None:
+            logger.debug(
+                "Reusing cached access token for client '{c}'".format(c=client_id)
+            )
+            return tokens
+
+        logger.debug("Querying a new access token for client '{c}'".format(c=client_id))
+        tokens = get_tokens(
+            api_url,
+            username,
+            password,
+            client_id,
+            client_secret,
+            verify_ssl,
+            configuration=configuration,
+        )
+
+        ttl = _tokens_ttl(tokens)
+        if ttl > 0:
+            _tokens.set(key, tokens, ttl=ttl)
+
+    return tokens
+
+
+def clear_tokens(configuration: Configuration = None, secrets: Secrets = None):
+    """
+    Drop cached access tokens.
+
+    When both `configuration` and `secrets` are given, only the token for
+    that API URL and user is forgotten, otherwise the whole cache is cleared.
+    """
+    if configuration is None or secrets is None:
+        _tokens.clear()
+        return
+
+    _tokens.pop(_tokens_key(configuration, secrets))
 
 
 def get_tokens(
@@ -64,50 +123,124 @@ def get_tokens(
     client_id: str = "cf",
     client_secret: str = "",
     verify_ssl: bool = True,
+    configuration: Configuration = None,
 ) -> Dict[str, str]:
     """
     Private function that authorizes against the UAA OAuth2 endpoint.
+
+    The `configuration` is used to pick the pooled HTTP session to send the
+    requests with. When not provided, the session for `api_url` is used.
+
+    Transient failures of UAA are retried as per the retry policy of the
+    `configuration`, see `chaoscf.retry.get_retry_policy`.
     """
-    info_url = "{u}/v2/info".format(u=api_url)
-    r = requests.get(info_url, verify=verify_ssl)
-    if r.status_code != 200:
-        logger.debug(
-            "failed to fetch Cloud Foundry API info from "
-            "'{u}': {c} => {s}".format(u=info_url, c=r.status_code, s=r.text)
-        )
-        raise FailedActivity(
-            "failed to retrieve Cloud Foundry information, " "cannot proceed further"
-        )
+    # deferred so that importing the extension stays cheap, see `chaoscf`
+    import requests
+    from oauthlib.oauth2 import LegacyApplicationClient
+    from oauthlib.oauth2.rfc6749.errors import OAuth2Error
+    from requests_oauthlib import OAuth2Session
 
-    info = r.json()
+    if configuration is None:
+        configuration = {"cf_api_url": api_url, "cf_verify_ssl": verify_ssl}
+    session = get_session(configuration)
+
+    info = get_api_info(configuration)
     authorization_endpoint = info["authorization_endpoint"]
     auth_url = "{u}/oauth/token".format(u=authorization_endpoint)
     client = LegacyApplicationClient(username, password=password)
     s = OAuth2Session(client=client)
-    try:
-        r = s.fetch_token(
-            auth_url,
-            verify=verify_ssl,
-            username=username,
-            password=password,
-            auth=(client_id, client_secret),
-        )
-    except OAuth2Error as x:
+    for prefix, adapter in session.adapters.items():
+        s.mount(prefix, adapter)
+    s.register_compliance_hook("access_token_response", raise_for_transient)
+
+    policy = get_retry_policy(configuration)
+    attempt = 0
+    while True:
+        try:
+            return s.fetch_token(
+                auth_url,
+                verify=verify_ssl,
+                username=username,
+                password=password,
+                auth=(client_id, client_secret),
+            )
+        except (requests.ConnectionError, requests.Timeout, TransientError) as x:
+            status_code = headers = None
+            if isinstance(x, TransientError):
+                status_code = x.response.status_code
+                headers = x.response.headers
+            # the password grant may safely be requested again
+            if policy.can_retry("POST", attempt, status_code, headers, idempotent=True):
+                policy.wait(attempt, "POST", auth_url, str(x), headers)
+                attempt += 1
+                continue
+            error = x
+        except OAuth2Error as x:
+            error = x
+
         logger.debug(
             "failed to auth with the Cloud Foundry API at " "{u}".format(u=auth_url),
-            exc_info=x,
+            exc_info=error,
         )
         raise FailedActivity(
             "failed to auth against Cloud Foundry, " "cannot proceed further"
         )
 
-    return r
+
+def get_api_info(configuration: Configuration) -> Dict[str, Any]:
+    """
+    Fetch the information document of the Cloud Foundry API, as returned by
+    its `/v2/info` endpoint, such as the `authorization_endpoint`, the
+    `api_version` or the `doppler_logging_endpoint`.
+
+    The document is cached per `"cf_api_url"` for `"cf_api_info_ttl"` seconds,
+    `DEFAULT_API_INFO_TTL` by default. A TTL of `0` disables the cache.
+
+    When the `configuration` has a `"cf_api_info"` mapping, it is returned
+    as-is and the API isn't queried at all. It must contain at least the
+    `"authorization_endpoint"` key.
+    """
+    seeded = configuration.get("cf_api_info")
+    if seeded:
+        return seeded
+
+    api_url = configuration.get("cf_api_url")
+    ttl = float(configuration.get("cf_api_info_ttl", DEFAULT_API_INFO_TTL))
+    if ttl > 0:
+        info = _api_info.get(api_url)
+        if info is not None:
+            return info
+
+    info_url = "{u}/v2/info".format(u=api_url)
+    r = send(
+        get_session(configuration),
+        "GET",
+        info_url,
+        configuration,
+        verify=configuration.get("cf_verify_ssl", True),
+    )
+    if r.status_code != 200:
+        logger.debug(
+            "failed to fetch Cloud Foundry API info from "
+            "'{u}': {c} => {s}".format(u=info_url, c=r.status_code, s=r.text)
+        )
+        raise FailedActivity(
+            "failed to retrieve Cloud Foundry information, " "cannot proceed further"
+        )
+
+    info = r.json()
+    if ttl > 0:
+        _api_info.set(api_url, info, ttl=ttl)
+
+    return info
 
 
 def discover(discover_system: bool = True) -> Discovery:
     """
     Discover Cloud Foundry capabilities offered by this extension.
     """
+    from chaoslib.discovery.discover import initialize_discovery_result
+
     logger.info("Discovering capabilities from chaostoolkit-cloud-foundry")
 
     discovery = initialize_discovery_result(
@@ -120,11 +253,44 @@ def discover(discover_system: bool = True) -> Discovery:
 ###############################################################################
 # Private functions
 ###############################################################################
+def _tokens_key(configuration: Configuration, secrets: Secrets) -> Tuple[str, ...]:
+    return (
+        configuration.get("cf_api_url"),
+        secrets.get("cf_username"),
+        secrets.get("cf_client_id", "cf"),
+    )
+
+
+def _get_tokens_lock(key: Tuple[str, ...]) -> threading.Lock:
+    """
+    Lock serializing token queries for a given key, so that concurrent
+    activities wait for a single password grant rather than each doing one.
+    """
+    with _tokens_locks_guard:
+        return _tokens_locks.setdefault(key, threading.Lock())
+
+
+def _tokens_ttl(tokens: Dict[str, Any]) -> float:
+    try:
+        expires_in = float(tokens.get("expires_in", 0))
+    except (TypeError, ValueError):
+        return 0
+    return expires_in - TOKEN_EXPIRY_LEEWAY
+
+
 def load_exported_activities() -> List[DiscoveredActivities]:
     """
     Extract metadata from actions and probes exposed by this extension.
+
+    They are read from the manifest generated at build time, see
+    `chaoscf.manifest`, unless it is missing or was generated for another
+    version, in which case the activity modules are imported and
+    introspected.
     """
-    activities = []
-    activities.extend(discover_actions("chaoscf.actions"))
-    activities.extend(discover_probes("chaoscf.probes"))
+    from chaoscf.manifest import build_manifest, load_manifest
+
+    activities = load_manifest(__version__)
+    if activities is None:
+        logger.debug("Introspecting the activities of chaostoolkit-cloud-foundry")
+        activities = build_manifest()
     return activities
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
+import math
 import random
+from functools import partial
 from typing import Any, Dict, List
 
+from chaoslib.exceptions import FailedActivity
 from chaoslib.types import Configuration, Secrets
 from logzero import logger
 
+from chaoscf import v3
 from chaoscf.api import (
     call_api,
     get_app_by_name,
@@ -13,7 +17,9 @@ from chaoscf.api import (
     get_apps_for_org,
     get_bind_by_name,
     get_routes_by_host,
+    iter_resources,
 )
+from chaoscf.concurrency import DEFAULT_MAX_WORKERS, run_concurrently
 
 __all__ = [
     "delete_app",
@@ -24,6 +30,7 @@ __all__ = [
     "stop_all_apps",
     "stop_app",
     "terminate_app_instance",
+    "terminate_random_instances",
     "terminate_some_random_instance",
     "unbind_service_from_app",
     "unmap_route_from_app",
@@ -42,11 +49,13 @@ def delete_app(
 
     See https://apidocs.cloudfoundry.org/280/apps/delete_a_particular_app.html
     """
-    app = get_app_by_name(
-        app_name, configuration, secrets, org_name=org_name, space_name=space_name
-    )
+    app_guid = _get_app_guid(app_name, configuration, secrets, org_name, space_name)
+
+    if v3.is_enabled(configuration):
+        v3.delete_app(app_guid, configuration, secrets)
+        return
 
-    path = "/v2/apps/{a}".format(a=app["metadata"]["guid"])
+    path = "/v2/apps/{a}".format(a=app_guid)
     call_api(path, configuration, secrets, method="DELETE")
 
 
@@ -62,12 +71,8 @@ def start_app(
 
     See https://apidocs.cloudfoundry.org/280/apps/updating_an_app.html
     """
-    app = get_app_by_name(
-        app_name, configuration, secrets, org_name=org_name, space_name=space_name
-    )
-
-    path = "/v2/apps/{a}".format(a=app["metadata"]["guid"])
-    call_api(path, configuration, secrets, method="PUT", body={"state": "STARTED"})
+    app_guid = _get_app_guid(app_name, configuration, secrets, org_name, space_name)
+    _update_app_state("STARTED", configuration, secrets, app_guid)
 
 
 def stop_app(
@@ -82,35 +87,54 @@ def stop_app(
 
     See https://apidocs.cloudfoundry.org/280/apps/updating_an_app.html
     """
-    app = get_app_by_name(
-        app_name, configuration, secrets, org_name=org_name, space_name=space_name
-    )
-
-    path = "/v2/apps/{a}".format(a=app["metadata"]["guid"])
-    call_api(path, configuration, secrets, method="PUT", body={"state": "STOPPED"})
+    app_guid = _get_app_guid(app_name, configuration, secrets, org_name, space_name)
+    _update_app_state("STOPPED", configuration, secrets, app_guid)
 
 
-def start_all_apps(org_name: str, configuration: Configuration, secrets: Secrets):
+def start_all_apps(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
     """
     Start all applications for the specified org name
 
+    Applications are started concurrently, by at most `max_workers` at once,
+    or through the asynchronous client when `"cf_async_fan_out"` is set in
+    the `configuration`, see `chaoscf.aio`.
+    A failure to start one of them does not prevent the others from being
+    started, but the activity fails once they have all been tried, listing
+    those which could not be started. Otherwise, returns for each application
+    its `name`, `guid`, `status`, `error` and `duration` in seconds.
+
     See https://apidocs.cloudfoundry.org/280/apps/updating_an_app.html
     """
-    apps = get_apps_for_org(org_name, configuration, secrets)
-    for app in apps["resources"]:
-        start_app(app["entity"]["name"], configuration, secrets, org_name=org_name)
+    apps = _get_apps_for_org(org_name, configuration, secrets)
+    return _update_apps_state(apps, "STARTED", configuration, secrets, max_workers)
 
 
-def stop_all_apps(org_name: str, configuration: Configuration, secrets: Secrets):
+def stop_all_apps(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
     """
     Stop all application for the specified org name
 
+    Applications are stopped concurrently, by at most `max_workers` at once,
+    or through the asynchronous client when `"cf_async_fan_out"` is set in
+    the `configuration`, see `chaoscf.aio`.
+    A failure to stop one of them does not prevent the others from being
+    stopped, but the activity fails once they have all been tried, listing
+    those which could not be stopped. Otherwise, returns for each application
+    its `name`, `guid`, `status`, `error` and `duration` in seconds.
+
     See https://apidocs.cloudfoundry.org/280/apps/updating_an_app.html
     """
-    apps = get_apps_for_org(org_name, configuration, secrets)
-
-    for app in apps["resources"]:
-        stop_app(app["entity"]["name"], configuration, secrets, org_name=org_name)
+    apps = _get_apps_for_org(org_name, configuration, secrets)
+    return _update_apps_state(apps, "STOPPED", configuration, secrets, max_workers)
 
 
 def remove_routes_from_app(
@@ -173,9 +197,9 @@ def unmap_route_from_app(
     )
 
     routes_path = app["entity"]["routes_url"]
-    routes = call_api(routes_path, configuration, secrets).json()
+    routes = list(iter_resources(routes_path, configuration, secrets))
 
-    for route in routes["resources"]:
+    for route in routes:
         if route["entity"]["host"] == host_name:
             call_api(
                 "{a}/{r}".format(a=routes_path, r=route["metadata"]["guid"]),
@@ -243,9 +267,11 @@ def terminate_app_instance(
     See
     https://apidocs.cloudfoundry.org/280/apps/terminate_the_running_app_instance_at_the_given_index.html
     """  # noqa: E501
-    app = get_app_by_name(
-        app_name, configuration, secrets, org_name=org_name, space_name=space_name
-    )
+    app_guid = _get_app_guid(app_name, configuration, secrets, org_name, space_name)
+
+    if v3.is_enabled(configuration):
+        v3.terminate_app_instance(app_guid, instance_index, configuration, secrets)
+        return
 
     logger.debug(
         "Terminating instance {i} of application {a}".format(
@@ -253,9 +279,7 @@ def terminate_app_instance(
         )
     )
 
-    path = "/v2/apps/{a}/instances/{i}".format(
-        a=app["metadata"]["guid"], i=instance_index
-    )
+    path = "/v2/apps/{a}/instances/{i}".format(a=app_guid, i=instance_index)
     call_api(path, configuration, secrets, method="DELETE")
 
 
@@ -283,6 +307,76 @@ def terminate_some_random_instance(
     )
 
 
+def terminate_random_instances(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    count: int = None,
+    percentage: float = None,
+    org_name: str = None,
+    space_name: str = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
+    """
+    Terminate `count` instances, or `percentage` percent of the instances
+    (rounded up), of the application, picked at random.
+
+    The application is resolved once and its instances listed once, then
+    the picked instances are terminated concurrently, by at most
+    `max_workers` at once. A failure to terminate one of them does not
+    prevent the others from being terminated. Returns, for each instance,
+    its `index`, `status` (`"succeeded"` or `"failed"`), `error` and
+    `duration` in seconds.
+
+    See
+    https://apidocs.cloudfoundry.org/280/apps/terminate_the_running_app_instance_at_the_given_index.html
+    """  # noqa: E501
+    if (count is None) == (percentage is None):
+        raise FailedActivity("please set either the count or the percentage")
+    if count is not None and int(count) < 1:
+        raise FailedActivity("the count must be 1 at least")
+    if percentage is not None and not 0 < float(percentage) <= 100:
+        raise FailedActivity("the percentage must be greater than 0, up to 100")
+
+    app_guid = _get_app_guid(app_name, configuration, secrets, org_name, space_name)
+    indexes = _get_instance_indexes(app_guid, configuration, secrets)
+    if not indexes:
+        raise FailedActivity("app '{a}' has no instances".format(a=app_name))
+
+    if percentage is not None:
+        count = math.ceil(len(indexes) * float(percentage) / 100)
+    picked = sorted(random.sample(indexes, min(int(count), len(indexes))))
+
+    logger.debug(
+        "Terminating instances {i} of application {a}".format(i=picked, a=app_name)
+    )
+    outcomes = run_concurrently(
+        partial(_terminate_instance, configuration, secrets, app_guid),
+        picked,
+        max_workers,
+    )
+
+    results = []
+    for index, outcome in zip(picked, outcomes):
+        results.append(
+            {
+                "index": index,
+                "status": outcome["status"],
+                "error": outcome["error"],
+                "duration": outcome["duration"],
+            }
+        )
+
+        if outcome["status"] == "failed":
+            logger.error(
+                "Failed to terminate instance {i} of application '{a}': {e}".format(
+                    i=index, a=app_name, e=outcome["error"]
+                )
+            )
+
+    return results
+
+
 def unbind_service_from_app(
     app_name: str,
     bind_name: str,
@@ -312,3 +406,163 @@ def unbind_service_from_app(
 
     path = "/v2/service_bindings/{s}".format(s=service_bind["metadata"]["guid"])
     call_api(path, configuration, secrets, method="DELETE")
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _get_app_guid(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+) -> str:
+    if v3.is_enabled(configuration):
+        app = v3.get_app_by_name(
+            app_name, configuration, secrets, org_name=org_name, space_name=space_name
+        )
+        return app["guid"]
+
+    app = get_app_by_name(
+        app_name, configuration, secrets, org_name=org_name, space_name=space_name
+    )
+    return app["metadata"]["guid"]
+
+
+def _get_instance_indexes(
+    app_guid: str, configuration: Configuration, secrets: Secrets
+) -> List[int]:
+    if v3.is_enabled(configuration):
+        return [
+            i["index"]
+            for i in v3.get_process_instances(app_guid, configuration, secrets)
+        ]
+
+    path = "/v2/apps/{a}/instances".format(a=app_guid)
+    return [int(i) for i in call_api(path, configuration, secrets).json()]
+
+
+def _terminate_instance(
+    configuration: Configuration, secrets: Secrets, app_guid: str, index: int
+):
+    if v3.is_enabled(configuration):
+        v3.terminate_app_instance(app_guid, index, configuration, secrets)
+        return
+
+    path = "/v2/apps/{a}/instances/{i}".format(a=app_guid, i=index)
+    call_api(path, configuration, secrets, method="DELETE")
+
+
+def _get_apps_for_org(
+    org_name: str, configuration: Configuration, secrets: Secrets
+) -> List[Dict[str, str]]:
+    """
+    Names and GUIDs of all the applications in the org.
+    """
+    if not v3.is_enabled(configuration):
+        apps = get_apps_for_org(org_name, configuration, secrets)
+        return [
+            {"name": app["entity"]["name"], "guid": app["metadata"]["guid"]}
+            for app in apps["resources"]
+        ]
+
+    apps = [
+        {"name": app["name"], "guid": app["guid"]}
+        for app in v3.iter_apps(configuration, secrets, org_name=org_name)
+    ]
+    if not apps:
+        raise FailedActivity(
+            "apps for organization name {o} not found".format(o=org_name)
+        )
+    return apps
+
+
+def _state_change_call(
+    state: str, configuration: Configuration, app_guid: str
+) -> Dict[str, Any]:
+    """
+    Arguments of the `call_api` call changing the state of the application.
+    """
+    if v3.is_enabled(configuration):
+        action = "start" if state == "STARTED" else "stop"
+        return {
+            "path": "/v3/apps/{a}/actions/{s}".format(a=app_guid, s=action),
+            "method": "POST",
+        }
+
+    return {
+        "path": "/v2/apps/{a}".format(a=app_guid),
+        "method": "PUT",
+        "body": {"state": state},
+    }
+
+
+def _update_app_state(
+    state: str, configuration: Configuration, secrets: Secrets, app_guid: str
+):
+    c = _state_change_call(state, configuration, app_guid)
+    call_api(c.pop("path"), configuration, secrets, **c)
+
+
+def _update_apps_state(
+    apps: List[Dict[str, str]],
+    state: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int,
+) -> List[Dict[str, Any]]:
+    guids = [app["guid"] for app in apps]
+    # the asynchronous client doesn't go through cassettes, a replay must
+    # never reach the foundation
+    if configuration.get("cf_async_fan_out") and not configuration.get(
+        "cf_cassette_path"
+    ):
+        # aiohttp is slow to import, only pay for it when fanning out with it
+        from chaoscf import aio
+
+        outcomes = aio.call_api_many(
+            [_state_change_call(state, configuration, guid) for guid in guids],
+            configuration,
+            secrets,
+        )
+    else:
+        outcomes = run_concurrently(
+            partial(_update_app_state, state, configuration, secrets),
+            guids,
+            max_workers,
+        )
+
+    results = []
+    for app, outcome in zip(apps, outcomes):
+        results.append(
+            {
+                "name": app["name"],
+                "guid": app["guid"],
+                "status": outcome["status"],
+                "error": outcome["error"],
+                "duration": outcome["duration"],
+            }
+        )
+
+        if outcome["status"] == "failed":
+            logger.error(
+                "Failed to set application '{a}' to {s}: {e}".format(
+                    a=app["name"], s=state, e=outcome["error"]
+                )
+            )
+
+    failed = [r for r in results if r["status"] == "failed"]
+    if failed:
+        raise FailedActivity(
+            "failed to set {f} of {n} application(s) to {s}: {e}".format(
+                f=len(failed),
+                n=len(results),
+                s=state,
+                e="; ".join(
+                    "'{a}': {e}".format(a=r["name"], e=r["error"]) for r in failed
+                ),
+            )
+        )
+
+    return results
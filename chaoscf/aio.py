@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous counterpart of `chaoscf.api`, built on top of aiohttp.
+
+aiohttp is an optional dependency of this extension, install it with:
+
+```
+$ pip install aiohttp
+```
+
+All calls made from a given event loop against a given API share a single
+connection pool, and at most `"cf_async_max_concurrency"` of them are in
+flight at once.
+
+Synchronous code, such as actions and probes, may fan calls out through
+`run` or `call_api_many`.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from chaoslib.exceptions import FailedActivity
+from chaoslib.types import Configuration, Secrets
+from logzero import logger
+
+try:
+    import aiohttp
+
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+from chaoscf import clear_tokens, metrics
+from chaoscf.api import (
+    GUID_RE,
+    INLINE_PARENTS_QUERY,
+    _authorization,
+    _forget_resolved,
+    _get_resolved,
+    _match_app_parents,
+    _next_page_path,
+    _page_query,
+    _set_resolved,
+)
+from chaoscf.concurrency import DEFAULT_MAX_WORKERS
+from chaoscf.ratelimit import get_rate_limiter
+from chaoscf.retry import get_retry_policy
+
+__all__ = [
+    "call_api",
+    "call_api_many",
+    "close_sessions",
+    "get_app_by_name",
+    "get_app_instances",
+    "get_org_by_name",
+    "get_space_by_name",
+    "iter_resources",
+    "run",
+]
+
+DEFAULT_CONCURRENCY = DEFAULT_MAX_WORKERS
+
+# sessions and semaphores are bound to the event loop they were created in
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+async def call_api(
+    path: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    query: Dict[str, Any] = None,
+    body: Dict[str, Any] = None,
+    method: str = "GET",
+    headers: Dict[str, str] = None,
+) -> "aiohttp.ClientResponse":
+    """
+    Perform a Cloud Foundry API call and return the full response to the
+    caller. Its body has already been read, so `await r.json()` does not
+    perform any I/O.
+
+    This behaves like `chaoscf.api.call_api`, sharing its token and
+    resolution caches, its rate limiter, its retry policy and its metrics.
+    """
+    loop = asyncio.get_running_loop()
+    session, semaphore = _get_client(configuration)
+
+    h = {
+        "Accept": "application/json",
+        "Authorization": await loop.run_in_executor(
+            None, _authorization, configuration, secrets
+        ),
+    }
+
+    if headers:
+        h.update(headers)
+
+    url = "{u}{p}".format(u=configuration["cf_api_url"], p=path)
+    async with semaphore:
+        start = time.perf_counter()
+        r, content = await _request(session, configuration, method, url, query, body, h)
+
+        if r.status == 401 and "cf_access_token" not in secrets:
+            logger.debug("Access token was rejected, querying a new one")
+            clear_tokens(configuration, secrets)
+            h["Authorization"] = await loop.run_in_executor(
+                None, _authorization, configuration, secrets
+            )
+            r, content = await _request(
+                session, configuration, method, url, query, body, h
+            )
+
+    if metrics.is_enabled(configuration):
+        metrics.registry.record(
+            method, path, r.status, len(content), time.perf_counter() - start
+        )
+
+    request_id = r.headers.get("X-VCAP-Request-ID")
+    logger.debug("Request ID: {i}".format(i=request_id))
+
+    if r.status == 404:
+        _forget_resolved(GUID_RE.findall(path))
+
+    if r.status > 399:
+        raise FailedActivity(
+            "failed to call '{u}': {c} => {s}".format(
+                u=url, c=r.status, s=await r.text()
+            )
+        )
+
+    return r
+
+
+async def iter_resources(
+    path: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    query: Dict[str, Any] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iterate over all the resources returned by a paginated list endpoint,
+    fetching pages lazily as `chaoscf.api.iter_resources` does.
+    """
+    query = _page_query(path, query)
+
+    while path:
+        r = await call_api(path, configuration, secrets, query=query)
+        page = await r.json()
+        for resource in page.get("resources") or []:
+            yield resource
+
+        path = _next_page_path(page, configuration)
+        query = None
+
+
+async def get_org_by_name(
+    org_name: str, configuration: Configuration, secrets: Secrets
+) -> Dict[str, Any]:
+    """
+    Get the organization with the given name.
+    """
+    key = ("org", org_name)
+    org = _get_resolved(key, configuration, secrets)
+    if org is not None:
+        return org
+
+    r = await call_api(
+        "/v2/organizations",
+        configuration,
+        secrets,
+        query={"q": "name:{o}".format(o=org_name)},
+    )
+    orgs = await r.json()
+
+    if not orgs["resources"]:
+        raise FailedActivity("org '{o}' was not found".format(o=org_name))
+
+    return _set_resolved(key, orgs["resources"][0], configuration, secrets)
+
+
+async def get_space_by_name(
+    space_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    """
+    Get the space with the given name.
+    """
+    if not org_guid and org_name:
+        org = await get_org_by_name(org_name, configuration, secrets)
+        org_guid = org["metadata"]["guid"]
+
+    key = ("space", space_name, org_guid)
+    space = _get_resolved(key, configuration, secrets)
+    if space is not None:
+        return space
+
+    q = ["name:{s}".format(s=space_name)]
+    if org_guid:
+        q.append("organization_guid:{o}".format(o=org_guid))
+
+    r = await call_api("/v2/spaces", configuration, secrets, query={"q": q})
+    spaces = await r.json()
+
+    if not spaces["total_results"]:
+        raise FailedActivity("space '{s}' was not found".format(s=space_name))
+
+    return _set_resolved(key, spaces["resources"][0], configuration, secrets)
+
+
+async def get_app_by_name(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    """
+    Get the application with the given name, along with its space and org
+    when their names are given, as `chaoscf.api.get_app_by_name` does.
+    """
+    key = ("app", app_name, space_name, space_guid, org_name, org_guid)
+    app = _get_resolved(key, configuration, secrets)
+    if app is not None:
+        return app
+
+    q = ["name:{n}".format(n=app_name)]
+    if org_guid:
+        q.append("organization_guid:{o}".format(o=org_guid))
+    if space_guid:
+        q.append("space_guid:{s}".format(s=space_guid))
+
+    # parents are only inlined, and their names checked, when not filtered
+    # by GUID already
+    query = {"q": q}
+    inline_parents = (space_name and not space_guid) or (org_name and not org_guid)
+    if inline_parents:
+        query.update(INLINE_PARENTS_QUERY)
+
+    async for app in iter_resources("/v2/apps", configuration, secrets, query=query):
+        if not inline_parents or _match_app_parents(
+            app, configuration, secrets, space_name, org_name
+        ):
+            return _set_resolved(key, app, configuration, secrets)
+
+    raise FailedActivity("app '{a}' was not found".format(a=app_name))
+
+
+async def get_app_instances(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get all the instances of a started application.
+    """
+    app = await get_app_by_name(
+        app_name, configuration, secrets, space_name, space_guid, org_name, org_guid
+    )
+
+    r = await call_api(
+        "/v2/apps/{a}/instances".format(a=app["metadata"]["guid"]),
+        configuration,
+        secrets,
+    )
+    instances = await r.json()
+
+    if not instances:
+        raise FailedActivity("app '{a}' has no instances".format(a=app_name))
+
+    return instances
+
+
+async def close_sessions():
+    """
+    Close the sessions opened from the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _clients.pop(loop, {})
+
+    for session, _ in clients.values():
+        await session.close()
+
+
+def run(coro):
+    """
+    Run the coroutine to completion from synchronous code and return its
+    result. The sessions it opened are closed afterwards.
+
+    When an event loop is already running in the calling thread, the
+    coroutine is run in a new loop from a separate thread.
+    """
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_sessions()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(main())
+
+    result = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(main())
+        except BaseException as x:
+            result["error"] = x
+
+    t = threading.Thread(target=target)
+    t.start()
+    t.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def call_api_many(
+    calls: List[Dict[str, Any]], configuration: Configuration, secrets: Secrets
+) -> List[Dict[str, Any]]:
+    """
+    Perform many Cloud Foundry API calls concurrently from synchronous code.
+
+    Each call is a mapping of the arguments to pass to `call_api`, such as
+    `{"path": "/v2/apps/xyz", "method": "PUT", "body": {"state": "STOPPED"}}`.
+
+    Failures do not stop the other calls. Each call is reported, in order,
+    with the same mapping as `chaoscf.concurrency.run_concurrently` where the
+    `result` is the decoded JSON body of the response, if any.
+    """
+    _check_aiohttp()
+
+    async def timed_call(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            r = await call_api(configuration=configuration, secrets=secrets, **kwargs)
+            result = None
+            if r.content_type == "application/json":
+                result = await r.json()
+        except Exception as x:
+            logger.debug("Concurrent call failed: {x}".format(x=x), exc_info=True)
+            return {
+                "status": "failed",
+                "result": None,
+                "error": str(x),
+                "duration": time.perf_counter() - start,
+            }
+
+        return {
+            "status": "succeeded",
+            "result": result,
+            "error": None,
+            "duration": time.perf_counter() - start,
+        }
+
+    async def fan_out() -> List[Dict[str, Any]]:
+        return await asyncio.gather(*[timed_call(c) for c in calls])
+
+    return run(fan_out())
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _check_aiohttp():
+    if not HAS_AIOHTTP:
+        raise FailedActivity(
+            "the asynchronous Cloud Foundry client requires aiohttp, "
+            "please install it with `pip install aiohttp`"
+        )
+
+
+def _get_client(
+    configuration: Configuration,
+) -> Tuple["aiohttp.ClientSession", asyncio.Semaphore]:
+    """
+    Return the session and the semaphore bounding concurrent calls for the
+    API in the `configuration` and the running event loop.
+
+    Raises `FailedActivity` when a cassette is set, since calls made with
+    aiohttp would be neither recorded nor replayed.
+    """
+    _check_aiohttp()
+    if configuration.get("cf_cassette_path"):
+        raise FailedActivity(
+            "the asynchronous Cloud Foundry client does not support cassettes, "
+            "unset 'cf_cassette_path' to use it"
+        )
+
+    loop = asyncio.get_running_loop()
+    verify_ssl = configuration.get("cf_verify_ssl", True)
+    key = (configuration.get("cf_api_url"), verify_ssl)
+    with _clients_lock:
+        clients = _clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            concurrency = int(
+                configuration.get("cf_async_max_concurrency", DEFAULT_CONCURRENCY)
+            )
+            connector = aiohttp.TCPConnector(
+                limit=concurrency, ssl=None if verify_ssl else False
+            )
+            client = (
+                aiohttp.ClientSession(connector=connector),
+                asyncio.Semaphore(concurrency),
+            )
+            clients[key] = client
+
+    return client
+
+
+def _params(query: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Flatten the query into the pairs aiohttp expects, repeating keys whose
+    value is a list, as requests does.
+    """
+    params = []
+    for key, value in (query or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        params.extend((key, str(v)) for v in values)
+    return params
+
+
+async def _request(
+    session: "aiohttp.ClientSession",
+    configuration: Configuration,
+    method: str,
+    url: str,
+    query: Dict[str, Any],
+    body: Dict[str, Any],
+    headers: Dict[str, str],
+) -> Tuple["aiohttp.ClientResponse", bytes]:
+    """
+    Send the request as `chaoscf.retry.send` does and return the response
+    along with its body.
+    """
+    limiter = get_rate_limiter(configuration)
+    policy = get_retry_policy(configuration)
+
+    attempt = 0
+    while True:
+        await limiter.acquire_async()
+        try:
+            async with session.request(
+                method, url, params=_params(query), json=body, headers=headers
+            ) as r:
+                content = await r.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as x:
+            if not policy.can_retry(method, attempt):
+                raise
+            await policy.wait_async(attempt, method, url, str(x) or repr(x))
+            attempt += 1
+            continue
+
+        limiter.update(r.status, r.headers)
+        if not policy.can_retry(method, attempt, r.status, r.headers):
+            return r, content
+
+        reason = "a {c} response".format(c=r.status)
+        await policy.wait_async(attempt, method, url, reason, r.headers)
+        attempt += 1
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, List
+import hashlib
+import re
+import time
+from contextlib import closing
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlsplit
 
-import requests
 from chaoslib.exceptions import FailedActivity
 from chaoslib.types import Configuration, Secrets
 from logzero import logger
 
-from chaoscf import auth
+from chaoscf import auth, clear_tokens, metrics
+from chaoscf.cache import TTLCache
+from chaoscf.retry import send
+from chaoscf.session import get_session
+from chaoscf.stream import iter_array_items
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
 
 __all__ = [
     "call_api",
@@ -18,8 +29,41 @@ __all__ = [
     "get_org_by_name",
     "get_routes_by_host",
     "get_space_by_name",
+    "iter_resources",
+    "list_resources",
 ]
 
+# largest page size accepted by the v2 API
+RESULTS_PER_PAGE = 100
+
+# how long, in seconds, an org, space or app name resolved to its resource is
+# remembered for, and how many of them are remembered at most
+DEFAULT_RESOLUTION_CACHE_TTL = 60
+DEFAULT_RESOLUTION_CACHE_SIZE = 1024
+
+GUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+RESOURCE_PATH_RE = re.compile(
+    r"^/v[23]/(apps|organizations|spaces)/(?P<guid>{g})$".format(g=GUID_RE.pattern),
+    re.IGNORECASE,
+)
+
+# query parameters inlining the space and org of the listed apps
+INLINE_PARENTS_QUERY = {
+    "inline-relations-depth": 2,
+    "include-relations": "space,organization",
+}
+
+# how many GET responses the opt-in response cache holds at most
+DEFAULT_RESPONSE_CACHE_SIZE = 256
+
+# size, in bytes, of the chunks in which streamed pages are read
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_resolved = TTLCache(maxsize=DEFAULT_RESOLUTION_CACHE_SIZE)
+_responses = TTLCache(maxsize=DEFAULT_RESPONSE_CACHE_SIZE)
+
 
 def call_api(
     path: str,
@@ -29,38 +73,104 @@ def call_api(
     body: Dict[str, Any] = None,
     method: str = "GET",
     headers: Dict[str, str] = None,
-) -> requests.Response:
+    stream: bool = False,
+) -> "requests.Response":
     """
     Perform a Cloud Foundry API call and return the full response to the
     caller.
-    """
-    if "cf_access_token" not in secrets:
-        tokens = auth(configuration, secrets)
-    else:
-        tokens = {
-            "token_type": secrets.get("cf_token_type", "bearer"),
-            "access_token": secrets.get("cf_access_token"),
-        }
 
+    With `stream`, the body of a successful response is not read: it is up
+    to the caller to consume it, with `iter_content` for instance, and to
+    close the response. Such calls bypass the response cache.
+
+    Calls are sent through the pooled session returned by
+    `chaoscf.session.get_session` so connections to the API are kept alive
+    between calls.
+
+    When the access token was obtained through `auth` and gets rejected by
+    the API, it is dropped from the token cache and the call is attempted once
+    more with a fresh token.
+
+    Resolved orgs, spaces and apps whose GUID appears in a path the API
+    answers with a `404`, or that are deleted, are forgotten by the
+    resolution cache (see `get_org_by_name`).
+
+    When `"cf_response_cache"` is enabled in the `configuration`, responses
+    to `GET` calls are kept in a bounded in-memory LRU cache of
+    `"cf_response_cache_size"` entries. A cached response younger than
+    `"cf_response_cache_max_age"` seconds (`0` by default) is returned as-is.
+    Otherwise, it is revalidated with `If-None-Match` or `If-Modified-Since`
+    and served again when the API answers `304 Not Modified`.
+
+    Calls go through the rate limiter of the API, see
+    `chaoscf.ratelimit.get_rate_limiter`, and transient failures, such as a
+    `503` from the gorouter or a dropped connection, are retried with an
+    exponential backoff, see `chaoscf.retry.get_retry_policy`.
+
+    Each call is recorded, retries included, in `chaoscf.metrics.registry`
+    unless `"cf_metrics"` is `false`.
+    """
     h = {
         "Accept": "application/json",
-        "Authorization": "{a} {t}".format(
-            a=tokens["token_type"], t=tokens["access_token"]
-        ),
+        "Authorization": _authorization(configuration, secrets),
     }
 
     if headers:
-        h.update(h)
+        h.update(headers)
 
     verify_ssl = configuration.get("cf_verify_ssl", True)
     url = "{u}{p}".format(u=configuration["cf_api_url"], p=path)
-    r = requests.request(
-        method, url, params=query, json=body, verify=verify_ssl, headers=h
-    )
+
+    cache_key = None
+    if not stream:
+        cache_key = _response_cache_key(method, url, query, configuration, secrets)
+    cached = _responses.get(cache_key) if cache_key else None
+    if cached is not None:
+        response, stored_at = cached
+        max_age = float(configuration.get("cf_response_cache_max_age", 0))
+        if time.monotonic() - stored_at < max_age:
+            logger.debug("Serving '{u}' from the response cache".format(u=url))
+            return response
+        h.update(_cache_validators(response))
+
+    start = time.perf_counter()
+    session = get_session(configuration)
+    kwargs = {"params": query, "json": body, "verify": verify_ssl, "headers": h}
+    if stream:
+        kwargs["stream"] = True
+    r = send(session, method, url, configuration, **kwargs)
+
+    if r.status_code == 401 and "cf_access_token" not in secrets:
+        logger.debug("Access token was rejected, querying a new one")
+        # release the connection of a streamed response before sending again
+        r.close()
+        clear_tokens(configuration, secrets)
+        h["Authorization"] = _authorization(configuration, secrets)
+        r = send(session, method, url, configuration, **kwargs)
+
+    if metrics.is_enabled(configuration):
+        # the size of a streamed body is only known from its headers
+        size = int(r.headers.get("Content-Length") or 0) if stream else len(r.content)
+        metrics.registry.record(
+            method, path, r.status_code, size, time.perf_counter() - start
+        )
 
     request_id = r.headers.get("X-VCAP-Request-ID")
     logger.debug("Request ID: {i}".format(i=request_id))
 
+    if cached is not None and r.status_code == 304:
+        logger.debug("'{u}' was not modified, serving it from cache".format(u=url))
+        r = cached[0]
+    if cache_key and r.status_code == 200:
+        _cache_response(cache_key, r, configuration)
+
+    if r.status_code == 404:
+        _forget_resolved(GUID_RE.findall(path))
+    elif method.upper() == "DELETE" and r.status_code < 400:
+        m = RESOURCE_PATH_RE.match(path)
+        if m:
+            _forget_resolved([m.group("guid")])
+
     if r.status_code > 399:
         raise FailedActivity(
             "failed to call '{u}': {c} => {s}".format(u=url, c=r.status_code, s=r.text)
@@ -69,12 +179,102 @@ def call_api(
     return r
 
 
+def iter_resources(
+    path: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    query: Dict[str, Any] = None,
+    fields: Sequence[str] = None,
+    stream: bool = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over all the resources returned by a paginated list endpoint.
+
+    Pages of `RESULTS_PER_PAGE` resources are fetched lazily, by following
+    the link to the next page only once all the resources of the previous
+    one have been consumed, so that callers may stream through large
+    collections without holding them all in memory.
+
+    With `stream`, which defaults to `"cf_stream_responses"` in the
+    `configuration`, each page is parsed incrementally as it is received,
+    rather than loaded at once, and its resources are yielded one at a time,
+    so that no more than a single resource is held in memory. When
+    `fields` are given, only those fields of each resource's entity are
+    kept, along with its metadata (`guid` and the given fields for v3
+    resources).
+
+    Both v2 (`next_url`) and v3 (`pagination.next.href`) endpoints are
+    supported.
+
+    See https://apidocs.cloudfoundry.org/280/#pagination and
+    http://v3-apidocs.cloudfoundry.org/version/3.76.0/#pagination
+    """
+    query = _page_query(path, query)
+    if stream is None:
+        stream = configuration.get("cf_stream_responses", False)
+
+    while path:
+        if stream:
+            page = {}
+            resources = _stream_page(path, configuration, secrets, query, page)
+        else:
+            page = call_api(path, configuration, secrets, query=query).json()
+            resources = page.get("resources") or []
+
+        for resource in resources:
+            yield _select_fields(resource, fields) if fields else resource
+
+        # the next page link already carries the original query
+        path = _next_page_path(page, configuration)
+        query = None
+
+
+def list_resources(
+    path: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    query: Dict[str, Any] = None,
+    fields: Sequence[str] = None,
+    stream: bool = None,
+) -> Dict[str, Any]:
+    """
+    Fetch every page of a list endpoint and merge them into a single page,
+    shaped like the API's own response. See `iter_resources` for `fields`
+    and `stream`.
+
+    Prefer `iter_resources` when the resources can be processed one at a
+    time.
+    """
+    resources = list(
+        iter_resources(
+            path, configuration, secrets, query=query, fields=fields, stream=stream
+        )
+    )
+    return {
+        "total_results": len(resources),
+        "total_pages": 1,
+        "prev_url": None,
+        "next_url": None,
+        "resources": resources,
+    }
+
+
 def get_org_by_name(
     org_name: str, configuration: Configuration, secrets: Secrets
 ) -> Dict[str, Any]:
     """
     Get the organization with the given name.
+
+    Orgs, spaces and apps resolved by name are cached per API URL and user
+    for `"cf_resolution_cache_ttl"` seconds, `DEFAULT_RESOLUTION_CACHE_TTL` by
+    default, and up to `"cf_resolution_cache_size"` entries, evicting the least
+    recently used ones. A TTL of `0` disables the cache.
     """
+    key = ("org", org_name)
+    org = _get_resolved(key, configuration, secrets)
+    if org is not None:
+        return org
+
     orgs = call_api(
         "/v2/organizations",
         configuration,
@@ -85,7 +285,7 @@ def get_org_by_name(
     if not orgs["resources"]:
         raise FailedActivity("org '{o}' was not found".format(o=org_name))
 
-    return orgs["resources"][0]
+    return _set_resolved(key, orgs["resources"][0], configuration, secrets)
 
 
 def get_space_by_name(
@@ -101,11 +301,18 @@ def get_space_by_name(
     You may restrict the search by organization by providing the
     various according parameters. When passing the name, the function performs
     a lookup for the org to fetch its GUID.
+
+    The space is cached as described in `get_org_by_name`.
     """
     if not org_guid and org_name:
         org = get_org_by_name(org_name, configuration, secrets)
         org_guid = org["metadata"]["guid"]
 
+    key = ("space", space_name, org_guid)
+    space = _get_resolved(key, configuration, secrets)
+    if space is not None:
+        return space
+
     query = ["name:{s}".format(s=space_name)]
     if org_guid:
         query.append("organization_guid:{o}".format(o=org_guid))
@@ -115,7 +322,7 @@ def get_space_by_name(
     if not spaces["total_results"]:
         raise FailedActivity("space '{s}' was not found".format(s=space_name))
 
-    return spaces["resources"][0]
+    return _set_resolved(key, spaces["resources"][0], configuration, secrets)
 
 
 def _get_filter_query(
@@ -156,11 +363,26 @@ def get_app_by_name(
     Get the application with the given name.
 
     You may restrict the search by organization and/or space by providing the
-    various according parameters. When passing the names, the function performs
-    a lookup for each of them to fetch their GUID.
+    various according parameters. When passing names rather than GUIDs, the
+    app is fetched along with its space and org in a single call, using
+    `inline-relations-depth`, and their names are checked client-side. The
+    space and org are then cached too.
+
+    The app is cached as described in `get_org_by_name`.
 
     See https://apidocs.cloudfoundry.org/280/apps/list_all_apps.html
     """
+    key = ("app", app_name, space_name, space_guid, org_name, org_guid)
+    app = _get_resolved(key, configuration, secrets)
+    if app is not None:
+        return app
+
+    if (space_name and not space_guid) or (org_name and not org_guid):
+        app = _get_app_with_parents(
+            app_name, configuration, secrets, space_name, space_guid, org_name, org_guid
+        )
+        return _set_resolved(key, app, configuration, secrets)
+
     q = _get_filter_query(
         configuration, secrets, space_name, space_guid, org_name, org_guid
     )
@@ -171,7 +393,7 @@ def get_app_by_name(
     if not apps["total_results"]:
         raise FailedActivity("app '{a}' was not found".format(a=app_name))
 
-    return apps["resources"][0]
+    return _set_resolved(key, apps["resources"][0], configuration, secrets)
 
 
 def get_routes_by_host(
@@ -189,7 +411,7 @@ def get_routes_by_host(
     q = _get_filter_query(configuration, secrets, org_name=org_name, org_guid=org_guid)
     q.append("host:{h}".format(h=route_host))
 
-    routes = call_api("/v2/routes", configuration, secrets, query={"q": q}).json()
+    routes = list_resources("/v2/routes", configuration, secrets, query={"q": q})
 
     if not routes["total_results"]:
         raise FailedActivity("route with '{h}' was not found".format(h=route_host))
@@ -210,29 +432,24 @@ def get_app_routes_by_host(
     """
     Get all routes associated with the provided app and the given host.
 
-    See https://apidocs.cloudfoundry.org/280/routes/list_all_routes.html
-    """
-    routes = get_routes_by_host(route_host, configuration, secrets, org_name, org_guid)
+    The app is resolved once, then its routes are listed in bulk, filtered
+    by host on the API side, so the number of calls does not grow with the
+    number of routes.
 
+    See https://apidocs.cloudfoundry.org/280/apps/list_all_routes_for_the_app.html
+    """  # noqa: E501
     app = get_app_by_name(
         app_name, configuration, secrets, space_name, space_guid, org_name, org_guid
     )
 
-    result = []
-    for route in routes["resources"]:
-        q = _get_filter_query(
-            configuration, secrets, space_name, space_guid, org_name, org_guid
-        )
-
-        route = call_api(
-            route["entity"]["apps_url"],
+    result = list(
+        iter_resources(
+            app["entity"]["routes_url"],
             configuration,
             secrets,
-            query={"q": q, "app_guid": app["metadata"]["guid"]},
-        ).json()
-
-        if route["total_results"]:
-            result.append(route)
+            query={"q": "host:{h}".format(h=route_host)},
+        )
+    )
 
     if not result:
         raise FailedActivity(
@@ -297,17 +514,14 @@ def get_bind_by_name(
         app_name, configuration, secrets, org_name=org_name, space_name=space_name
     )
 
-    binds = call_api(
+    binds = iter_resources(
         "/v2/apps/" + app["metadata"]["guid"] + "/service_bindings",
         configuration,
         secrets,
-    ).json()
-
-    if not binds["total_results"]:
-        raise FailedActivity("bind '{a}' was not found".format(a=bind_name))
+    )
 
     service_binding = next(
-        item for item in binds["resources"] if item["entity"]["name"] == bind_name
+        (item for item in binds if item["entity"]["name"] == bind_name), None
     )
 
     if not service_binding:
@@ -316,19 +530,280 @@ def get_bind_by_name(
     return service_binding
 
 
-def get_apps_for_org(org_name: str, configuration: Configuration, secrets: Secrets):
+def get_apps_for_org(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    fields: Sequence[str] = None,
+):
     """
     List all applications available in the specified CF org name.
 
+    Pass the names of the `fields` of the app entities to keep only those,
+    see `iter_resources`.
+
     See https://apidocs.cloudfoundry.org/280/apps/list_all_apps.html to
     understand the content of the response.
     """
     q = _get_filter_query(configuration, secrets, org_name=org_name)
 
-    apps = call_api("/v2/apps", configuration, secrets, query={"q": q}).json()
+    apps = list_resources(
+        "/v2/apps", configuration, secrets, query={"q": q}, fields=fields
+    )
     if not apps["total_results"]:
         raise FailedActivity(
             "apps for organization name {o} not found".format(o=org_name)
         )
 
     return apps
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _authorization(configuration: Configuration, secrets: Secrets) -> str:
+    if "cf_access_token" not in secrets:
+        tokens = auth(configuration, secrets)
+    else:
+        tokens = {
+            "token_type": secrets.get("cf_token_type", "bearer"),
+            "access_token": secrets.get("cf_access_token"),
+        }
+
+    return "{a} {t}".format(a=tokens["token_type"], t=tokens["access_token"])
+
+
+def _get_app_with_parents(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    """
+    Look the app up by name along with its space and org, inlined in the same
+    response, and return the first one whose space and org names match.
+    """
+    q = ["name:{n}".format(n=app_name)]
+    if org_guid:
+        q.append("organization_guid:{o}".format(o=org_guid))
+    if space_guid:
+        q.append("space_guid:{s}".format(s=space_guid))
+
+    apps = iter_resources(
+        "/v2/apps",
+        configuration,
+        secrets,
+        query=dict(INLINE_PARENTS_QUERY, q=q),
+    )
+
+    for app in apps:
+        if _match_app_parents(app, configuration, secrets, space_name, org_name):
+            return app
+
+    raise FailedActivity("app '{a}' was not found".format(a=app_name))
+
+
+def _match_app_parents(
+    app: Dict[str, Any],
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    org_name: str = None,
+) -> bool:
+    """
+    Tell whether the app's inlined space and org have the given names. They
+    are removed from the app and cached when they do.
+    """
+    space = app["entity"].pop("space", None) or {"entity": {}}
+    org = space["entity"].pop("organization", None) or {"entity": {}}
+    if space_name and space["entity"].get("name") != space_name:
+        return False
+    if org_name and org["entity"].get("name") != org_name:
+        return False
+
+    if org_name and "metadata" in org:
+        _set_resolved(("org", org_name), org, configuration, secrets)
+    if space_name and "metadata" in space:
+        space_org_guid = org["metadata"]["guid"] if org_name else None
+        _set_resolved(
+            ("space", space_name, space_org_guid), space, configuration, secrets
+        )
+    return True
+
+
+def _resolution_scope(configuration: Configuration, secrets: Secrets) -> Tuple:
+    """
+    Scope of the resolution cache entries, so that names resolved against a
+    foundation, or with a given user, never leak to another.
+    """
+    user = secrets.get("cf_username")
+    if "cf_access_token" in secrets:
+        user = hashlib.sha256(secrets["cf_access_token"].encode("utf-8")).hexdigest()
+    return (configuration.get("cf_api_url"), user, secrets.get("cf_client_id", "cf"))
+
+
+def _resolution_ttl(configuration: Configuration) -> float:
+    return float(
+        configuration.get("cf_resolution_cache_ttl", DEFAULT_RESOLUTION_CACHE_TTL)
+    )
+
+
+def _get_resolved(
+    key: Tuple, configuration: Configuration, secrets: Secrets
+) -> Dict[str, Any]:
+    if _resolution_ttl(configuration) <= 0:
+        return None
+
+    resource = _resolved.get((_resolution_scope(configuration, secrets),) + key)
+    if resource is not None:
+        logger.debug("Resolved {k} from cache".format(k=key))
+    return resource
+
+
+def _set_resolved(
+    key: Tuple,
+    resource: Dict[str, Any],
+    configuration: Configuration,
+    secrets: Secrets,
+) -> Dict[str, Any]:
+    ttl = _resolution_ttl(configuration)
+    if ttl > 0:
+        _resolved.maxsize = int(
+            configuration.get("cf_resolution_cache_size", DEFAULT_RESOLUTION_CACHE_SIZE)
+        )
+        _resolved.set(
+            (_resolution_scope(configuration, secrets),) + key, resource, ttl=ttl
+        )
+    return resource
+
+
+def _forget_resolved(guids: List[str]):
+    guids = {g.lower() for g in guids}
+    if not guids:
+        return
+
+    count = _resolved.discard(lambda k, resource: _guid(resource).lower() in guids)
+    if count:
+        logger.debug("Forgot {c} cached resolution(s)".format(c=count))
+
+
+def _response_cache_key(
+    method: str,
+    url: str,
+    query: Dict[str, Any],
+    configuration: Configuration,
+    secrets: Secrets,
+) -> Tuple:
+    """
+    Key of the response in the response cache, or `None` when the response
+    must not be cached.
+    """
+    if method.upper() != "GET" or not configuration.get("cf_response_cache"):
+        return None
+
+    params = []
+    for key, value in sorted((query or {}).items()):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        params.append((key, tuple(str(v) for v in values)))
+
+    return (_resolution_scope(configuration, secrets), url, tuple(params))
+
+
+def _cache_validators(response: "requests.Response") -> Dict[str, str]:
+    headers = {}
+    if response.headers.get("ETag"):
+        headers["If-None-Match"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        headers["If-Modified-Since"] = response.headers["Last-Modified"]
+    return headers
+
+
+def _cache_response(
+    key: Tuple, response: "requests.Response", configuration: Configuration
+):
+    max_age = float(configuration.get("cf_response_cache_max_age", 0))
+    if max_age <= 0 and not _cache_validators(response):
+        # such a response could never be served again
+        return
+
+    _responses.maxsize = int(
+        configuration.get("cf_response_cache_size", DEFAULT_RESPONSE_CACHE_SIZE)
+    )
+    _responses.set(key, (response, time.monotonic()))
+
+
+def _guid(resource: Dict[str, Any]) -> str:
+    """
+    GUID of a v2 or v3 resource.
+    """
+    if "guid" in resource:
+        return resource["guid"]
+    return resource["metadata"]["guid"]
+
+
+def _stream_page(
+    path: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    query: Dict[str, Any],
+    page: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the resources of the page as they are parsed from the response
+    body, then fill `page` with its other fields, the pagination ones.
+    """
+    r = call_api(path, configuration, secrets, query=query, stream=True)
+    with closing(r):
+        chunks = r.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        yield from iter_array_items(chunks, "resources", page)
+
+
+def _select_fields(resource: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Copy of the resource keeping only the given fields of its entity, along
+    with its metadata.
+    """
+    if "entity" not in resource:
+        return {k: v for k, v in resource.items() if k == "guid" or k in fields}
+
+    entity = resource["entity"] or {}
+    return {
+        "metadata": resource.get("metadata"),
+        "entity": {k: v for k, v in entity.items() if k in fields},
+    }
+
+
+def _page_query(path: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
+    query = dict(query or {})
+    if path.startswith("/v3/"):
+        query.setdefault("per_page", RESULTS_PER_PAGE)
+    else:
+        query.setdefault("results-per-page", RESULTS_PER_PAGE)
+    return query
+
+
+def _next_page_path(page: Dict[str, Any], configuration: Configuration) -> str:
+    """
+    Path of the page following the given one, if any. v3 endpoints return
+    absolute URLs whose path and query are kept, whatever the host or port
+    they name, since the next page is always read from the API URL.
+    """
+    if "pagination" not in page:
+        return page.get("next_url")
+
+    next_page = (page["pagination"] or {}).get("next")
+    if not next_page:
+        return None
+
+    href = urlsplit(next_page["href"])
+    path = href.path
+    prefix = urlsplit(configuration["cf_api_url"]).path.rstrip("/")
+    if prefix and path.startswith(prefix + "/"):
+        start = len(prefix)
+        path = path[start:]
+    if href.query:
+        path = "{p}?{q}".format(p=path, q=href.query)
+    return path
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Record the HTTP exchanges with the Cloud Foundry API and UAA to a cassette
+file, then replay them without touching the foundation.
+
+Set `"cf_cassette_path"` in the configuration to the cassette file, and
+`"cf_cassette_mode"` to `"record"` or `"replay"` (the default). Files whose
+name ends with `.gz` are compressed.
+
+Credentials are never written to the cassette: the `Authorization` header is
+not recorded at all and usernames, passwords, client secrets and tokens are
+replaced with `"<scrubbed>"` in the request and response bodies. So are the
+whole credentials of service bindings and environments of apps, whatever
+they hold.
+
+When replaying, requests are matched on their method, URL and scrubbed body.
+Identical requests are answered with the recorded responses in turn, the
+last one being repeated once they are all used, so polling probes replay
+deterministically.
+"""
+
+import base64
+import gzip
+import json
+import threading
+import weakref
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from chaoslib.types import Configuration
+from logzero import logger
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+__all__ = ["CassetteAdapter", "CassetteMiss", "get_cassette_adapter"]
+
+CASSETTE_VERSION = 1
+SCRUBBED = "<scrubbed>"
+
+# form fields and JSON keys holding credentials, or documents which may hold
+# any, such as the credentials of a service binding or an app's environment,
+# whose whole value is scrubbed
+SECRET_FIELDS = frozenset(
+    [
+        "access_token",
+        "client_secret",
+        "credentials",
+        "environment_json",
+        "environment_variables",
+        "id_token",
+        "password",
+        "refresh_token",
+        "system_env_json",
+        "username",
+    ]
+)
+
+# response headers worth keeping, the others are dropped to keep it compact
+RECORDED_HEADERS = frozenset(
+    [
+        "content-type",
+        "etag",
+        "last-modified",
+        "location",
+        "retry-after",
+        "x-ratelimit-limit",
+        "x-ratelimit-remaining",
+        "x-ratelimit-reset",
+        "x-vcap-request-id",
+    ]
+)
+
+
+class CassetteMiss(requests.RequestException):
+    """
+    Raised when replaying a request which was never recorded.
+    """
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    Transport adapter recording exchanges to, or replaying them from, the
+    cassette at `path`. Recorded exchanges are written once, when the
+    adapter, or the session it is mounted on, is first closed, or else when
+    the adapter is garbage collected or the interpreter exits, so that they
+    are kept even when the session is never closed.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", **kwargs):
+        super().__init__(**kwargs)
+        if mode not in ("record", "replay"):
+            raise ValueError(
+                "cassette mode must be 'record' or 'replay', not '{m}'".format(m=mode)
+            )
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._recorded = {}
+        self._replayed = {}
+        self._save = None
+        if mode == "record":
+            # the adapter is mounted for both http and https and thus closed
+            # twice with the session, the finalizer only ever runs once
+            self._save = weakref.finalize(
+                self, _save, path, self._lock, self._interactions
+            )
+        else:
+            for interaction in _load(path):
+                key = _match_key(interaction["request"])
+                self._recorded.setdefault(key, []).append(interaction["response"])
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if self.mode == "replay":
+            return self._replay(request)
+
+        r = super().send(request, **kwargs)
+        with self._lock:
+            self._interactions.append(
+                {"request": _request_record(request), "response": _response_record(r)}
+            )
+        return r
+
+    def save(self):
+        """
+        Write the recorded exchanges to the cassette, unless they already
+        were.
+        """
+        if self._save is not None:
+            self._save()
+
+    def close(self):
+        self.save()
+        super().close()
+
+    def _replay(self, request: requests.PreparedRequest) -> requests.Response:
+        key = _match_key(_request_record(request))
+        with self._lock:
+            candidates = self._recorded.get(key)
+            if not candidates:
+                raise CassetteMiss(
+                    "no exchange recorded in '{p}' for {m} '{u}'".format(
+                        p=self.path, m=request.method, u=request.url
+                    ),
+                    request=request,
+                )
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            recorded = candidates[min(index, len(candidates) - 1)]
+
+        return self._build(request, recorded)
+
+    def _build(
+        self, request: requests.PreparedRequest, recorded: Dict[str, Any]
+    ) -> requests.Response:
+        r = requests.Response()
+        r.status_code = recorded["status"]
+        r.reason = recorded.get("reason")
+        r.headers = CaseInsensitiveDict(recorded.get("headers") or {})
+        r.encoding = get_encoding_from_headers(r.headers)
+        r._content = _decode_body(recorded)
+        r._content_consumed = True
+        r.url = request.url
+        r.request = request
+        r.connection = self
+        return r
+
+
+def get_cassette_adapter(configuration: Configuration, **kwargs) -> CassetteAdapter:
+    """
+    Return a cassette adapter for the `"cf_cassette_path"` set in the
+    `configuration`, or `None` when there is none. The remaining keyword
+    arguments are passed to `requests.adapters.HTTPAdapter`.
+    """
+    path = configuration.get("cf_cassette_path")
+    if not path:
+        return None
+
+    mode = configuration.get("cf_cassette_mode", "replay")
+    logger.debug("Using cassette '{p}' in {m} mode".format(p=path, m=mode))
+    return CassetteAdapter(path, mode, **kwargs)
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _save(path: str, lock: threading.Lock, interactions: List[Dict[str, Any]]):
+    with lock:
+        cassette = {"version": CASSETTE_VERSION, "interactions": list(interactions)}
+    content = json.dumps(cassette, separators=(",", ":")).encode("utf-8")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wb") as f:
+        f.write(content)
+    logger.debug(
+        "Recorded {n} HTTP exchanges to '{p}'".format(
+            n=len(cassette["interactions"]), p=path
+        )
+    )
+
+
+def _load(path: str) -> List[Dict[str, Any]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        cassette = json.loads(f.read().decode("utf-8"))
+    return cassette["interactions"]
+
+
+def _match_key(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (record["method"], record["url"], record.get("body") or "")
+
+
+def _request_record(request: requests.PreparedRequest) -> Dict[str, Any]:
+    body = request.body
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+
+    content_type = request.headers.get("Content-Type") or ""
+    if body and "x-www-form-urlencoded" in content_type:
+        body = urlencode(
+            [
+                (k, SCRUBBED if k in SECRET_FIELDS else v)
+                for k, v in parse_qsl(body, keep_blank_values=True)
+            ]
+        )
+    elif body:
+        body = _scrub_json(body)
+
+    return {"method": request.method, "url": _normalize_url(request.url), "body": body}
+
+
+def _response_record(r: requests.Response) -> Dict[str, Any]:
+    record = {
+        "status": r.status_code,
+        "reason": r.reason,
+        "headers": {
+            k: v for k, v in r.headers.items() if k.lower() in RECORDED_HEADERS
+        },
+    }
+
+    content = r.content or b""
+    try:
+        record["body"] = _scrub_json(content.decode("utf-8"))
+    except UnicodeDecodeError:
+        record["body"] = base64.b64encode(content).decode("ascii")
+        record["base64"] = True
+    return record
+
+
+def _decode_body(recorded: Dict[str, Any]) -> bytes:
+    body = recorded.get("body") or ""
+    if recorded.get("base64"):
+        return base64.b64decode(body)
+    return body.encode("utf-8")
+
+
+def _normalize_url(url: str) -> str:
+    """
+    Sort the query string so that the order of parameters does not matter.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit(parts._replace(query=query))
+
+
+def _scrub_json(text: str) -> str:
+    """
+    Replace the credentials found in a JSON document. Other documents are
+    returned as-is.
+    """
+    try:
+        document = json.loads(text)
+    except ValueError:
+        return text
+
+    def scrub(value):
+        if isinstance(value, dict):
+            return {
+                k: SCRUBBED if k in SECRET_FIELDS else scrub(v)
+                for k, v in value.items()
+            }
+        if isinstance(value, list):
+            return [scrub(v) for v in value]
+        return value
+
+    scrubbed = scrub(document)
+    if scrubbed == document:
+        return text
+    return json.dumps(scrubbed, separators=(",", ":"))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+from logzero import logger
+
+__all__ = ["DEFAULT_MAX_WORKERS", "run_concurrently"]
+
+DEFAULT_MAX_WORKERS = 10
+
+
+def run_concurrently(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[Dict[str, Any]]:
+    """
+    Call `func` with each of the `items`, using a pool of at most
+    `max_workers` threads.
+
+    Failures do not stop the other calls. Instead, each call is reported, in
+    the order of `items`, with a mapping such as:
+
+    ```
+    {"status": "succeeded", "result": ..., "error": None, "duration": 0.12}
+    ```
+
+    where `status` is either `"succeeded"` or `"failed"`, `error` the failure
+    message and `duration` the time the call took, in seconds.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        return list(executor.map(lambda item: _timed_call(func, item), items))
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _timed_call(func: Callable[[Any], Any], item: Any) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        result = func(item)
+    except Exception as x:
+        logger.debug("Concurrent call failed: {x}".format(x=x), exc_info=True)
+        return {
+            "status": "failed",
+            "result": None,
+            "error": str(x),
+            "duration": time.perf_counter() - start,
+        }
+
+    return {
+        "status": "succeeded",
+        "result": result,
+        "error": None,
+        "duration": time.perf_counter() - start,
+    }
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from typing import Any
+
+from chaoslib.types import Activity, Configuration, Experiment, Journal, Run, Secrets
+
+from chaoscf import metrics
+from chaoscf.session import close_sessions
+
+__all__ = [
+    "after_activity_control",
+    "after_experiment_control",
+    "before_activity_control",
+]
+
+
+def before_activity_control(
+    context: Activity,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    **kwargs
+):
+    """
+    Attribute the calls made from now on to the activity about to run.
+    """
+    metrics.registry.activity = context.get("name")
+
+
+def after_activity_control(
+    context: Activity,
+    state: Run,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    **kwargs
+):
+    """
+    Stop attributing calls to the activity which just ran.
+    """
+    metrics.registry.activity = None
+
+
+def after_experiment_control(
+    context: Experiment,
+    state: Journal,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    **kwargs
+):
+    """
+    Release the resources held by this extension once the experiment has
+    completed, such as the pooled HTTP connections to the Cloud Foundry API.
+
+    The summary of the calls made to the API during the experiment, see
+    `chaoscf.metrics.get_metrics`, is added to the journal's `"extensions"`
+    under the `"chaoscf"` name, and the metrics are reset.
+
+    Declare it in your experiment with:
+
+    ```json
+    "controls": [
+        {
+            "name": "cloud-foundry",
+            "provider": {
+                "type": "python",
+                "module": "chaoscf.control"
+            }
+        }
+    ]
+    ```
+    """
+    if isinstance(state, dict):
+        state.setdefault("extensions", []).append(
+            {"name": "chaoscf", "metrics": metrics.get_metrics()}
+        )
+    metrics.reset_metrics()
+    close_sessions()
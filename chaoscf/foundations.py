@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Run activities against several Cloud Foundry foundations at once.
+
+Foundations are listed by name under `"cf_foundations"` in the
+configuration, each with the configuration keys which differ from the
+shared ones, `"cf_api_url"` at least:
+
+```json
+{
+    "configuration": {
+        "cf_verify_ssl": false,
+        "cf_foundations": {
+            "eu": {"cf_api_url": "https://api.eu.example.com"},
+            "us": {"cf_api_url": "https://api.us.example.com"}
+        }
+    },
+    "secrets": {
+        "cloudfoundry": {
+            "cf_username": "user",
+            "cf_password": "pass",
+            "cf_foundations": {
+                "us": {"cf_username": "us-user", "cf_password": "us-pass"}
+            }
+        }
+    }
+}
+```
+
+Secrets may likewise be set per foundation under `"cf_foundations"`, the
+shared ones applying to the foundations without their own.
+
+Since tokens, sessions and caches are all kept per `"cf_api_url"`, each
+foundation has its own access token and connection pool. The fan-out
+variants of the actions and probes live in `chaoscf.multi_actions` and
+`chaoscf.multi_probes`.
+"""
+
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+from chaoslib.exceptions import FailedActivity
+from chaoslib.types import Configuration, Secrets
+from logzero import logger
+
+from chaoscf.concurrency import run_concurrently
+
+__all__ = ["get_foundations", "run_on_foundations"]
+
+
+def get_foundations(
+    configuration: Configuration, secrets: Secrets, names: Sequence[str] = None
+) -> Dict[str, Tuple[Configuration, Secrets]]:
+    """
+    Return the configuration and secrets of each foundation, by name, merged
+    over the shared ones. Only the foundations in `names` are returned when
+    it is given.
+
+    Raises `FailedActivity` when no foundation is configured or one of the
+    `names` is unknown.
+    """
+    foundations = configuration.get("cf_foundations") or {}
+    if not foundations:
+        raise FailedActivity("no foundation is set in 'cf_foundations'")
+
+    names = list(names) if names else sorted(foundations)
+    unknown = [n for n in names if n not in foundations]
+    if unknown:
+        raise FailedActivity(
+            "unknown foundation(s): {u}".format(u=", ".join(sorted(unknown)))
+        )
+
+    secrets = secrets or {}
+    shared_configuration = {
+        k: v for k, v in configuration.items() if k != "cf_foundations"
+    }
+    shared_secrets = {k: v for k, v in secrets.items() if k != "cf_foundations"}
+    foundation_secrets = secrets.get("cf_foundations") or {}
+
+    result = {}
+    for name in names:
+        c = dict(shared_configuration, **(foundations[name] or {}))
+        if not c.get("cf_api_url"):
+            raise FailedActivity("foundation '{n}' has no 'cf_api_url'".format(n=name))
+        s = dict(shared_secrets, **(foundation_secrets.get(name) or {}))
+        result[name] = (c, s)
+    return result
+
+
+def run_on_foundations(
+    func: Callable[..., Any],
+    configuration: Configuration,
+    secrets: Secrets,
+    foundations: Sequence[str] = None,
+    fail_on_error: bool = False,
+    **kwargs
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Call the activity `func` with the keyword arguments, and the
+    configuration and secrets of each foundation, against all of them
+    concurrently.
+
+    A failure on a foundation does not prevent the activity from running on
+    the others. Returns, keyed by foundation name, the `status`
+    (`"succeeded"` or `"failed"`), `result`, `error` and `duration` in
+    seconds of each run, see `chaoscf.concurrency.run_concurrently`.
+
+    With `fail_on_error`, as for actions, raises `FailedActivity` instead
+    once every foundation was tried, listing those the activity failed on.
+    """
+    targets = get_foundations(configuration, secrets, foundations)
+    names = list(targets)
+
+    def run(name: str) -> Any:
+        c, s = targets[name]
+        return func(configuration=c, secrets=s, **kwargs)
+
+    outcomes = run_concurrently(run, names, max_workers=len(names))
+
+    results = {}
+    for name, outcome in zip(names, outcomes):
+        results[name] = outcome
+        if outcome["status"] == "failed":
+            logger.error(
+                "{f} failed on foundation '{n}': {e}".format(
+                    f=func.__name__, n=name, e=outcome["error"]
+                )
+            )
+
+    failed = [n for n in names if results[n]["status"] == "failed"]
+    if fail_on_error and failed:
+        raise FailedActivity(
+            "{f} failed on {c} of {n} foundation(s): {e}".format(
+                f=func.__name__,
+                c=len(failed),
+                n=len(names),
+                e="; ".join(
+                    "'{n}': {e}".format(n=n, e=results[n]["error"]) for n in failed
+                ),
+            )
+        )
+    return results
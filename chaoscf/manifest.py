@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest of the activities exported by this extension, generated at build
+time so that `chaoscf.discover` may list them without importing and
+introspecting `chaoscf.actions`, `chaoscf.probes` and their multi-foundation
+variants.
+
+Generate it again whenever an action or probe changes, or the version is
+bumped, with:
+
+```
+$ python -m chaoscf.manifest
+```
+
+A manifest generated for another version than the installed one is
+ignored.
+"""
+
+import json
+import os.path
+from typing import List
+
+from chaoslib.types import DiscoveredActivities
+from logzero import logger
+
+__all__ = ["MANIFEST_PATH", "build_manifest", "load_manifest", "write_manifest"]
+
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "activities.json")
+
+# modules whose exported functions are activities, and their type
+ACTIVITY_MODULES = [
+    ("chaoscf.actions", "action"),
+    ("chaoscf.probes", "probe"),
+    ("chaoscf.multi_actions", "action"),
+    ("chaoscf.multi_probes", "probe"),
+]
+
+
+def build_manifest() -> List[DiscoveredActivities]:
+    """
+    Introspect the activity modules, importing them, and return the
+    activities they export.
+    """
+    from chaoslib.discovery.discover import discover_activities
+
+    activities = []
+    for module, activity_type in ACTIVITY_MODULES:
+        activities.extend(discover_activities(module, activity_type))
+    return activities
+
+
+def load_manifest(
+    version: str, path: str = MANIFEST_PATH
+) -> List[DiscoveredActivities]:
+    """
+    Return the activities listed by the manifest at `path`, or `None` when
+    it is missing, cannot be read or was generated for another `version`.
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as x:
+        logger.debug("Cannot read activity manifest '{p}': {x}".format(p=path, x=x))
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get("version") != version:
+        logger.debug(
+            "Activity manifest '{p}' was not generated for version {v}".format(
+                p=path, v=version
+            )
+        )
+        return None
+
+    return manifest.get("activities")
+
+
+def write_manifest(version: str, path: str = MANIFEST_PATH):
+    """
+    Generate the manifest of the activities for `version` at `path`.
+    """
+    manifest = {"version": version, "activities": build_manifest()}
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    logger.info(
+        "Wrote {n} activities to '{p}'".format(n=len(manifest["activities"]), p=path)
+    )
+
+
+if __name__ == "__main__":
+    from chaoscf import __version__
+
+    write_manifest(__version__)
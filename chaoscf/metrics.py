@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+In-process instrumentation of the calls made to the Cloud Foundry API.
+
+Every call made through `chaoscf.api.call_api` or `chaoscf.aio.call_api` is
+recorded in the process-wide `registry`: its method, its path template
+(GUIDs and instance indexes are replaced with `:guid` and `:index`), its
+status code, the size of its body and how long it took, retries included.
+
+`get_metrics` summarises the recorded calls per endpoint and per activity,
+with latency percentiles. Declare the `chaoscf.control` control in your
+experiment to attach that summary to the journal.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from chaoslib.types import Configuration
+
+from chaoscf.stats import percentile
+
+__all__ = [
+    "Metrics",
+    "add_hook",
+    "get_metrics",
+    "is_enabled",
+    "path_template",
+    "registry",
+    "remove_hook",
+    "reset_metrics",
+]
+
+# latency samples kept per endpoint and per activity to compute percentiles
+DEFAULT_MAX_SAMPLES = 10000
+
+PERCENTILES = (50, 90, 95, 99)
+
+GUID_SEGMENT_RE = re.compile(
+    r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?=/|$)", re.I
+)
+INDEX_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+
+class Metrics:
+    """
+    Thread-safe registry of the calls made to the API.
+
+    Hooks added with `add_hook` are called with each recorded call, as a
+    mapping, from the thread which made it.
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.activity = None
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._activities = {}
+
+    def record(
+        self, method: str, path: str, status_code: int, size: int, latency: float
+    ):
+        """
+        Record a call to `path`, which took `latency` seconds and returned
+        `size` bytes.
+        """
+        call = {
+            "method": method.upper(),
+            "path": path_template(path),
+            "status": status_code,
+            "bytes": size,
+            "latency": latency,
+            "activity": self.activity,
+        }
+
+        with self._lock:
+            endpoint = self._endpoints.get((call["method"], call["path"]))
+            if endpoint is None:
+                endpoint = self._endpoints[(call["method"], call["path"])] = (
+                    self._new_series()
+                )
+            self._add(endpoint, call)
+
+            if call["activity"] is not None:
+                activity = self._activities.get(call["activity"])
+                if activity is None:
+                    activity = self._activities[call["activity"]] = self._new_series()
+                self._add(activity, call)
+
+            hooks = list(self._hooks)
+
+        for hook in hooks:
+            hook(call)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarise the recorded calls, overall, per endpoint and per activity.
+        """
+        with self._lock:
+            endpoints = [
+                dict(method=method, path=path, **_summarize(series))
+                for (method, path), series in sorted(self._endpoints.items())
+            ]
+            activities = {
+                name: _summarize(series)
+                for name, series in sorted(self._activities.items())
+            }
+
+        return {
+            "calls": sum(e["calls"] for e in endpoints),
+            "bytes": sum(e["bytes"] for e in endpoints),
+            "errors": sum(e["errors"] for e in endpoints),
+            "endpoints": endpoints,
+            "activities": activities,
+        }
+
+    def add_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def reset(self):
+        """
+        Forget the recorded calls. Hooks are kept.
+        """
+        with self._lock:
+            self._endpoints.clear()
+            self._activities.clear()
+            self.activity = None
+
+    def _new_series(self) -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "errors": 0,
+            "bytes": 0,
+            "statuses": {},
+            "latencies": deque(maxlen=self.max_samples),
+        }
+
+    def _add(self, series: Dict[str, Any], call: Dict[str, Any]):
+        series["calls"] += 1
+        series["bytes"] += call["bytes"]
+        if call["status"] > 399:
+            series["errors"] += 1
+        statuses = series["statuses"]
+        statuses[call["status"]] = statuses.get(call["status"], 0) + 1
+        series["latencies"].append(call["latency"])
+
+
+registry = Metrics()
+
+
+def path_template(path: str) -> str:
+    """
+    Return the path with its GUIDs and instance indexes replaced with `:guid`
+    and `:index` so calls to the same endpoint are grouped together.
+    """
+    path = path.split("?", 1)[0]
+    path = GUID_SEGMENT_RE.sub("/:guid", path)
+    return INDEX_SEGMENT_RE.sub("/:index", path)
+
+
+def is_enabled(configuration: Configuration) -> bool:
+    """
+    Tell whether calls should be recorded, which is the case unless
+    `"cf_metrics"` is set to `false` in the `configuration`.
+    """
+    return bool(configuration.get("cf_metrics", True))
+
+
+def get_metrics() -> Dict[str, Any]:
+    """
+    Summarise the calls recorded so far, see `Metrics.summary`.
+    """
+    return registry.summary()
+
+
+def reset_metrics():
+    """
+    Forget the calls recorded so far.
+    """
+    registry.reset()
+
+
+def add_hook(hook: Callable[[Dict[str, Any]], None]):
+    """
+    Call `hook` with every call recorded from now on.
+    """
+    registry.add_hook(hook)
+
+
+def remove_hook(hook: Callable[[Dict[str, Any]], None]):
+    """
+    Stop calling `hook` with recorded calls.
+    """
+    registry.remove_hook(hook)
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _summarize(series: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = sorted(series["latencies"])
+    latency = {}
+    if latencies:
+        latency["min"] = latencies[0]
+        latency["mean"] = sum(latencies) / len(latencies)
+        for p in PERCENTILES:
+            latency["p{p}".format(p=p)] = percentile(latencies, p)
+        latency["max"] = latencies[-1]
+
+    return {
+        "calls": series["calls"],
+        "errors": series["errors"],
+        "bytes": series["bytes"],
+        "statuses": {str(c): n for c, n in sorted(series["statuses"].items())},
+        "latency": latency,
+    }
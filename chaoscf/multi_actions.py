@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Actions run against every foundation listed in `"cf_foundations"`, or the
+ones given in `foundations`, concurrently, see `chaoscf.foundations`.
+
+They take the same arguments as their counterpart in `chaoscf.actions` and
+return, keyed by foundation name, the `status`, `result`, `error` and
+`duration` of each run. A failure on a foundation does not prevent the
+action from running on the others, but the action fails once they have all
+been tried, listing those it failed on.
+"""
+
+from typing import Any, Dict, List
+
+from chaoslib.types import Configuration, Secrets
+
+from chaoscf import actions
+from chaoscf.concurrency import DEFAULT_MAX_WORKERS
+from chaoscf.foundations import run_on_foundations
+
+__all__ = [
+    "delete_app",
+    "map_route_to_app",
+    "remove_routes_from_app",
+    "start_all_apps",
+    "start_app",
+    "stop_all_apps",
+    "stop_app",
+    "terminate_app_instance",
+    "terminate_random_instances",
+    "terminate_some_random_instance",
+    "unbind_service_from_app",
+    "unmap_route_from_app",
+]
+
+
+def delete_app(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Delete the application on every foundation.
+
+    See `chaoscf.actions.delete_app`.
+    """
+    return run_on_foundations(
+        actions.delete_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def map_route_to_app(
+    app_name: str,
+    host_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Map the route to the application on every foundation.
+
+    See `chaoscf.actions.map_route_to_app`.
+    """
+    return run_on_foundations(
+        actions.map_route_to_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        host_name=host_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def remove_routes_from_app(
+    app_name: str,
+    route_host: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Remove the routes from the application on every foundation.
+
+    See `chaoscf.actions.remove_routes_from_app`.
+    """
+    return run_on_foundations(
+        actions.remove_routes_from_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        route_host=route_host,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def start_all_apps(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Start all the applications of the org on every foundation.
+
+    See `chaoscf.actions.start_all_apps`.
+    """
+    return run_on_foundations(
+        actions.start_all_apps,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        org_name=org_name,
+        max_workers=max_workers,
+    )
+
+
+def start_app(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Start the application on every foundation.
+
+    See `chaoscf.actions.start_app`.
+    """
+    return run_on_foundations(
+        actions.start_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def stop_all_apps(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Stop all the applications of the org on every foundation.
+
+    See `chaoscf.actions.stop_all_apps`.
+    """
+    return run_on_foundations(
+        actions.stop_all_apps,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        org_name=org_name,
+        max_workers=max_workers,
+    )
+
+
+def stop_app(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Stop the application on every foundation.
+
+    See `chaoscf.actions.stop_app`.
+    """
+    return run_on_foundations(
+        actions.stop_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def terminate_app_instance(
+    app_name: str,
+    instance_index: int,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Terminate the instance of the application on every foundation.
+
+    See `chaoscf.actions.terminate_app_instance`.
+    """
+    return run_on_foundations(
+        actions.terminate_app_instance,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        instance_index=instance_index,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def terminate_random_instances(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    count: int = None,
+    percentage: float = None,
+    org_name: str = None,
+    space_name: str = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Terminate a count or a percentage of the instances of the application,
+    picked at random, on every foundation.
+
+    See `chaoscf.actions.terminate_random_instances`.
+    """
+    return run_on_foundations(
+        actions.terminate_random_instances,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        count=count,
+        percentage=percentage,
+        org_name=org_name,
+        space_name=space_name,
+        max_workers=max_workers,
+    )
+
+
+def terminate_some_random_instance(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Terminate a random instance of the application on every foundation.
+
+    See `chaoscf.actions.terminate_some_random_instance`.
+    """
+    return run_on_foundations(
+        actions.terminate_some_random_instance,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def unbind_service_from_app(
+    app_name: str,
+    bind_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Unbind the service from the application on every foundation.
+
+    See `chaoscf.actions.unbind_service_from_app`.
+    """
+    return run_on_foundations(
+        actions.unbind_service_from_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        bind_name=bind_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def unmap_route_from_app(
+    app_name: str,
+    host_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Unmap the route from the application on every foundation.
+
+    See `chaoscf.actions.unmap_route_from_app`.
+    """
+    return run_on_foundations(
+        actions.unmap_route_from_app,
+        configuration,
+        secrets,
+        foundations,
+        fail_on_error=True,
+        app_name=app_name,
+        host_name=host_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
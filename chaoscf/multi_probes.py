@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Probes run against every foundation listed in `"cf_foundations"`, or the
+ones given in `foundations`, concurrently, see `chaoscf.foundations`.
+
+They take the same arguments as their counterpart in `chaoscf.probes` and
+return, keyed by foundation name, the `status`, `result`, `error` and
+`duration` of each run.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+from chaoslib.types import Configuration, Secrets
+
+from chaoscf import probes
+from chaoscf.concurrency import DEFAULT_MAX_WORKERS
+from chaoscf.foundations import run_on_foundations
+from chaoscf.probes import (
+    DEFAULT_MAX_SAMPLES,
+    DEFAULT_POLL_INITIAL_INTERVAL,
+    DEFAULT_POLL_MAX_INTERVAL,
+    DEFAULT_SAMPLING_DURATION,
+    DEFAULT_SAMPLING_INTERVAL,
+    DEFAULT_WAIT_TIMEOUT,
+)
+
+__all__ = [
+    "get_app_stats",
+    "get_org_stats",
+    "list_apps",
+    "sample_app_stats",
+    "wait_for_app_state",
+]
+
+
+def get_app_stats(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    space_name: str = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch the statistics of the application on every foundation.
+
+    See `chaoscf.probes.get_app_stats`.
+    """
+    return run_on_foundations(
+        probes.get_app_stats,
+        configuration,
+        secrets,
+        foundations,
+        app_name=app_name,
+        org_name=org_name,
+        space_name=space_name,
+    )
+
+
+def get_org_stats(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch and aggregate the metrics of the started applications of the org
+    on every foundation.
+
+    See `chaoscf.probes.get_org_stats`.
+    """
+    return run_on_foundations(
+        probes.get_org_stats,
+        configuration,
+        secrets,
+        foundations,
+        org_name=org_name,
+        max_workers=max_workers,
+    )
+
+
+def list_apps(
+    configuration: Configuration,
+    secrets: Secrets,
+    fields: Sequence[str] = None,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    List the applications available to the user on every foundation.
+
+    See `chaoscf.probes.list_apps`.
+    """
+    return run_on_foundations(
+        probes.list_apps,
+        configuration,
+        secrets,
+        foundations,
+        fields=fields,
+    )
+
+
+def sample_app_stats(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    duration: float = DEFAULT_SAMPLING_DURATION,
+    interval: float = DEFAULT_SAMPLING_INTERVAL,
+    org_name: str = None,
+    space_name: str = None,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Sample the metrics of the application over a window of time on every
+    foundation, concurrently.
+
+    See `chaoscf.probes.sample_app_stats`.
+    """
+    return run_on_foundations(
+        probes.sample_app_stats,
+        configuration,
+        secrets,
+        foundations,
+        app_name=app_name,
+        duration=duration,
+        interval=interval,
+        org_name=org_name,
+        space_name=space_name,
+        max_samples=max_samples,
+    )
+
+
+def wait_for_app_state(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    state: str = "RUNNING",
+    instances: int = None,
+    timeout: float = DEFAULT_WAIT_TIMEOUT,
+    org_name: str = None,
+    space_name: str = None,
+    initial_interval: float = DEFAULT_POLL_INITIAL_INTERVAL,
+    max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+    foundations: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Wait until the instances of the application reach the `state` on every
+    foundation, concurrently.
+
+    See `chaoscf.probes.wait_for_app_state`.
+    """
+    return run_on_foundations(
+        probes.wait_for_app_state,
+        configuration,
+        secrets,
+        foundations,
+        app_name=app_name,
+        state=state,
+        instances=instances,
+        timeout=timeout,
+        org_name=org_name,
+        space_name=space_name,
+        initial_interval=initial_interval,
+        max_interval=max_interval,
+    )
@@ -1,21 +1,50 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict
+import math
+import time
+from functools import partial
+from typing import Any, Dict, List, Sequence
 
+from chaoslib.exceptions import FailedActivity
 from chaoslib.types import Configuration, Secrets
+from logzero import logger
 
-from chaoscf.api import call_api, get_app_by_name
+from chaoscf.api import call_api, get_app_by_name, get_apps_for_org, list_resources
+from chaoscf.concurrency import DEFAULT_MAX_WORKERS, run_concurrently
+from chaoscf.stats import RingBuffer, summarize
 
-__all__ = ["get_app_stats", "list_apps"]
+__all__ = [
+    "get_app_stats",
+    "get_org_stats",
+    "list_apps",
+    "sample_app_stats",
+    "wait_for_app_state",
+]
 
+DEFAULT_WAIT_TIMEOUT = 120
+DEFAULT_POLL_INITIAL_INTERVAL = 0.5
+DEFAULT_POLL_MAX_INTERVAL = 10.0
+POLL_BACKOFF_FACTOR = 1.5
 
-def list_apps(configuration: Configuration, secrets: Secrets) -> Dict[str, Any]:
+DEFAULT_SAMPLING_DURATION = 60
+DEFAULT_SAMPLING_INTERVAL = 5.0
+DEFAULT_MAX_SAMPLES = 1000
+
+# usage metrics reported for each running instance
+USAGE_METRICS = ("cpu", "mem", "disk")
+
+
+def list_apps(
+    configuration: Configuration, secrets: Secrets, fields: Sequence[str] = None
+) -> Dict[str, Any]:
     """
     List all applications available to the authorized user.
 
     See https://apidocs.cloudfoundry.org/280/apps/list_all_apps.html to
-    understand the content of the response.
+    understand the content of the response. All the pages are fetched and
+    returned as a single one. Pass the names of the `fields` of the app
+    entities to keep only those, such as `["name", "state"]`.
     """
-    return call_api("/v2/apps", configuration, secrets).json()
+    return list_resources("/v2/apps", configuration, secrets, fields=fields)
 
 
 def get_app_stats(
@@ -40,6 +69,172 @@ def get_app_stats(
     ).json()
 
 
+def get_org_stats(
+    org_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[str, Any]:
+    """
+    Fetch the metrics of all the started applications of the given org and
+    aggregate them.
+
+    The stats of the applications are fetched concurrently, by at most
+    `max_workers` at once. Returns:
+
+    * `samples`: the `cpu`, `mem` and `disk` usage of every instance, along
+      with its `app` name, `guid`, `index` and `state`. Usage is `None` for
+      instances which aren't running
+    * `aggregates`: the `count`, `min`, `mean`, `p50`, `p95`, `p99` and `max`
+      of each of these metrics over the running instances
+    * `failures`: the `app`, `guid` and `error` of the applications whose
+      stats could not be fetched
+
+    See https://apidocs.cloudfoundry.org/280/apps/get_detailed_stats_for_a_started_app.html
+    for more information.
+    """  # noqa: E501
+    apps = get_apps_for_org(org_name, configuration, secrets, fields=["name", "state"])[
+        "resources"
+    ]
+    # stopped applications have no stats to report
+    apps = [a for a in apps if a["entity"]["state"] == "STARTED"]
+
+    outcomes = run_concurrently(
+        partial(_fetch_app_stats, configuration, secrets),
+        [a["metadata"]["guid"] for a in apps],
+        max_workers,
+    )
+
+    samples = []
+    failures = []
+    for app, outcome in zip(apps, outcomes):
+        name = app["entity"]["name"]
+        guid = app["metadata"]["guid"]
+        if outcome["status"] == "failed":
+            failures.append({"app": name, "guid": guid, "error": outcome["error"]})
+            continue
+
+        for sample in _instance_samples(outcome["result"]):
+            samples.append(dict(sample, app=name, guid=guid))
+
+    return {
+        "samples": samples,
+        "aggregates": {
+            metric: summarize(s[metric] for s in samples if s[metric] is not None)
+            for metric in USAGE_METRICS
+        },
+        "failures": failures,
+    }
+
+
+def sample_app_stats(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    duration: float = DEFAULT_SAMPLING_DURATION,
+    interval: float = DEFAULT_SAMPLING_INTERVAL,
+    org_name: str = None,
+    space_name: str = None,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> Dict[str, Any]:
+    """
+    Sample the metrics of the given application every `interval` seconds
+    over `duration` seconds, so that a sustained change in usage can be told
+    apart from a transient spike.
+
+    The application is resolved once and its stats fetched through the same
+    pooled connection for the whole window. The last `max_samples` samples
+    of each instance are kept in fixed-size ring buffers. A poll which fails,
+    for instance while the application restarts, is counted in `errors` and
+    sampling goes on, the activity only fails when every poll failed.
+
+    Returns the `app` name, its `guid`, the number of `polls`, `errors`, the
+    `duration` of the window and, under `instances` keyed by instance index,
+    both a `summary` (see `chaoscf.stats.summarize`) and a `series` of the
+    `cpu`, `mem` and `disk` usage sampled at `t` seconds into the window. The
+    overall `summary` covers all the instances. Usage is `None` in a series
+    when the instance wasn't running at that time.
+
+    See https://apidocs.cloudfoundry.org/280/apps/get_detailed_stats_for_a_started_app.html
+    for more information.
+    """  # noqa: E501
+    if interval <= 0 or duration < 0:
+        raise FailedActivity(
+            "the interval must be positive and the duration must not be negative"
+        )
+
+    app = get_app_by_name(
+        app_name, configuration, secrets, org_name=org_name, space_name=space_name
+    )
+    guid = app["metadata"]["guid"]
+    path = "/v2/apps/{a}/stats".format(a=guid)
+    # cached stats would be stale, revalidate them on every poll
+    configuration = dict(configuration, cf_response_cache_max_age=0)
+
+    capacity = max(1, min(int(max_samples), int(duration // interval) + 1))
+    buffers = {}
+    polls = 0
+    errors = 0
+    start = time.monotonic()
+    while True:
+        at = time.monotonic() - start
+        polls += 1
+        try:
+            stats = call_api(path, configuration, secrets).json()
+        except FailedActivity as x:
+            errors += 1
+            logger.debug("Failed to sample app '{a}': {x}".format(a=app_name, x=x))
+        else:
+            for sample in _instance_samples(stats):
+                buffer = buffers.get(sample["index"])
+                if buffer is None:
+                    buffer = buffers[sample["index"]] = {
+                        k: RingBuffer(capacity) for k in ("t",) + USAGE_METRICS
+                    }
+                buffer["t"].append(at)
+                for metric in USAGE_METRICS:
+                    value = sample[metric]
+                    buffer[metric].append(math.nan if value is None else value)
+
+        # polls are scheduled on a fixed grid so that they don't drift
+        next_at = polls * interval
+        if next_at > duration:
+            break
+        delay = start + next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    if errors == polls:
+        raise FailedActivity(
+            "failed to sample the stats of app '{a}' {p} time(s)".format(
+                a=app_name, p=polls
+            )
+        )
+
+    instances = {}
+    overall = {metric: [] for metric in USAGE_METRICS}
+    for index, buffer in sorted(buffers.items()):
+        summary = {}
+        series = {"t": [round(t, 3) for t in buffer["t"].values()]}
+        for metric in USAGE_METRICS:
+            values = buffer[metric].values()
+            sampled = [v for v in values if not math.isnan(v)]
+            overall[metric].extend(sampled)
+            summary[metric] = summarize(sampled)
+            series[metric] = [None if math.isnan(v) else v for v in values]
+        instances[str(index)] = {"summary": summary, "series": series}
+
+    return {
+        "app": app_name,
+        "guid": guid,
+        "polls": polls,
+        "errors": errors,
+        "duration": time.monotonic() - start,
+        "summary": {metric: summarize(overall[metric]) for metric in USAGE_METRICS},
+        "instances": instances,
+    }
+
+
 def get_app_summary(
     app_name: str,
     configuration: Configuration,
@@ -60,3 +255,103 @@ def get_app_summary(
     return call_api(
         "/v2/apps/{a}/summary".format(a=app["metadata"]["guid"]), configuration, secrets
     ).json()
+
+
+def wait_for_app_state(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    state: str = "RUNNING",
+    instances: int = None,
+    timeout: float = DEFAULT_WAIT_TIMEOUT,
+    org_name: str = None,
+    space_name: str = None,
+    initial_interval: float = DEFAULT_POLL_INITIAL_INTERVAL,
+    max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+) -> Dict[str, Any]:
+    """
+    Wait until the instances of the given application reach the `state`,
+    `RUNNING` by default, and return how long it took.
+
+    All the instances must be in that state, or at least `instances` of them
+    when set. The application is resolved once, then its instances are
+    polled every `initial_interval` seconds at first, backing off up to
+    every `max_interval` seconds, until `timeout` seconds have elapsed, in
+    which case the activity fails. While the API cannot report instances,
+    for instance as the application is still staging, polling goes on.
+
+    Returns the `state`, the number of `instances` in that state, the
+    number of `polls` and the `duration`, in seconds, of the convergence.
+
+    See https://apidocs.cloudfoundry.org/280/apps/get_the_instance_information_for_a_started_app.html
+    """  # noqa: E501
+    start = time.monotonic()
+    deadline = start + timeout
+    app = get_app_by_name(
+        app_name, configuration, secrets, org_name=org_name, space_name=space_name
+    )
+    path = "/v2/apps/{a}/instances".format(a=app["metadata"]["guid"])
+    # cached instances would be stale, revalidate them on every poll
+    configuration = dict(configuration, cf_response_cache_max_age=0)
+
+    interval = initial_interval
+    polls = 0
+    observed = None
+    while True:
+        polls += 1
+        try:
+            current = call_api(path, configuration, secrets).json()
+            observed = [i.get("state") for i in current.values()]
+        except FailedActivity as x:
+            observed = str(x)
+
+        if isinstance(observed, list) and observed:
+            ready = observed.count(state)
+            if ready >= (instances or len(observed)):
+                duration = time.monotonic() - start
+                logger.debug(
+                    "{r} instance(s) of app '{a}' {s} after {d:.3f}s".format(
+                        r=ready, a=app_name, s=state, d=duration
+                    )
+                )
+                return {
+                    "state": state,
+                    "instances": ready,
+                    "polls": polls,
+                    "duration": duration,
+                }
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FailedActivity(
+                "app '{a}' instances did not reach {s} within {t}s, last "
+                "observed: {o}".format(a=app_name, s=state, t=timeout, o=observed)
+            )
+
+        time.sleep(min(interval, remaining))
+        interval = min(max_interval, interval * POLL_BACKOFF_FACTOR)
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _fetch_app_stats(
+    configuration: Configuration, secrets: Secrets, app_guid: str
+) -> Dict[str, Any]:
+    path = "/v2/apps/{a}/stats".format(a=app_guid)
+    return call_api(path, configuration, secrets).json()
+
+
+def _instance_samples(stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten the stats of an application into the usage of each instance,
+    sorted by index.
+    """
+    samples = []
+    for index, instance in sorted(stats.items(), key=lambda i: int(i[0])):
+        usage = (instance.get("stats") or {}).get("usage") or {}
+        sample = {"index": int(index), "state": instance.get("state")}
+        for metric in USAGE_METRICS:
+            sample[metric] = usage.get(metric)
+        samples.append(sample)
+    return samples
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Mapping
+
+from chaoslib.exceptions import FailedActivity
+from chaoslib.types import Configuration
+from logzero import logger
+
+__all__ = ["RateLimiter", "get_rate_limiter"]
+
+# seconds to hold calls back after a 429 which didn't say for how long
+DEFAULT_THROTTLING_DELAY = 1.0
+# longest wait, in seconds, for a call to be let through before giving up
+DEFAULT_MAX_WAIT = 60.0
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter, shared by threads and asyncio tasks alike.
+
+    It combines two limits:
+
+    * an optional token bucket letting through `rate` calls per second on
+      average and bursts of up to `burst` calls
+    * the quota advertised by the Cloud Controller through the
+      `X-RateLimit-Remaining` and `X-RateLimit-Reset` headers, so that once
+      the quota is exhausted, calls wait for it to be reset rather than being
+      rejected with a `429 Too Many Requests`
+
+    Call `acquire` (or `await acquire_async()`) before each call and `update`
+    with each response. A call which would have to wait longer than
+    `max_wait` seconds, until a quota reset an hour away for instance, fails
+    instead.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: float = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._remaining = None
+        self._reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a call may be made.
+
+        Raises `FailedActivity` when that would take longer than `max_wait`.
+        """
+        delay = self._reserve()
+        if delay > 0:
+            logger.debug("Rate limiting, waiting {d:.3f}s".format(d=delay))
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """
+        Wait, without blocking the event loop, until a call may be made.
+
+        Raises `FailedActivity` when that would take longer than `max_wait`.
+        """
+        import asyncio
+
+        delay = self._reserve()
+        if delay > 0:
+            logger.debug("Rate limiting, waiting {d:.3f}s".format(d=delay))
+            await asyncio.sleep(delay)
+
+    def update(self, status_code: int, headers: Mapping[str, str]):
+        """
+        Adjust to the quota the API advertised in its response.
+        """
+        remaining = _as_float(headers.get("X-RateLimit-Remaining"))
+        reset = _as_float(headers.get("X-RateLimit-Reset"))
+        retry_after = _as_float(headers.get("Retry-After"))
+
+        now = time.monotonic()
+        with self._lock:
+            if reset is not None:
+                self._reset_at = now + max(0.0, reset - time.time())
+            if remaining is not None:
+                self._remaining = remaining
+
+            if status_code == 429:
+                self._remaining = 0
+                if retry_after is not None:
+                    self._reset_at = max(self._reset_at, now + retry_after)
+                elif reset is None:
+                    self._reset_at = now + DEFAULT_THROTTLING_DELAY
+                logger.debug(
+                    "API throttled calls, holding them back for {d:.3f}s".format(
+                        d=self._reset_at - now
+                    )
+                )
+
+    def _reserve(self) -> float:
+        """
+        Take a slot and return how long to wait, in seconds, before using it.
+        No slot is taken when the wait would be longer than `max_wait`.
+        """
+        now = time.monotonic()
+        delay = 0.0
+        with self._lock:
+            if self._remaining is not None:
+                if now >= self._reset_at:
+                    # the quota has been reset, until told otherwise
+                    self._remaining = None
+                elif self._remaining <= 0:
+                    delay = self._reset_at - now
+                else:
+                    self._remaining -= 1
+
+            if self.rate:
+                elapsed = now - self._refilled_at
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._refilled_at = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+
+            if self.max_wait is not None and delay > self.max_wait:
+                if self.rate:
+                    self._tokens += 1
+                raise FailedActivity(
+                    "rate limited for {d:.3f}s, longer than the {m}s allowed "
+                    "by 'cf_rate_limit_max_wait'".format(d=delay, m=self.max_wait)
+                )
+
+        return delay
+
+
+def get_rate_limiter(configuration: Configuration) -> RateLimiter:
+    """
+    Return the rate limiter shared by all calls made against the API set in
+    the `configuration`.
+
+    The Cloud Controller's advertised quota is always honoured. In addition,
+    calls may be limited to `"cf_rate_limit"` per second, with bursts of up
+    to `"cf_rate_limit_burst"` calls. Calls wait for
+    `"cf_rate_limit_max_wait"` seconds at most (60 by default).
+    """
+    api_url = configuration.get("cf_api_url")
+    with _limiters_lock:
+        limiter = _limiters.get(api_url)
+        if limiter is None:
+            rate = configuration.get("cf_rate_limit")
+            burst = configuration.get("cf_rate_limit_burst")
+            max_wait = configuration.get("cf_rate_limit_max_wait", DEFAULT_MAX_WAIT)
+            limiter = RateLimiter(
+                float(rate) if rate else None,
+                float(burst) if burst else None,
+                float(max_wait),
+            )
+            _limiters[api_url] = limiter
+
+    return limiter
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _as_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Mapping
+
+from chaoslib.types import Configuration
+from logzero import logger
+
+from chaoscf.ratelimit import get_rate_limiter
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+__all__ = [
+    "RetryPolicy",
+    "TransientError",
+    "get_retry_policy",
+    "raise_for_transient",
+    "send",
+]
+
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF_BASE = 0.5
+DEFAULT_RETRY_BACKOFF_MAX = 30.0
+
+# methods which may safely be sent more than once
+IDEMPOTENT_METHODS = frozenset(["DELETE", "GET", "HEAD", "OPTIONS", "PUT"])
+
+# the gorouter answers these while the Cloud Controller or UAA is unavailable
+TRANSIENT_STATUS_CODES = frozenset([429, 502, 503, 504])
+
+
+class TransientError(Exception):
+    """
+    Raised for a response the API may well answer differently when asked
+    again later.
+    """
+
+    def __init__(self, response: "requests.Response"):
+        super().__init__(
+            "transient failure: {c} {r}".format(
+                c=response.status_code, r=response.reason
+            )
+        )
+        self.response = response
+
+
+class RetryPolicy:
+    """
+    Retry transient failures, up to `attempts` times, waiting a random delay
+    between zero and an exponentially growing ceiling, capped to
+    `backoff_max` seconds, between attempts (the "full jitter" strategy).
+
+    A `Retry-After` header sent by the API takes precedence over a shorter
+    delay, but the call is given up when it asks to wait longer than
+    `backoff_max`.
+
+    Only idempotent methods are retried, except after a
+    `429 Too Many Requests` as the API did not process the call then.
+    """
+
+    def __init__(
+        self,
+        attempts: int = DEFAULT_RETRY_ATTEMPTS,
+        backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX,
+    ):
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def can_retry(
+        self,
+        method: str,
+        attempt: int,
+        status_code: int = None,
+        headers: Mapping[str, str] = None,
+        idempotent: bool = None,
+    ) -> bool:
+        """
+        Tell whether the call may be sent again after its `attempt`-th retry,
+        counting from zero, failed with the given status code and response
+        headers, or with a connection error when it is `None`.
+
+        Whether the call may safely be sent more than once is told by
+        `idempotent`, or guessed from its `method` when it is `None`.
+        """
+        if attempt >= self.attempts:
+            return False
+
+        if status_code is not None and status_code not in TRANSIENT_STATUS_CODES:
+            return False
+
+        retry_after = _retry_after(headers or {})
+        if retry_after is not None and retry_after > self.backoff_max:
+            logger.debug(
+                "Not retrying {m} as Retry-After asks to wait {r:.3f}s, longer "
+                "than 'cf_retry_backoff_max'".format(m=method, r=retry_after)
+            )
+            return False
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return status_code == 429 or idempotent
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Return how long to wait, in seconds, before the `attempt`-th retry,
+        never longer than `backoff_max`.
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2**attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def wait(
+        self,
+        attempt: int,
+        method: str,
+        url: str,
+        reason: str,
+        headers: Mapping[str, str] = None,
+    ):
+        """
+        Log the retry and block until it may be sent.
+        """
+        time.sleep(self._before_retry(attempt, method, url, reason, headers))
+
+    async def wait_async(
+        self,
+        attempt: int,
+        method: str,
+        url: str,
+        reason: str,
+        headers: Mapping[str, str] = None,
+    ):
+        """
+        Log the retry and wait, without blocking the event loop, until it may
+        be sent.
+        """
+        import asyncio
+
+        await asyncio.sleep(self._before_retry(attempt, method, url, reason, headers))
+
+    def _before_retry(
+        self,
+        attempt: int,
+        method: str,
+        url: str,
+        reason: str,
+        headers: Mapping[str, str] = None,
+    ) -> float:
+        headers = headers or {}
+        delay = self.delay(attempt, _retry_after(headers))
+        logger.debug(
+            "Retrying {m} '{u}' in {d:.3f}s after {r} (retry {a}/{n}, "
+            "Request ID: {i})".format(
+                m=method,
+                u=url,
+                d=delay,
+                r=reason,
+                a=attempt + 1,
+                n=self.attempts,
+                i=headers.get("X-VCAP-Request-ID"),
+            )
+        )
+        return delay
+
+
+def get_retry_policy(configuration: Configuration) -> RetryPolicy:
+    """
+    Return the retry policy set in the `configuration`:
+
+    * `"cf_retry_attempts"`: how many times a call is retried, `0` disables
+      retries
+    * `"cf_retry_backoff_base"`: the ceiling, in seconds, of the delay
+      before the first retry, doubling on each retry
+    * `"cf_retry_backoff_max"`: the maximum ceiling of that delay
+    """
+    return RetryPolicy(
+        int(configuration.get("cf_retry_attempts", DEFAULT_RETRY_ATTEMPTS)),
+        float(configuration.get("cf_retry_backoff_base", DEFAULT_RETRY_BACKOFF_BASE)),
+        float(configuration.get("cf_retry_backoff_max", DEFAULT_RETRY_BACKOFF_MAX)),
+    )
+
+
+def send(
+    session: "requests.Session",
+    method: str,
+    url: str,
+    configuration: Configuration,
+    **kwargs
+) -> "requests.Response":
+    """
+    Send the request with the session, through the rate limiter of the API,
+    retrying transient failures as the retry policy of the `configuration`
+    allows. The last response is returned, whatever its status.
+
+    The remaining keyword arguments are passed to `session.request`.
+    """
+    import requests
+
+    limiter = get_rate_limiter(configuration)
+    policy = get_retry_policy(configuration)
+
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            r = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as x:
+            if not policy.can_retry(method, attempt):
+                raise
+            policy.wait(attempt, method, url, str(x))
+            attempt += 1
+            continue
+
+        limiter.update(r.status_code, r.headers)
+        if not policy.can_retry(method, attempt, r.status_code, r.headers):
+            return r
+
+        # release the connection of a streamed response before retrying
+        r.close()
+        reason = "a {c} response".format(c=r.status_code)
+        policy.wait(attempt, method, url, reason, r.headers)
+        attempt += 1
+
+
+def raise_for_transient(response: "requests.Response") -> "requests.Response":
+    """
+    Raise `TransientError` when the response should be retried, return it
+    otherwise. Meant to be registered as a requests-oauthlib compliance hook.
+    """
+    if response.status_code in TRANSIENT_STATUS_CODES:
+        raise TransientError(response)
+    return response
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _retry_after(headers: Mapping[str, str]) -> float:
+    """
+    Parse the `Retry-After` header, given either in seconds or as a date.
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import threading
+from typing import TYPE_CHECKING, Tuple
+
+from chaoslib.types import Configuration
+from logzero import logger
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+__all__ = ["close_sessions", "get_session"]
+
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(configuration: Configuration) -> "requests.Session":
+    """
+    Return the HTTP session shared by every call made against the Cloud
+    Foundry API set in the `configuration`.
+
+    Sessions keep their connections alive so that subsequent calls to the
+    Cloud Controller and UAA reuse them rather than paying for a new TCP and
+    TLS handshake each time. They are registered per `"cf_api_url"` and
+    `"cf_verify_ssl"`.
+
+    The number of connections kept alive per host can be set with the
+    `"cf_http_pool_size"` configuration key, which defaults to
+    `DEFAULT_POOL_SIZE`. It only applies when the session is first created.
+
+    When `"cf_cassette_path"` is set, the exchanges made through the session
+    are recorded to, or replayed from, that cassette, see `chaoscf.cassette`.
+
+    requests is only imported, and urllib3 warnings about unverified TLS
+    connections disabled, once the first session is created, which keeps
+    importing the extension cheap.
+    """
+    key = _session_key(configuration)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            import requests
+            import urllib3
+            from requests.adapters import HTTPAdapter
+
+            from chaoscf.cassette import get_cassette_adapter
+
+            urllib3.disable_warnings()
+            pool_size = int(configuration.get("cf_http_pool_size", DEFAULT_POOL_SIZE))
+            logger.debug(
+                "Creating HTTP session for '{u}' with a pool of {p} "
+                "connections".format(u=key[0], p=pool_size)
+            )
+            session = requests.Session()
+            session.verify = key[1]
+            adapter = get_cassette_adapter(
+                configuration, pool_connections=pool_size, pool_maxsize=pool_size
+            ) or HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+
+    return session
+
+
+def close_sessions():
+    """
+    Close all the HTTP sessions and their pooled connections.
+
+    This is usually called at the end of the experiment, see
+    `chaoscf.control`. Sessions are created again on demand afterwards.
+    """
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+
+    for session in sessions:
+        session.close()
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _session_key(configuration: Configuration) -> Tuple[str, bool, str, str]:
+    return (
+        configuration.get("cf_api_url"),
+        configuration.get("cf_verify_ssl", True),
+        configuration.get("cf_cassette_path"),
+        configuration.get("cf_cassette_mode", "replay"),
+    )
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Summary statistics of samples, such as the usage of app instances.
+
+They are computed in pure Python so that probes don't depend on numpy,
+which would make the extension much heavier to install and import.
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence
+
+__all__ = ["DEFAULT_PERCENTILES", "RingBuffer", "percentile", "summarize"]
+
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of floats keeping the last `size` values appended,
+    backed by an `array` allocated once so that sampling over a long window
+    uses a bounded and compact amount of memory.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("a ring buffer holds one value at least")
+        self._values = array("d", [0.0]) * size
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, len(self._values))
+
+    def append(self, value: float):
+        """
+        Append the value, overwriting the oldest one once the buffer is full.
+        """
+        self._values[self._count % len(self._values)] = value
+        self._count += 1
+
+    def values(self) -> List[float]:
+        """
+        Values held by the buffer, oldest first.
+        """
+        size = len(self._values)
+        count = self._count
+        if count <= size:
+            return self._values[:count].tolist()
+
+        head = count % size
+        return self._values[head:].tolist() + self._values[:head].tolist()
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    Nearest-rank percentile of the sorted values.
+    """
+    rank = -(-p * len(values) // 100)
+    return values[max(0, int(rank) - 1)]
+
+
+def summarize(
+    values: Iterable[float], percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> Dict[str, Any]:
+    """
+    Return the `count`, `min`, `mean`, percentiles, such as `p95`, and `max`
+    of the values. All but the `count` are `None` when there are no values.
+    """
+    values = sorted(values)
+    summary = {"count": len(values), "min": None, "mean": None}
+    for p in percentiles:
+        summary["p{p}".format(p=p)] = None
+    summary["max"] = None
+
+    if values:
+        summary["min"] = values[0]
+        summary["mean"] = sum(values) / len(values)
+        for p in percentiles:
+            summary["p{p}".format(p=p)] = percentile(values, p)
+        summary["max"] = values[-1]
+    return summary
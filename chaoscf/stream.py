@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental parsing of JSON documents received in chunks.
+
+List endpoints of the Cloud Controller answer with an object holding the
+page's resources in an array, next to a few pagination fields. Rather than
+loading the whole page at once, `iter_array_items` yields the items of that
+array one at a time, as soon as they are fully received, so that no more
+than a single resource, and the chunk it arrived with, is held in memory.
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+__all__ = ["iter_array_items"]
+
+WHITESPACE = " \t\n\r"
+# characters which may follow a complete value
+DELIMITERS = WHITESPACE + ",:]}"
+
+_decoder = json.JSONDecoder()
+
+
+def iter_array_items(
+    chunks: Iterable[bytes], key: str = "resources", rest: Dict[str, Any] = None
+) -> Iterator[Any]:
+    """
+    Yield the items of the array held by `key` in the JSON object whose
+    UTF-8 encoded content is given by `chunks`.
+
+    The other members of the object are decoded as a whole and stored into
+    `rest`, when given, so pagination fields are available once the items
+    have all been consumed, whether they come before or after the array.
+
+    Raises `ValueError` when the content is not a JSON object.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            value = reader.value()
+            if rest is not None:
+                rest[name] = value
+
+        if reader.expect(",}") == "}":
+            return
+
+
+###############################################################################
+# Private functions
+###############################################################################
+class _Reader:
+    """
+    Buffer of decoded text filled from the chunks as values are read.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def peek(self) -> str:
+        """
+        Next non-whitespace character, without consuming it.
+        """
+        while True:
+            while self._pos < len(self._buffer):
+                if self._buffer[self._pos] not in WHITESPACE:
+                    return self._buffer[self._pos]
+                self._pos += 1
+            if not self._fill():
+                raise ValueError("unexpected end of the JSON document")
+
+    def expect(self, characters: str) -> str:
+        """
+        Consume the next non-whitespace character, which must be one of
+        `characters`, and return it.
+        """
+        c = self.peek()
+        if c not in characters:
+            raise ValueError(
+                "expected one of '{e}' at position {p} but found '{c}'".format(
+                    e=characters, p=self._pos, c=c
+                )
+            )
+        self._pos += 1
+        return c
+
+    def value(self) -> Any:
+        """
+        Decode the next JSON value, reading chunks until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                value, end = None, None
+
+            # a number may go on in the next chunk, whether it ends the buffer
+            # or is cut right after its dot or exponent, such as `1.` or
+            # `-7e`, so a value is only complete once followed by a delimiter
+            if end is not None and (
+                self._eof
+                or (end < len(self._buffer) and self._buffer[end] in DELIMITERS)
+            ):
+                self._pos = end
+                return value
+
+            if self._eof:
+                # let the decoder report what's wrong with the document
+                _decoder.raw_decode(self._buffer, self._pos)
+
+            # grow the pending text by at least as much as it holds, so that
+            # a value spread over many chunks isn't decoded over and over
+            pending = len(self._buffer) - self._pos
+            while len(self._buffer) - self._pos < 2 * pending and self._fill():
+                pass
+
+    def _fill(self) -> bool:
+        """
+        Append the next chunk to the buffer, dropping the consumed text, and
+        tell whether there was one.
+        """
+        if self._eof:
+            return False
+
+        consumed = self._pos
+        self._buffer = self._buffer[consumed:]
+        self._pos = 0
+        for chunk in self._chunks:
+            text = self._decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+
+        self._eof = True
+        self._buffer += self._decode(b"", final=True)
+        return True
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, Iterator, List
+
+from chaoslib.exceptions import FailedActivity
+from chaoslib.types import Configuration, Secrets
+from logzero import logger
+
+from chaoscf.api import (
+    _get_resolved,
+    _next_page_path,
+    _page_query,
+    _set_resolved,
+    call_api,
+    iter_resources,
+)
+
+__all__ = [
+    "delete_app",
+    "get_app_by_name",
+    "get_org_by_name",
+    "get_process_instances",
+    "get_space_by_name",
+    "is_enabled",
+    "iter_apps",
+    "terminate_app_instance",
+]
+
+
+def is_enabled(configuration: Configuration) -> bool:
+    """
+    Tell whether the actions should talk to the Cloud Controller v3 API,
+    which is the case when `"cf_api_version"` is set to `"v3"` in the
+    `configuration`. The v2 API is used otherwise.
+    """
+    return str(configuration.get("cf_api_version", "v2")).lower() == "v3"
+
+
+def get_org_by_name(
+    org_name: str, configuration: Configuration, secrets: Secrets
+) -> Dict[str, Any]:
+    """
+    Get the organization with the given name.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#list-organizations
+    """
+    key = ("v3", "org", org_name)
+    org = _get_resolved(key, configuration, secrets)
+    if org is not None:
+        return org
+
+    orgs = call_api(
+        "/v3/organizations", configuration, secrets, query={"names": org_name}
+    ).json()
+
+    if not orgs["resources"]:
+        raise FailedActivity("org '{o}' was not found".format(o=org_name))
+
+    return _set_resolved(key, orgs["resources"][0], configuration, secrets)
+
+
+def get_space_by_name(
+    space_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    """
+    Get the space with the given name, optionally restricted to an org.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#list-spaces
+    """
+    if not org_guid and org_name:
+        org_guid = get_org_by_name(org_name, configuration, secrets)["guid"]
+
+    key = ("v3", "space", space_name, org_guid)
+    space = _get_resolved(key, configuration, secrets)
+    if space is not None:
+        return space
+
+    query = {"names": space_name}
+    if org_guid:
+        query["organization_guids"] = org_guid
+
+    spaces = call_api("/v3/spaces", configuration, secrets, query=query).json()
+
+    if not spaces["resources"]:
+        raise FailedActivity("space '{s}' was not found".format(s=space_name))
+
+    return _set_resolved(key, spaces["resources"][0], configuration, secrets)
+
+
+def iter_apps(
+    configuration: Configuration,
+    secrets: Secrets,
+    names: List[str] = None,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the applications matching all the given filters. Many names
+    are looked up at once with a single, server-side filtered, query.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#list-apps
+    """
+    if not org_guid and org_name:
+        org_guid = get_org_by_name(org_name, configuration, secrets)["guid"]
+
+    if not space_guid and space_name:
+        space_guid = get_space_by_name(
+            space_name, configuration, secrets, org_guid=org_guid
+        )["guid"]
+
+    query = {}
+    if names:
+        query["names"] = ",".join(names)
+    if space_guid:
+        query["space_guids"] = space_guid
+    if org_guid:
+        query["organization_guids"] = org_guid
+
+    return iter_resources("/v3/apps", configuration, secrets, query=query)
+
+
+def get_app_by_name(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    """
+    Get the application with the given name.
+
+    When passing space or org names rather than GUIDs, the app is fetched
+    along with its space and org in a single call, using
+    `include=space.organization`, and their names are checked client-side.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#include
+    """
+    key = ("v3", "app", app_name, space_name, space_guid, org_name, org_guid)
+    app = _get_resolved(key, configuration, secrets)
+    if app is not None:
+        return app
+
+    if (space_name and not space_guid) or (org_name and not org_guid):
+        app = _get_app_with_parents(
+            app_name, configuration, secrets, space_name, space_guid, org_name, org_guid
+        )
+        return _set_resolved(key, app, configuration, secrets)
+
+    app = next(
+        iter_apps(
+            configuration,
+            secrets,
+            [app_name],
+            space_name,
+            space_guid,
+            org_name,
+            org_guid,
+        ),
+        None,
+    )
+
+    if not app:
+        raise FailedActivity("app '{a}' was not found".format(a=app_name))
+
+    return _set_resolved(key, app, configuration, secrets)
+
+
+def delete_app(app_guid: str, configuration: Configuration, secrets: Secrets):
+    """
+    Delete the application with the given GUID.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#delete-an-app
+    """
+    path = "/v3/apps/{a}".format(a=app_guid)
+    call_api(path, configuration, secrets, method="DELETE")
+
+
+def get_process_instances(
+    app_guid: str, configuration: Configuration, secrets: Secrets
+) -> List[Dict[str, Any]]:
+    """
+    Get the instances of the application's `web` process, which shares its
+    GUID with the application, along with their `index` and `state`.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#get-stats-for-a-process
+    """
+    path = "/v3/processes/{p}/stats".format(p=app_guid)
+    return call_api(path, configuration, secrets).json()["resources"]
+
+
+def terminate_app_instance(
+    app_guid: str,
+    instance_index: int,
+    configuration: Configuration,
+    secrets: Secrets,
+):
+    """
+    Terminate the instance at the given index of the application's `web`
+    process, which shares its GUID with the application.
+
+    See http://v3-apidocs.cloudfoundry.org/version/3.76.0/#terminate-a-process-instance
+    """  # noqa: E501
+    logger.debug(
+        "Terminating instance {i} of process {p}".format(i=instance_index, p=app_guid)
+    )
+    path = "/v3/processes/{p}/instances/{i}".format(p=app_guid, i=instance_index)
+    call_api(path, configuration, secrets, method="DELETE")
+
+
+###############################################################################
+# Private functions
+###############################################################################
+def _get_app_with_parents(
+    app_name: str,
+    configuration: Configuration,
+    secrets: Secrets,
+    space_name: str = None,
+    space_guid: str = None,
+    org_name: str = None,
+    org_guid: str = None,
+) -> Dict[str, Any]:
+    query = {"names": app_name, "include": "space.organization"}
+    if space_guid:
+        query["space_guids"] = space_guid
+    if org_guid:
+        query["organization_guids"] = org_guid
+
+    path = "/v3/apps"
+    query = _page_query(path, query)
+    while path:
+        page = call_api(path, configuration, secrets, query=query).json()
+        included = page.get("included") or {}
+        spaces = {s["guid"]: s for s in included.get("spaces") or []}
+        orgs = {o["guid"]: o for o in included.get("organizations") or []}
+
+        for app in page.get("resources") or []:
+            space = spaces.get(
+                app["relationships"]["space"]["data"]["guid"], {"relationships": {}}
+            )
+            org = orgs.get(
+                space["relationships"]
+                .get("organization", {})
+                .get("data", {})
+                .get("guid"),
+                {},
+            )
+            if space_name and space.get("name") != space_name:
+                continue
+            if org_name and org.get("name") != org_name:
+                continue
+
+            if org_name:
+                _set_resolved(("v3", "org", org_name), org, configuration, secrets)
+            return app
+
+        path = _next_page_path(page, configuration)
+        query = None
+
+    raise FailedActivity("app '{a}' was not found".format(a=app_name))
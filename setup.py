@@ -72,6 +72,7 @@ setup_params = dict(
     url=url,
     license=license,
     packages=packages,
+    package_data={'chaoscf': ['activities.json']},
     include_package_data=True,
     install_requires=install_require,
     tests_require=test_require,
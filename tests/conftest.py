@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import pytest
+from fixtures.server import FakeCloudFoundry
+
+import chaoscf
+import chaoscf.api
+import chaoscf.ratelimit
+from chaoscf.metrics import reset_metrics
+from chaoscf.session import close_sessions
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    chaoscf.clear_tokens()
+    chaoscf._api_info.clear()
+    chaoscf.api._resolved.clear()
+    chaoscf.api._responses.clear()
+    reset_metrics()
+    yield
+    chaoscf.clear_tokens()
+    chaoscf._api_info.clear()
+    chaoscf.api._resolved.clear()
+    chaoscf.api._responses.clear()
+    chaoscf.ratelimit._limiters.clear()
+    reset_metrics()
+    close_sessions()
+
+
+@pytest.fixture
+def cf_server(monkeypatch):
+    # the fake UAA is served over plain HTTP
+    monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+    with FakeCloudFoundry() as server:
+        yield server
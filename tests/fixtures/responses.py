@@ -186,3 +186,16 @@ binds = {
     "next_url": None,
     "resources": [bind],
 }
+
+app_with_parents = {
+    "metadata": app["metadata"],
+    "entity": dict(
+        app["entity"],
+        space={
+            "metadata": space["metadata"],
+            "entity": dict(space["entity"], organization=org),
+        },
+    ),
+}
+
+apps_with_parents = dict(apps, resources=[app_with_parents])
@@ -0,0 +1,806 @@
+# -*- coding: utf-8 -*-
+"""
+In-process fake of the Cloud Foundry Cloud Controller (v2 and v3) and UAA,
+served over HTTP/1.1 with keep-alive from `127.0.0.1`.
+
+It holds orgs, spaces, apps, routes and service bindings in memory, which
+may be added one by one or seeded in bulk, and paginates, filters and
+inlines them the way the real API does, to the extent this extension relies
+on it. Latency may be added to every response and errors injected for given
+methods and paths.
+
+```python
+with FakeCloudFoundry(latency=0.01) as cf:
+    cf.seed(orgs=1, spaces=2, apps=100)
+    cf.fail("GET", "/v2/apps", status=503, times=2)
+    stop_all_apps("org-0", cf.configuration(), cf.secrets())
+    assert cf.call_count("PUT", "/v2/apps/:guid") == 200
+```
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from chaoscf.metrics import path_template
+
+__all__ = ["FakeCloudFoundry"]
+
+TOKEN = "fake-token"
+V2_DEFAULT_PER_PAGE = 50
+V2_MAX_PER_PAGE = 100
+V3_DEFAULT_PER_PAGE = 50
+V3_MAX_PER_PAGE = 5000
+
+
+class Fault:
+    def __init__(self, method: str, path: str, status: int, times: int, headers):
+        self.method = method.upper()
+        self.path = re.compile(path)
+        self.status = status
+        self.times = times
+        self.headers = headers or {}
+
+
+class FakeCloudFoundry:
+    def __init__(self, latency: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.orgs = {}
+        self.spaces = {}
+        self.apps = {}
+        self.routes = {}
+        self.bindings = {}
+        self.requests = []
+        self.connections = 0
+        self._faults = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    ###########################################################################
+    # Lifecycle
+    ###########################################################################
+    def start(self) -> "FakeCloudFoundry":
+        fake = self
+
+        class Handler(_Handler):
+            cf = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(5)
+
+    def __enter__(self) -> "FakeCloudFoundry":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return "http://{h}:{p}".format(h=host, p=port)
+
+    def configuration(self, **extra) -> Dict[str, Any]:
+        configuration = {"cf_api_url": self.url, "cf_verify_ssl": False}
+        configuration.update(extra)
+        return configuration
+
+    def secrets(self) -> Dict[str, Any]:
+        return {"cf_username": "admin", "cf_password": "admin"}
+
+    ###########################################################################
+    # Data
+    ###########################################################################
+    def add_org(self, name: str) -> str:
+        guid = str(uuid.uuid4())
+        self.orgs[guid] = {"guid": guid, "name": name}
+        return guid
+
+    def add_space(self, name: str, org_guid: str) -> str:
+        guid = str(uuid.uuid4())
+        self.spaces[guid] = {"guid": guid, "name": name, "org_guid": org_guid}
+        return guid
+
+    def add_app(
+        self,
+        name: str,
+        space_guid: str,
+        state: str = "STARTED",
+        instances: int = 1,
+        environment: Dict[str, Any] = None,
+    ) -> str:
+        guid = str(uuid.uuid4())
+        self.apps[guid] = {
+            "guid": guid,
+            "name": name,
+            "space_guid": space_guid,
+            "state": state,
+            "instances": instances,
+            "environment": environment or {},
+            "route_guids": [],
+        }
+        return guid
+
+    def add_route(self, host: str, space_guid: str, app_guid: str = None) -> str:
+        guid = str(uuid.uuid4())
+        self.routes[guid] = {"guid": guid, "host": host, "space_guid": space_guid}
+        if app_guid:
+            self.apps[app_guid]["route_guids"].append(guid)
+        return guid
+
+    def add_binding(
+        self, name: str, app_guid: str, credentials: Dict[str, Any] = None
+    ) -> str:
+        guid = str(uuid.uuid4())
+        self.bindings[guid] = {
+            "guid": guid,
+            "name": name,
+            "app_guid": app_guid,
+            "credentials": credentials or {},
+        }
+        return guid
+
+    def seed(
+        self,
+        orgs: int = 1,
+        spaces: int = 1,
+        apps: int = 1,
+        routes: int = 1,
+        bindings: int = 1,
+        instances: int = 1,
+    ) -> "FakeCloudFoundry":
+        """
+        Add `orgs` orgs named `org-<i>`, each with `spaces` spaces named
+        `space-<j>`, each with `apps` apps named `app-<k>`. Every app gets
+        `routes` routes with hosts `app-<k>-<l>` (or `app-<k>` for the first)
+        and `bindings` service bindings named `binding-<m>`.
+        """
+        for i in range(orgs):
+            org_guid = self.add_org("org-{i}".format(i=i))
+            for j in range(spaces):
+                space_guid = self.add_space("space-{j}".format(j=j), org_guid)
+                for k in range(apps):
+                    name = "app-{k}".format(k=k)
+                    app_guid = self.add_app(name, space_guid, instances=instances)
+                    for r in range(routes):
+                        host = name if r == 0 else "{n}-{r}".format(n=name, r=r)
+                        self.add_route(host, space_guid, app_guid)
+                    for b in range(bindings):
+                        self.add_binding("binding-{b}".format(b=b), app_guid)
+        return self
+
+    ###########################################################################
+    # Faults and observations
+    ###########################################################################
+    def fail(
+        self,
+        method: str,
+        path: str,
+        status: int = 503,
+        times: int = 1,
+        headers: Dict[str, str] = None,
+    ):
+        """
+        Answer the next `times` requests whose method and path, matched as a
+        regular expression against the whole path, with `status`.
+        """
+        with self._lock:
+            self._faults.append(Fault(method, path, status, times, headers))
+
+    def call_count(self, method: str = None, template: str = None) -> int:
+        """
+        Count the requests received, optionally only those with the given
+        method and path template, such as `/v2/apps/:guid`.
+        """
+        return len(
+            [
+                r
+                for r in self.requests
+                if (method is None or r[0] == method.upper())
+                and (template is None or path_template(r[1]) == template)
+            ]
+        )
+
+    def reset_requests(self):
+        self.requests.clear()
+        self.connections = 0
+
+    ###########################################################################
+    # Dispatching
+    ###########################################################################
+    def handle(
+        self, method: str, target: str, headers, body: Any
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/")
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        self.requests.append((method, path, query))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        fault = self._take_fault(method, path)
+        if fault:
+            return fault.status, {"error": "injected"}, fault.headers
+
+        if method == "GET" and path == "/v2/info":
+            return 200, {"authorization_endpoint": self.url}, {}
+        if method == "POST" and path == "/oauth/token":
+            return 200, _token(), {}
+
+        if headers.get("Authorization", "").lower() != "bearer " + TOKEN:
+            return 401, {"error": "invalid_token"}, {}
+
+        for route_method, pattern, handler in _ROUTES:
+            if route_method != method:
+                continue
+            m = pattern.fullmatch(path)
+            if m:
+                with self._lock:
+                    return handler(self, query, body, *m.groups())
+
+        return 404, {"error": "not found"}, {}
+
+    def _take_fault(self, method: str, path: str) -> Fault:
+        with self._lock:
+            for fault in self._faults:
+                if fault.method == method and fault.path.fullmatch(path):
+                    fault.times -= 1
+                    if fault.times <= 0:
+                        self._faults.remove(fault)
+                    return fault
+        return None
+
+    ###########################################################################
+    # v2 representations
+    ###########################################################################
+    def _v2_org(self, org: Dict[str, Any]) -> Dict[str, Any]:
+        return _v2("organizations", org["guid"], {"name": org["name"]})
+
+    def _v2_space(self, space: Dict[str, Any], depth: int = 0) -> Dict[str, Any]:
+        entity = {"name": space["name"], "organization_guid": space["org_guid"]}
+        if depth > 0:
+            entity["organization"] = self._v2_org(self.orgs[space["org_guid"]])
+        return _v2("spaces", space["guid"], entity)
+
+    def _v2_app(self, app: Dict[str, Any], depth: int = 0) -> Dict[str, Any]:
+        entity = {
+            "name": app["name"],
+            "space_guid": app["space_guid"],
+            "state": app["state"],
+            "instances": app["instances"],
+            "environment_json": app["environment"],
+            "routes_url": "/v2/apps/{g}/routes".format(g=app["guid"]),
+            "service_bindings_url": "/v2/apps/{g}/service_bindings".format(
+                g=app["guid"]
+            ),
+        }
+        if depth > 0:
+            entity["space"] = self._v2_space(self.spaces[app["space_guid"]], depth - 1)
+        return _v2("apps", app["guid"], entity)
+
+    def _v2_route(self, route: Dict[str, Any]) -> Dict[str, Any]:
+        return _v2(
+            "routes",
+            route["guid"],
+            {"host": route["host"], "space_guid": route["space_guid"]},
+        )
+
+    def _v2_binding(self, binding: Dict[str, Any]) -> Dict[str, Any]:
+        return _v2(
+            "service_bindings",
+            binding["guid"],
+            {
+                "name": binding["name"],
+                "app_guid": binding["app_guid"],
+                "credentials": binding["credentials"],
+            },
+        )
+
+    def _org_of(self, record: Dict[str, Any]) -> str:
+        return self.spaces[record["space_guid"]]["org_guid"]
+
+    ###########################################################################
+    # v2 endpoints
+    ###########################################################################
+    def list_v2_orgs(self, query, body):
+        filters = _v2_filters(query)
+        orgs = [o for o in self.orgs.values() if _match(filters, name=o["name"])]
+        return _v2_page("/v2/organizations", query, orgs, self._v2_org)
+
+    def list_v2_spaces(self, query, body):
+        filters = _v2_filters(query)
+        spaces = [
+            s
+            for s in self.spaces.values()
+            if _match(filters, name=s["name"], organization_guid=s["org_guid"])
+        ]
+        return _v2_page("/v2/spaces", query, spaces, self._v2_space)
+
+    def list_v2_apps(self, query, body):
+        filters = _v2_filters(query)
+        apps = [
+            a
+            for a in self.apps.values()
+            if _match(
+                filters,
+                name=a["name"],
+                space_guid=a["space_guid"],
+                organization_guid=self._org_of(a),
+            )
+        ]
+        depth = int(dict(query).get("inline-relations-depth", 0))
+        return _v2_page(
+            "/v2/apps", query, apps, lambda a: self._v2_app(a, min(depth, 2))
+        )
+
+    def list_v2_routes(self, query, body):
+        filters = _v2_filters(query)
+        routes = [
+            r
+            for r in self.routes.values()
+            if _match(
+                filters,
+                host=r["host"],
+                space_guid=r["space_guid"],
+                organization_guid=self._org_of(r),
+            )
+        ]
+        return _v2_page("/v2/routes", query, routes, self._v2_route)
+
+    def get_v2_app(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        return 200, self._v2_app(app), {}
+
+    def update_v2_app(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        for key in ("name", "state", "instances"):
+            if key in (body or {}):
+                app[key] = body[key]
+        return 201, self._v2_app(app), {}
+
+    def delete_v2_app(self, query, body, app_guid):
+        if not self.apps.pop(app_guid, None):
+            return _not_found()
+        return 204, None, {}
+
+    def get_v2_app_instances(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        if app["state"] != "STARTED":
+            return 400, {"error_code": "CF-AppStoppedStatsError"}, {}
+        return (
+            200,
+            {
+                str(i): {"state": "RUNNING", "since": 1500000000.0}
+                for i in range(app["instances"])
+            },
+            {},
+        )
+
+    def delete_v2_app_instance(self, query, body, app_guid, index):
+        app = self.apps.get(app_guid)
+        if not app or int(index) >= app["instances"]:
+            return _not_found()
+        return 204, None, {}
+
+    def get_v2_app_stats(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        if app["state"] != "STARTED":
+            return 400, {"error_code": "CF-AppStoppedStatsError"}, {}
+        return 200, {str(i): self._stats() for i in range(app["instances"])}, {}
+
+    def get_v2_app_summary(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        summary = dict(self._v2_app(app)["entity"], guid=app_guid)
+        summary["routes"] = [
+            dict(self._v2_route(self.routes[g])["entity"], guid=g)
+            for g in app["route_guids"]
+            if g in self.routes
+        ]
+        summary["running_instances"] = (
+            app["instances"] if app["state"] == "STARTED" else 0
+        )
+        return 200, summary, {}
+
+    def list_v2_app_routes(self, query, body, app_guid):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        filters = _v2_filters(query)
+        routes = [
+            self.routes[g]
+            for g in app["route_guids"]
+            if g in self.routes and _match(filters, host=self.routes[g]["host"])
+        ]
+        return _v2_page(
+            "/v2/apps/{g}/routes".format(g=app_guid), query, routes, self._v2_route
+        )
+
+    def map_v2_app_route(self, query, body, app_guid, route_guid):
+        app = self.apps.get(app_guid)
+        if not app or route_guid not in self.routes:
+            return _not_found()
+        if route_guid not in app["route_guids"]:
+            app["route_guids"].append(route_guid)
+        return 201, self._v2_app(app), {}
+
+    def unmap_v2_app_route(self, query, body, app_guid, route_guid):
+        app = self.apps.get(app_guid)
+        if not app or route_guid not in app["route_guids"]:
+            return _not_found()
+        app["route_guids"].remove(route_guid)
+        return 204, None, {}
+
+    def list_v2_app_bindings(self, query, body, app_guid):
+        if app_guid not in self.apps:
+            return _not_found()
+        bindings = [b for b in self.bindings.values() if b["app_guid"] == app_guid]
+        return _v2_page(
+            "/v2/apps/{g}/service_bindings".format(g=app_guid),
+            query,
+            bindings,
+            self._v2_binding,
+        )
+
+    def delete_v2_binding(self, query, body, binding_guid):
+        if not self.bindings.pop(binding_guid, None):
+            return _not_found()
+        return 204, None, {}
+
+    ###########################################################################
+    # v3 representations and endpoints
+    ###########################################################################
+    def _v3_org(self, org: Dict[str, Any]) -> Dict[str, Any]:
+        return {"guid": org["guid"], "name": org["name"]}
+
+    def _v3_space(self, space: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "guid": space["guid"],
+            "name": space["name"],
+            "relationships": {"organization": {"data": {"guid": space["org_guid"]}}},
+        }
+
+    def _v3_app(self, app: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "guid": app["guid"],
+            "name": app["name"],
+            "state": app["state"],
+            "relationships": {"space": {"data": {"guid": app["space_guid"]}}},
+        }
+
+    def list_v3_orgs(self, query, body):
+        names = _v3_filter(query, "names")
+        orgs = [o for o in self.orgs.values() if names is None or o["name"] in names]
+        return self._v3_page("/v3/organizations", query, orgs, self._v3_org)
+
+    def list_v3_spaces(self, query, body):
+        names = _v3_filter(query, "names")
+        org_guids = _v3_filter(query, "organization_guids")
+        spaces = [
+            s
+            for s in self.spaces.values()
+            if (names is None or s["name"] in names)
+            and (org_guids is None or s["org_guid"] in org_guids)
+        ]
+        return self._v3_page("/v3/spaces", query, spaces, self._v3_space)
+
+    def list_v3_apps(self, query, body):
+        names = _v3_filter(query, "names")
+        space_guids = _v3_filter(query, "space_guids")
+        org_guids = _v3_filter(query, "organization_guids")
+        apps = [
+            a
+            for a in self.apps.values()
+            if (names is None or a["name"] in names)
+            and (space_guids is None or a["space_guid"] in space_guids)
+            and (org_guids is None or self._org_of(a) in org_guids)
+        ]
+        status, page, headers = self._v3_page("/v3/apps", query, apps, self._v3_app)
+
+        if dict(query).get("include") == "space.organization":
+            spaces = {
+                r["relationships"]["space"]["data"]["guid"] for r in page["resources"]
+            }
+            orgs = {self.spaces[g]["org_guid"] for g in spaces}
+            page["included"] = {
+                "spaces": [self._v3_space(self.spaces[g]) for g in sorted(spaces)],
+                "organizations": [self._v3_org(self.orgs[g]) for g in sorted(orgs)],
+            }
+        return status, page, headers
+
+    def update_v3_app_state(self, query, body, app_guid, action):
+        app = self.apps.get(app_guid)
+        if not app:
+            return _not_found()
+        app["state"] = "STARTED" if action == "start" else "STOPPED"
+        return 200, self._v3_app(app), {}
+
+    def delete_v3_app(self, query, body, app_guid):
+        if not self.apps.pop(app_guid, None):
+            return _not_found()
+        return 202, None, {}
+
+    def get_v3_process_stats(self, query, body, process_guid):
+        app = self.apps.get(process_guid)
+        if not app:
+            return _not_found()
+        state = "RUNNING" if app["state"] == "STARTED" else "DOWN"
+        return (
+            200,
+            {
+                "resources": [
+                    {"type": "web", "index": i, "state": state}
+                    for i in range(app["instances"])
+                ]
+            },
+            {},
+        )
+
+    def delete_v3_process_instance(self, query, body, process_guid, index):
+        app = self.apps.get(process_guid)
+        if not app or int(index) >= app["instances"]:
+            return _not_found()
+        return 204, None, {}
+
+    def _v3_page(self, path, query, records, render):
+        params = dict(query)
+        page = max(1, int(params.get("page", 1)))
+        per_page = min(
+            V3_MAX_PER_PAGE, int(params.get("per_page", V3_DEFAULT_PER_PAGE))
+        )
+        total_pages = max(1, -(-len(records) // per_page))
+
+        def link(number):
+            if number < 1 or number > total_pages:
+                return None
+            return {
+                "href": "{u}{p}?{q}".format(
+                    u=self.url, p=path, q=_with_page(query, "page", number)
+                )
+            }
+
+        start = (page - 1) * per_page
+        end = start + per_page
+        return (
+            200,
+            {
+                "pagination": {
+                    "total_results": len(records),
+                    "total_pages": total_pages,
+                    "first": link(1),
+                    "last": link(total_pages),
+                    "next": link(page + 1),
+                    "previous": link(page - 1),
+                },
+                "resources": [render(r) for r in records[start:end]],
+            },
+            {},
+        )
+
+    def _stats(self) -> Dict[str, Any]:
+        return {
+            "state": "RUNNING",
+            "stats": {
+                "usage": {
+                    "cpu": round(self._random.uniform(0, 1), 4),
+                    "mem": self._random.randint(64, 512) * 1024 * 1024,
+                    "disk": self._random.randint(64, 1024) * 1024 * 1024,
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                },
+                "mem_quota": 1024 * 1024 * 1024,
+                "disk_quota": 1024 * 1024 * 1024,
+                "uptime": 3600,
+            },
+        }
+
+
+_GUID = r"([0-9a-f-]{36})"
+_ROUTES = [
+    ("GET", re.compile(r"/v2/organizations"), FakeCloudFoundry.list_v2_orgs),
+    ("GET", re.compile(r"/v2/spaces"), FakeCloudFoundry.list_v2_spaces),
+    ("GET", re.compile(r"/v2/apps"), FakeCloudFoundry.list_v2_apps),
+    ("GET", re.compile(r"/v2/routes"), FakeCloudFoundry.list_v2_routes),
+    ("GET", re.compile(r"/v2/apps/" + _GUID), FakeCloudFoundry.get_v2_app),
+    ("PUT", re.compile(r"/v2/apps/" + _GUID), FakeCloudFoundry.update_v2_app),
+    ("DELETE", re.compile(r"/v2/apps/" + _GUID), FakeCloudFoundry.delete_v2_app),
+    (
+        "GET",
+        re.compile(r"/v2/apps/" + _GUID + r"/instances"),
+        FakeCloudFoundry.get_v2_app_instances,
+    ),
+    (
+        "DELETE",
+        re.compile(r"/v2/apps/" + _GUID + r"/instances/(\d+)"),
+        FakeCloudFoundry.delete_v2_app_instance,
+    ),
+    (
+        "GET",
+        re.compile(r"/v2/apps/" + _GUID + r"/stats"),
+        FakeCloudFoundry.get_v2_app_stats,
+    ),
+    (
+        "GET",
+        re.compile(r"/v2/apps/" + _GUID + r"/summary"),
+        FakeCloudFoundry.get_v2_app_summary,
+    ),
+    (
+        "GET",
+        re.compile(r"/v2/apps/" + _GUID + r"/routes"),
+        FakeCloudFoundry.list_v2_app_routes,
+    ),
+    (
+        "PUT",
+        re.compile(r"/v2/apps/" + _GUID + r"/routes/" + _GUID),
+        FakeCloudFoundry.map_v2_app_route,
+    ),
+    (
+        "DELETE",
+        re.compile(r"/v2/apps/" + _GUID + r"/routes/" + _GUID),
+        FakeCloudFoundry.unmap_v2_app_route,
+    ),
+    (
+        "GET",
+        re.compile(r"/v2/apps/" + _GUID + r"/service_bindings"),
+        FakeCloudFoundry.list_v2_app_bindings,
+    ),
+    (
+        "DELETE",
+        re.compile(r"/v2/service_bindings/" + _GUID),
+        FakeCloudFoundry.delete_v2_binding,
+    ),
+    ("GET", re.compile(r"/v3/organizations"), FakeCloudFoundry.list_v3_orgs),
+    ("GET", re.compile(r"/v3/spaces"), FakeCloudFoundry.list_v3_spaces),
+    ("GET", re.compile(r"/v3/apps"), FakeCloudFoundry.list_v3_apps),
+    (
+        "POST",
+        re.compile(r"/v3/apps/" + _GUID + r"/actions/(start|stop)"),
+        FakeCloudFoundry.update_v3_app_state,
+    ),
+    ("DELETE", re.compile(r"/v3/apps/" + _GUID), FakeCloudFoundry.delete_v3_app),
+    (
+        "GET",
+        re.compile(r"/v3/processes/" + _GUID + r"/stats"),
+        FakeCloudFoundry.get_v3_process_stats,
+    ),
+    (
+        "DELETE",
+        re.compile(r"/v3/processes/" + _GUID + r"/instances/(\d+)"),
+        FakeCloudFoundry.delete_v3_process_instance,
+    ),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body at once, rather than waiting for delayed ACKs
+    disable_nagle_algorithm = True
+    cf = None
+
+    def setup(self):
+        super().setup()
+        with self.cf._lock:
+            self.cf.connections += 1
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        body = None
+        if raw and "json" in (self.headers.get("Content-Type") or ""):
+            body = json.loads(raw)
+
+        status, payload, headers = self.cf.handle(
+            self.command, self.path, self.headers, body
+        )
+
+        content = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("X-VCAP-Request-ID", str(uuid.uuid4()))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _token() -> Dict[str, Any]:
+    return {
+        "access_token": TOKEN,
+        "token_type": "bearer",
+        "refresh_token": "fake-refresh-token",
+        "expires_in": 599,
+        "scope": ["cloud_controller.admin"],
+        "jti": str(uuid.uuid4()),
+    }
+
+
+def _not_found() -> Tuple[int, Any, Dict[str, str]]:
+    return 404, {"error_code": "CF-NotFound"}, {}
+
+
+def _v2(collection: str, guid: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "metadata": {
+            "guid": guid,
+            "url": "/v2/{c}/{g}".format(c=collection, g=guid),
+        },
+        "entity": entity,
+    }
+
+
+def _v2_filters(query: List[Tuple[str, str]]) -> Dict[str, str]:
+    return dict(v.split(":", 1) for k, v in query if k == "q" and ":" in v)
+
+
+def _v3_filter(query: List[Tuple[str, str]], name: str) -> List[str]:
+    value = dict(query).get(name)
+    return value.split(",") if value is not None else None
+
+
+def _match(filters: Dict[str, str], **fields) -> bool:
+    return all(fields.get(k) == v for k, v in filters.items())
+
+
+def _with_page(query: List[Tuple[str, str]], key: str, number: int) -> str:
+    return urlencode([(k, v) for k, v in query if k != key] + [(key, str(number))])
+
+
+def _v2_page(path, query, records, render):
+    params = dict(query)
+    page = max(1, int(params.get("page", 1)))
+    per_page = min(
+        V2_MAX_PER_PAGE, int(params.get("results-per-page", V2_DEFAULT_PER_PAGE))
+    )
+    total_pages = max(1, -(-len(records) // per_page))
+
+    def link(number):
+        if number < 1 or number > total_pages:
+            return None
+        return "{p}?{q}".format(p=path, q=_with_page(query, "page", number))
+
+    start = (page - 1) * per_page
+    end = start + per_page
+    return (
+        200,
+        {
+            "total_results": len(records),
+            "total_pages": total_pages,
+            "prev_url": link(page - 1),
+            "next_url": link(page + 1),
+            "resources": [render(r) for r in records[start:end]],
+        },
+        {},
+    )
@@ -10,6 +10,7 @@ import chaoscf
 from chaoscf.actions import (
     delete_app,
     map_route_to_app,
+    remove_routes_from_app,
     start_all_apps,
     start_app,
     stop_all_apps,
@@ -31,6 +32,7 @@ def test_all_lists_the_actions_exposed():
         "stop_all_apps",
         "stop_app",
         "terminate_app_instance",
+        "terminate_random_instances",
         "terminate_some_random_instance",
         "unbind_service_from_app",
         "unmap_route_from_app",
@@ -61,7 +63,7 @@ def test_fail_to_delete_unknown_app(call_api, get_app_by_name):
 def test_delete_app(call_api, get_app_by_name):
     get_app_by_name.return_value = responses.app
     call_api.return_value = responses.FakeResponse(status_code=200)
-    delete_app("my-app", config, secrets)
+    delete_app("my-app", config.config, secrets.secrets)
 
 
 @patch("chaoscf.api.auth", autospec=True)
@@ -133,7 +135,7 @@ def test_unbind_service_from_app(auth):
         m.get(
             "https://example.com/v2/apps/"
             + responses.app["metadata"]["guid"]
-            + "/service_bindings",
+            + "/service_bindings?results-per-page=100",
             status_code=200,
             json=responses.binds,
             complete_qs=True,
@@ -161,7 +163,9 @@ def test_unmap_route_from_app(auth):
         )
 
         m.get(
-            "https://example.com/v2/apps/{app}/routes".format(app=app_guid),
+            "https://example.com/v2/apps/{app}/routes?results-per-page=100".format(
+                app=app_guid
+            ),
             status_code=200,
             json=responses.routes,
             complete_qs=True,
@@ -191,7 +195,9 @@ def test_map_route_to_app(auth):
         )
 
         m.get(
-            "https://example.com/v2/routes?q=host:whatever".format(app=app_guid),
+            "https://example.com/v2/routes?q=host:whatever&results-per-page=100".format(
+                app=app_guid
+            ),
             status_code=200,
             json=responses.routes,
             complete_qs=True,
@@ -223,38 +229,72 @@ def test_stop_app(auth, get_app_by_name):
     assert mock.call_count == 1
 
 
-@patch("chaoscf.actions.start_app", autospec=True)
+@patch("chaoscf.actions.call_api", autospec=True)
 @patch("chaoscf.actions.get_apps_for_org", autospec=True, return_value=responses.apps)
-def test_start_all_apps(get_apps_for_org, start_app):
+def test_start_all_apps(get_apps_for_org, call_api):
     org_name = "CF_ORG_NAME"
-    start_all_apps(org_name, config.config, secrets.secrets)
+    results = start_all_apps(org_name, config.config, secrets.secrets)
 
     get_apps_for_org.assert_has_calls([call(org_name, config.config, secrets.secrets)])
-    start_app.assert_has_calls(
+    call_api.assert_has_calls(
         [
             call(
-                app["entity"]["name"], config.config, secrets.secrets, org_name=org_name
+                "/v2/apps/{a}".format(a=app["metadata"]["guid"]),
+                config.config,
+                secrets.secrets,
+                method="PUT",
+                body={"state": "STARTED"},
             )
             for app in responses.apps["resources"]
         ]
     )
+    assert [r["status"] for r in results] == ["succeeded"]
+    assert results[0]["guid"] == responses.app["metadata"]["guid"]
 
 
-@patch("chaoscf.actions.stop_app", autospec=True)
+@patch("chaoscf.actions.call_api", autospec=True)
 @patch("chaoscf.actions.get_apps_for_org", autospec=True, return_value=responses.apps)
-def test_stop_all_apps(get_apps_for_org, stop_app):
+def test_stop_all_apps(get_apps_for_org, call_api):
     org_name = "CF_ORG_NAME"
-    stop_all_apps(org_name, config.config, secrets.secrets)
+    results = stop_all_apps(org_name, config.config, secrets.secrets)
 
     get_apps_for_org.assert_has_calls([call(org_name, config.config, secrets.secrets)])
-    stop_app.assert_has_calls(
+    call_api.assert_has_calls(
         [
             call(
-                app["entity"]["name"], config.config, secrets.secrets, org_name=org_name
+                "/v2/apps/{a}".format(a=app["metadata"]["guid"]),
+                config.config,
+                secrets.secrets,
+                method="PUT",
+                body={"state": "STOPPED"},
             )
             for app in responses.apps["resources"]
         ]
     )
+    assert [r["status"] for r in results] == ["succeeded"]
+    assert results[0]["name"] == "my-app"
+
+
+@patch("chaoscf.actions.call_api", autospec=True)
+@patch("chaoscf.actions.get_apps_for_org", autospec=True)
+def test_stop_all_apps_fails_once_every_app_was_tried(get_apps_for_org, call_api):
+    apps = [
+        {"metadata": {"guid": "guid-{i}".format(i=i)}, "entity": {"name": str(i)}}
+        for i in range(5)
+    ]
+    get_apps_for_org.return_value = dict(responses.apps, resources=apps)
+
+    def update(path, *args, **kwargs):
+        if path == "/v2/apps/guid-2":
+            raise FailedActivity("boom")
+
+    call_api.side_effect = update
+
+    with pytest.raises(FailedActivity) as x:
+        stop_all_apps("my-org", config.config, secrets.secrets, max_workers=2)
+
+    assert call_api.call_count == 5
+    assert "failed to set 1 of 5 application(s) to STOPPED: '2': boom" in str(x.value)
 
 
 @patch("chaoscf.actions.get_app_by_name", autospec=True)
@@ -270,3 +310,36 @@ def test_start_app(auth, get_app_by_name):
         start_app("my-app", config.config, secrets.secrets)
 
     assert mock.call_count == 1
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_remove_routes_from_app(auth):
+    auth.return_value = responses.auth_response
+    route_guid = responses.route["metadata"]["guid"]
+    app_guid = responses.app["metadata"]["guid"]
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps?q=name:my-app",
+            status_code=200,
+            json=responses.apps,
+            complete_qs=True,
+        )
+
+        m.get(
+            "https://example.com/v2/apps/{a}/routes?q=host:whatever"
+            "&results-per-page=100".format(a=app_guid),
+            status_code=200,
+            json=responses.routes,
+            complete_qs=True,
+        )
+
+        m.delete(
+            "https://example.com/v2/apps/{a}/routes/{r}".format(
+                a=app_guid, r=route_guid
+            ),
+            status_code=204,
+        )
+
+        remove_routes_from_app("my-app", "whatever", config.config, secrets.secrets)
+
+        assert m.call_count == 3
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import pytest
+from chaoslib.exceptions import FailedActivity
+
+import chaoscf.api
+from chaoscf import aio
+from chaoscf.actions import stop_all_apps
+from chaoscf.api import get_app_by_name
+
+
+def test_call_api(cf_server):
+    cf_server.seed(apps=2, routes=0, bindings=0)
+
+    async def call():
+        r = await aio.call_api(
+            "/v2/apps",
+            cf_server.configuration(),
+            cf_server.secrets(),
+            query={"q": "name:app-1"},
+        )
+        return await r.json()
+
+    apps = aio.run(call())
+
+    assert apps["total_results"] == 1
+    assert apps["resources"][0]["entity"]["name"] == "app-1"
+    assert ("GET", "/v2/apps", [("q", "name:app-1")]) in cf_server.requests
+
+
+def test_call_api_fails_on_error_status(cf_server):
+    cf_server.fail("GET", "/v2/apps", status=500)
+
+    with pytest.raises(FailedActivity) as x:
+        aio.run(
+            aio.call_api("/v2/apps", cf_server.configuration(), cf_server.secrets())
+        )
+    assert "500" in str(x.value)
+
+
+@patch("asyncio.sleep", autospec=True)
+def test_call_api_retries_transient_failures(sleep, cf_server):
+    cf_server.seed(apps=1, routes=0, bindings=0)
+    cf_server.fail("GET", "/v2/apps", status=503)
+
+    r = aio.run(
+        aio.call_api("/v2/apps", cf_server.configuration(), cf_server.secrets())
+    )
+
+    assert r.status == 200
+    assert cf_server.call_count("GET", "/v2/apps") == 2
+    assert sleep.call_count == 1
+
+
+def test_get_app_by_name(cf_server):
+    cf_server.seed(orgs=2, spaces=2, apps=2, routes=0, bindings=0)
+
+    app = aio.run(
+        aio.get_app_by_name(
+            "app-1",
+            cf_server.configuration(),
+            cf_server.secrets(),
+            org_name="org-1",
+            space_name="space-0",
+        )
+    )
+
+    space = cf_server.spaces[app["entity"]["space_guid"]]
+    assert app["entity"]["name"] == "app-1"
+    assert space["name"] == "space-0"
+    assert cf_server.orgs[space["org_guid"]]["name"] == "org-1"
+    assert cf_server.call_count("GET", "/v2/apps") == 1
+
+
+def test_get_app_by_name_filtered_by_space_guid(cf_server):
+    cf_server.seed(spaces=2, apps=2, routes=0, bindings=0)
+    configuration = cf_server.configuration()
+    space_guid = next(g for g, s in cf_server.spaces.items() if s["name"] == "space-1")
+
+    async_app = aio.run(
+        aio.get_app_by_name(
+            "app-1",
+            configuration,
+            cf_server.secrets(),
+            space_name="space-1",
+            space_guid=space_guid,
+        )
+    )
+    chaoscf.api._resolved.clear()
+    app = get_app_by_name(
+        "app-1",
+        configuration,
+        cf_server.secrets(),
+        space_name="space-1",
+        space_guid=space_guid,
+    )
+
+    assert async_app["metadata"]["guid"] == app["metadata"]["guid"]
+    assert async_app["entity"]["space_guid"] == space_guid
+
+
+def test_iter_resources_follows_next_url(cf_server):
+    cf_server.seed(apps=150, routes=0, bindings=0)
+
+    async def collect():
+        return [
+            app
+            async for app in aio.iter_resources(
+                "/v2/apps", cf_server.configuration(), cf_server.secrets()
+            )
+        ]
+
+    assert len(aio.run(collect())) == 150
+    assert cf_server.call_count("GET", "/v2/apps") == 2
+
+
+def test_call_api_many_reports_each_call(cf_server):
+    cf_server.seed(apps=1, routes=0, bindings=0)
+    app_guid = next(iter(cf_server.apps))
+
+    results = aio.call_api_many(
+        [
+            {
+                "path": "/v2/apps/{a}".format(a=app_guid),
+                "method": "PUT",
+                "body": {"state": "STOPPED"},
+            },
+            {"path": "/v2/apps/unknown", "method": "PUT", "body": {"state": "STOPPED"}},
+        ],
+        cf_server.configuration(),
+        cf_server.secrets(),
+    )
+
+    assert [r["status"] for r in results] == ["succeeded", "failed"]
+    assert results[0]["result"]["metadata"]["guid"] == app_guid
+    assert cf_server.apps[app_guid]["state"] == "STOPPED"
+
+
+def test_stop_all_apps_can_fan_out_asynchronously(cf_server):
+    cf_server.seed(orgs=2, spaces=2, apps=5, routes=0, bindings=0)
+
+    results = stop_all_apps(
+        "org-0",
+        cf_server.configuration(cf_async_fan_out=True),
+        cf_server.secrets(),
+    )
+
+    assert len(results) == 10
+    assert {r["status"] for r in results} == {"succeeded"}
+    assert cf_server.call_count("PUT", "/v2/apps/:guid") == 10
+    states = {
+        a["state"]
+        for a in cf_server.apps.values()
+        if cf_server.orgs[cf_server.spaces[a["space_guid"]]["org_guid"]]["name"]
+        == "org-0"
+    }
+    assert states == {"STOPPED"}
@@ -8,6 +8,7 @@ from fixtures import config, responses, secrets
 
 import chaoscf
 from chaoscf.api import (
+    call_api,
     get_app_by_name,
     get_app_instances,
     get_app_routes_by_host,
@@ -16,6 +17,7 @@ from chaoscf.api import (
     get_org_by_name,
     get_routes_by_host,
     get_space_by_name,
+    iter_resources,
 )
 
 
@@ -30,6 +32,8 @@ def test_all_lists_the_apis_exposed():
         "get_org_by_name",
         "get_routes_by_host",
         "get_space_by_name",
+        "iter_resources",
+        "list_resources",
     ] == chaoscf.api.__all__
 
 
@@ -180,7 +184,7 @@ def test_get_routes_by_host(auth):
     q = "q=host:whatever"
     with requests_mock.mock() as m:
         m.get(
-            "https://example.com/v2/routes?{q}".format(q=q),
+            "https://example.com/v2/routes?{q}&results-per-page=100".format(q=q),
             status_code=200,
             json=responses.routes,
             complete_qs=True,
@@ -202,26 +206,48 @@ def test_get_routes_for_app_by_host(auth):
         )
 
         m.get(
-            "https://example.com/v2/routes?q=host:whatever",
+            "https://example.com/v2/apps/{a}/routes?q=host:whatever"
+            "&results-per-page=100".format(a=responses.app["metadata"]["guid"]),
             status_code=200,
             json=responses.routes,
             complete_qs=True,
         )
 
+        routes = get_app_routes_by_host(
+            "my-app", "whatever", config.config, secrets.secrets
+        )
+        assert routes == [responses.route]
+
+
+@pytest.mark.parametrize("count", [1, 10, 250])
+@patch("chaoscf.api.auth", autospec=True)
+def test_get_routes_for_app_by_host_calls_do_not_grow_with_routes(auth, count):
+    auth.return_value = responses.auth_response
+    routes = [
+        dict(responses.route, metadata={"guid": "route-{i}".format(i=i)})
+        for i in range(count)
+    ]
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps_with_parents)
         m.get(
-            "https://example.com/v2/routes/{r}/apps?app_guid={a}".format(
-                r=responses.route["metadata"]["guid"],
-                a=responses.app["metadata"]["guid"],
+            "https://example.com/v2/apps/{a}/routes".format(
+                a=responses.app["metadata"]["guid"]
             ),
-            status_code=200,
-            json=responses.routes,
-            complete_qs=True,
+            json=dict(responses.routes, total_results=count, resources=routes),
         )
 
-        routes = get_app_routes_by_host(
-            "my-app", "whatever", config.config, secrets.secrets
+        result = get_app_routes_by_host(
+            "my-app",
+            "whatever",
+            config.config,
+            secrets.secrets,
+            org_name="pcfdev-org",
+            space_name="pcfdev-space",
         )
-        assert len(routes) == 1
+
+        assert len(result) == count
+        assert m.call_count == 2
 
 
 @patch("chaoscf.api.auth", autospec=True)
@@ -256,7 +282,7 @@ def test_get_bind_by_name(auth, mock_get_app_by_name):
         m.get(
             "https://example.com/v2/apps/"
             + responses.app["metadata"]["guid"]
-            + "/service_bindings",
+            + "/service_bindings?results-per-page=100",
             status_code=200,
             json=responses.binds,
             complete_qs=True,
@@ -293,7 +319,7 @@ def test_get_bind_by_name_when_app_not_found(auth, mock_get_app_by_name):
         m.get(
             "https://example.com/v2/apps/"
             + responses.app["metadata"]["guid"]
-            + "/service_bindings",
+            + "/service_bindings?results-per-page=100",
             status_code=200,
             json=responses.binds,
             complete_qs=True,
@@ -331,7 +357,7 @@ def test_get_bind_by_name_when_app_has_no_bindings(auth, mock_get_app_by_name):
         m.get(
             "https://example.com/v2/apps/"
             + responses.app["metadata"]["guid"]
-            + "/service_bindings",
+            + "/service_bindings?results-per-page=100",
             status_code=200,
             json={
                 "total_results": 0,
@@ -377,7 +403,7 @@ def test_get_bind_by_name_when_app_has_no_binding_with_the_specified_name(
         m.get(
             "https://example.com/v2/apps/"
             + responses.app["metadata"]["guid"]
-            + "/service_bindings",
+            + "/service_bindings?results-per-page=100",
             status_code=200,
             json=responses.binds,
             complete_qs=True,
@@ -419,7 +445,7 @@ def test_get_apps_for_org(call_api, mock_get_org_by_name):
     mock_get_org_by_name.assert_has_calls(
         [call(org_name, config.config, secrets.secrets)]
     )
-    query = {"q": ["organization_guid:" + org_guid]}
+    query = {"q": ["organization_guid:" + org_guid], "results-per-page": 100}
     call_api.assert_has_calls(
         [call("/v2/apps", config.config, secrets.secrets, query=query)]
     )
@@ -442,3 +468,353 @@ def test_get_apps_for_org_should_raise_a_failed_activity_exception_when_no_apps_
     assert "apps for organization name {o} not found".format(o=org_name) in str(
         exception
     )
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_retries_once_with_new_token_when_rejected(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [{"status_code": 401}, {"status_code": 200, "json": responses.apps}],
+        )
+
+        r = call_api("/v2/apps", config.config, secrets.secrets)
+        assert r.status_code == 200
+        assert m.call_count == 2
+    assert auth.call_count == 2
+
+
+@patch("requests.Response.close", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_releases_rejected_streamed_response(auth, close):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [{"status_code": 401}, {"status_code": 200, "json": responses.apps}],
+        )
+
+        r = call_api("/v2/apps", config.config, secrets.secrets, stream=True)
+        assert r.status_code == 200
+
+    assert [c[0][0].status_code for c in close.call_args_list] == [401]
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_iter_resources_follows_next_url(auth):
+    auth.return_value = responses.auth_response
+    next_url = "/v2/apps?order-direction=asc&page=2&results-per-page=100"
+    first_page = dict(responses.apps, total_pages=2, next_url=next_url)
+    other_app = dict(responses.app, metadata={"guid": "other-guid"})
+    second_page = dict(responses.apps, total_pages=2, resources=[other_app])
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps?results-per-page=100",
+            status_code=200,
+            json=first_page,
+            complete_qs=True,
+        )
+        m.get(
+            "https://example.com{u}".format(u=next_url),
+            status_code=200,
+            json=second_page,
+            complete_qs=True,
+        )
+
+        apps = iter_resources("/v2/apps", config.config, secrets.secrets)
+        assert next(apps) == responses.app
+        assert m.call_count == 1
+
+        assert list(apps) == [other_app]
+        assert m.call_count == 2
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_iter_resources_streams_v3_pages_keeping_some_fields(auth):
+    auth.return_value = responses.auth_response
+    next_href = "https://example.com/v3/apps?page=2&per_page=100"
+    first_page = {
+        "pagination": {"next": {"href": next_href}},
+        "resources": [{"guid": "a", "name": "app-a", "state": "STARTED"}],
+    }
+    second_page = {
+        "pagination": {"next": None},
+        "resources": [{"guid": "b", "name": "app-b", "state": "STOPPED"}],
+    }
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v3/apps?per_page=100",
+            status_code=200,
+            json=first_page,
+            complete_qs=True,
+        )
+        m.get(next_href, status_code=200, json=second_page, complete_qs=True)
+
+        apps = list(
+            iter_resources(
+                "/v3/apps", config.config, secrets.secrets, fields=["name"], stream=True
+            )
+        )
+
+    assert apps == [{"guid": "a", "name": "app-a"}, {"guid": "b", "name": "app-b"}]
+
+
+@pytest.mark.parametrize(
+    "href",
+    [
+        "https://example.com:443/v3/apps?page=2&per_page=100",
+        "https://api.example.com/v3/apps?page=2&per_page=100",
+    ],
+)
+@patch("chaoscf.api.auth", autospec=True)
+def test_iter_resources_reads_next_href_from_the_api_url(auth, href):
+    auth.return_value = responses.auth_response
+    first_page = {
+        "pagination": {"next": {"href": href}},
+        "resources": [{"guid": "a", "name": "app-a"}],
+    }
+    second_page = {
+        "pagination": {"next": None},
+        "resources": [{"guid": "b", "name": "app-b"}],
+    }
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v3/apps?per_page=100",
+            status_code=200,
+            json=first_page,
+            complete_qs=True,
+        )
+        m.get(
+            "https://example.com/v3/apps?page=2&per_page=100",
+            status_code=200,
+            json=second_page,
+            complete_qs=True,
+        )
+
+        apps = list(iter_resources("/v3/apps", config.config, secrets.secrets))
+
+    assert [a["guid"] for a in apps] == ["a", "b"]
+
+
+@patch("chaoscf.api.get_org_by_name", autospec=True, return_value=responses.org)
+@patch("chaoscf.api.auth", autospec=True)
+def test_get_apps_for_org_reads_all_pages(auth, mock_get_org_by_name):
+    auth.return_value = responses.auth_response
+    next_url = "/v2/apps?page=2&results-per-page=100"
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps?q=organization_guid:{o}"
+            "&results-per-page=100".format(o=responses.org["metadata"]["guid"]),
+            status_code=200,
+            json=dict(responses.apps, total_pages=2, next_url=next_url),
+            complete_qs=True,
+        )
+        m.get(
+            "https://example.com{u}".format(u=next_url),
+            status_code=200,
+            json=responses.apps,
+            complete_qs=True,
+        )
+
+        apps = get_apps_for_org("pcfdev-org", config.config, secrets.secrets)
+
+    assert apps["total_results"] == 2
+    assert len(apps["resources"]) == 2
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_resolved_names_are_cached(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps_with_parents)
+
+        for _ in range(3):
+            app = get_app_by_name(
+                "my-app",
+                config.config,
+                secrets.secrets,
+                org_name="pcfdev-org",
+                space_name="pcfdev-space",
+            )
+            assert app["entity"]["name"] == "my-app"
+
+        assert m.call_count == 1
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_resolved_names_are_cached_per_user(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/organizations", json=responses.orgs)
+        m.get("https://other.example.com/v2/organizations", json=responses.orgs)
+
+        get_org_by_name("pcfdev-org", config.config, secrets.secrets)
+        get_org_by_name(
+            "pcfdev-org", config.config, dict(secrets.secrets, cf_username="other")
+        )
+        get_org_by_name(
+            "pcfdev-org",
+            dict(config.config, cf_api_url="https://other.example.com"),
+            secrets.secrets,
+        )
+
+        assert m.call_count == 3
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_resolution_cache_can_be_disabled(auth):
+    auth.return_value = responses.auth_response
+    configuration = dict(config.config, cf_resolution_cache_ttl=0)
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/organizations", json=responses.orgs)
+
+        get_org_by_name("pcfdev-org", configuration, secrets.secrets)
+        get_org_by_name("pcfdev-org", configuration, secrets.secrets)
+
+        assert m.call_count == 2
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_resolved_app_is_forgotten_when_not_found_by_guid(auth):
+    auth.return_value = responses.auth_response
+    app_guid = responses.app["metadata"]["guid"]
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps)
+        m.get(
+            "https://example.com/v2/apps/{a}/summary".format(a=app_guid),
+            status_code=404,
+        )
+
+        get_app_by_name("my-app", config.config, secrets.secrets)
+        with pytest.raises(FailedActivity):
+            call_api(
+                "/v2/apps/{a}/summary".format(a=app_guid),
+                config.config,
+                secrets.secrets,
+            )
+        get_app_by_name("my-app", config.config, secrets.secrets)
+
+        assert m.call_count == 3
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_get_app_by_name_with_org_and_space_names_in_one_call(auth):
+    auth.return_value = responses.auth_response
+    q = (
+        "q=name:my-app&inline-relations-depth=2"
+        "&include-relations=space,organization&results-per-page=100"
+    )
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps?{q}".format(q=q),
+            json=responses.apps_with_parents,
+            complete_qs=True,
+        )
+
+        app = get_app_by_name(
+            "my-app",
+            config.config,
+            secrets.secrets,
+            org_name="pcfdev-org",
+            space_name="pcfdev-space",
+        )
+        assert m.call_count == 1
+
+        assert app["entity"]["name"] == "my-app"
+        assert "space" not in app["entity"]
+
+        org = get_org_by_name("pcfdev-org", config.config, secrets.secrets)
+        space = get_space_by_name(
+            "pcfdev-space", config.config, secrets.secrets, org_name="pcfdev-org"
+        )
+        assert org["metadata"] == responses.org["metadata"]
+        assert space["metadata"] == responses.space["metadata"]
+        assert m.call_count == 1
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_get_app_by_name_checks_parent_names_client_side(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps_with_parents)
+
+        with pytest.raises(FailedActivity):
+            get_app_by_name(
+                "my-app",
+                config.config,
+                secrets.secrets,
+                org_name="pcfdev-org",
+                space_name="another-space",
+            )
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_responses_are_not_cached_by_default(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            json=responses.apps,
+            headers={"ETag": '"abc"'},
+        )
+
+        call_api("/v2/apps", config.config, secrets.secrets)
+        call_api("/v2/apps", config.config, secrets.secrets)
+
+        assert m.call_count == 2
+        assert "If-None-Match" not in m.last_request.headers
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_cached_responses_are_revalidated_with_their_etag(auth):
+    auth.return_value = responses.auth_response
+    configuration = dict(config.config, cf_response_cache=True)
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [
+                {"json": responses.apps, "headers": {"ETag": '"abc"'}},
+                {"status_code": 304},
+            ],
+        )
+
+        call_api("/v2/apps", configuration, secrets.secrets)
+        r = call_api("/v2/apps", configuration, secrets.secrets)
+
+        assert m.call_count == 2
+        assert m.last_request.headers["If-None-Match"] == '"abc"'
+        assert r.status_code == 200
+        assert r.json() == responses.apps
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_fresh_cached_responses_are_served_without_calling(auth):
+    auth.return_value = responses.auth_response
+    configuration = dict(
+        config.config, cf_response_cache=True, cf_response_cache_max_age=30
+    )
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps)
+
+        call_api("/v2/apps", configuration, secrets.secrets)
+        r = call_api("/v2/apps", configuration, secrets.secrets)
+        call_api("/v2/apps", configuration, secrets.secrets, query={"q": "name:my-app"})
+
+        assert m.call_count == 2
+        assert r.json() == responses.apps
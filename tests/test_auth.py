@@ -7,7 +7,8 @@ from chaoslib.exceptions import FailedActivity
 from fixtures import config, responses, secrets
 from oauthlib.oauth2.rfc6749.errors import OAuth2Error
 
-from chaoscf import auth
+import chaoscf
+from chaoscf import auth, get_api_info
 
 
 def test_failed_fetching_api_endpoint_info():
@@ -19,7 +20,7 @@ def test_failed_fetching_api_endpoint_info():
         assert "failed to retrieve Cloud Foundry information" in str(ex)
 
 
-@patch("chaoscf.OAuth2Session", autospec=True)
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
 def test_failed_authenticating(SessionClass):
     s = SessionClass()
     s.fetch_token.side_effect = OAuth2Error
@@ -34,7 +35,7 @@ def test_failed_authenticating(SessionClass):
         assert "failed to auth against Cloud Foundry" in str(ex)
 
 
-@patch("chaoscf.OAuth2Session", autospec=True)
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
 def test_authenticate(SessionClass):
     s = SessionClass()
     s.fetch_token.return_value = responses.auth_response
@@ -46,3 +47,106 @@ def test_authenticate(SessionClass):
 
         tokens = auth(config.config, secrets.secrets)
         assert tokens["access_token"] == "my-token"
+
+
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
+def test_tokens_are_reused_until_they_expire(SessionClass):
+    s = SessionClass()
+    s.fetch_token.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        auth(config.config, secrets.secrets)
+        tokens = auth(config.config, secrets.secrets)
+        assert tokens["access_token"] == "my-token"
+        assert m.call_count == 1
+    assert s.fetch_token.call_count == 1
+
+
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
+def test_tokens_about_to_expire_are_not_reused(SessionClass):
+    s = SessionClass()
+    tokens = responses.auth_response.copy()
+    tokens["expires_in"] = chaoscf.TOKEN_EXPIRY_LEEWAY
+    s.fetch_token.return_value = tokens
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        auth(config.config, secrets.secrets)
+        auth(config.config, secrets.secrets)
+    assert s.fetch_token.call_count == 2
+
+
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
+def test_tokens_cache_can_be_disabled(SessionClass):
+    s = SessionClass()
+    s.fetch_token.return_value = responses.auth_response
+    configuration = dict(config.config, cf_cache_tokens=False)
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        auth(configuration, secrets.secrets)
+        auth(configuration, secrets.secrets)
+    assert s.fetch_token.call_count == 2
+
+
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
+def test_tokens_are_cached_per_user(SessionClass):
+    s = SessionClass()
+    s.fetch_token.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        auth(config.config, secrets.secrets)
+        auth(config.config, dict(secrets.secrets, cf_username="other"))
+    assert s.fetch_token.call_count == 2
+
+
+def test_api_info_is_cached_per_api_url():
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        get_api_info(config.config)
+        info = get_api_info(config.config)
+        assert info == responses.info_response
+        assert m.call_count == 1
+
+
+def test_api_info_cache_can_be_disabled():
+    configuration = dict(config.config, cf_api_info_ttl=0)
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info", status_code=200, json=responses.info_response
+        )
+
+        get_api_info(configuration)
+        get_api_info(configuration)
+        assert m.call_count == 2
+
+
+@patch("requests_oauthlib.OAuth2Session", autospec=True)
+def test_api_info_seeded_from_configuration_is_not_fetched(SessionClass):
+    s = SessionClass()
+    s.fetch_token.return_value = responses.auth_response
+    configuration = dict(config.config, cf_api_info=responses.info_response)
+
+    with requests_mock.mock() as m:
+        tokens = auth(configuration, secrets.secrets)
+        assert tokens["access_token"] == "my-token"
+        assert m.call_count == 0
+
+    assert s.fetch_token.call_args[0][0] == "https://uaa.example.com/oauth/token"
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Round trips and wall time of the actions and probes against the fake Cloud
+Foundry API of `fixtures.server`.
+
+Each scenario runs against foundations of 10, 1000 and 10000 apps, spread
+over two spaces of a single org. Only the smallest one runs by default, set
+`CF_BENCHMARK_SIZES`, for instance to `10,1000,10000`, to run the others.
+Every response is delayed by `CF_BENCHMARK_LATENCY` seconds (`0.002` by
+default) and, when `CF_BENCHMARK_REPORT` is set, the measures are written
+as JSON to that file.
+
+A scenario fails when it makes more calls than its budget allows, so a
+change making an action chattier must update the budget below on purpose.
+"""
+
+import json
+import math
+import os
+import time
+
+import pytest
+from fixtures.server import FakeCloudFoundry
+
+from chaoscf.actions import (
+    map_route_to_app,
+    remove_routes_from_app,
+    start_app,
+    stop_all_apps,
+    stop_app,
+    terminate_random_instances,
+    terminate_some_random_instance,
+    unbind_service_from_app,
+    unmap_route_from_app,
+)
+from chaoscf.probes import get_app_stats, get_org_stats, list_apps
+
+SIZES = [int(s) for s in os.getenv("CF_BENCHMARK_SIZES", "10").split(",") if s.strip()]
+LATENCY = float(os.getenv("CF_BENCHMARK_LATENCY", "0.002"))
+REPORT = os.getenv("CF_BENCHMARK_REPORT")
+
+# both count the v2 info and token calls made before the first API call
+AUTH_CALLS = 2
+TARGET = {"org_name": "org-0", "space_name": "space-1"}
+
+
+def _pages(size: int, per_page: int = 100) -> int:
+    return max(1, math.ceil(size / per_page))
+
+
+SCENARIOS = {
+    "stop_app": (
+        lambda c, s: stop_app("app-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 2,
+    ),
+    "start_app_v3": (
+        lambda c, s: start_app("app-1", dict(c, cf_api_version="v3"), s, **TARGET),
+        lambda size: AUTH_CALLS + 2,
+    ),
+    "remove_routes_from_app": (
+        lambda c, s: remove_routes_from_app("app-1", "app-1-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 3,
+    ),
+    "unmap_route_from_app": (
+        lambda c, s: unmap_route_from_app("app-1", "app-1-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 3,
+    ),
+    "map_route_to_app": (
+        lambda c, s: map_route_to_app("app-1", "app-0", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 4,
+    ),
+    "unbind_service_from_app": (
+        lambda c, s: unbind_service_from_app("app-1", "binding-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 3,
+    ),
+    "terminate_some_random_instance": (
+        lambda c, s: terminate_some_random_instance("app-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 3,
+    ),
+    "terminate_random_instances": (
+        lambda c, s: terminate_random_instances("app-1", c, s, count=2, **TARGET),
+        lambda size: AUTH_CALLS + 2 + 2,
+    ),
+    "get_app_stats": (
+        lambda c, s: get_app_stats("app-1", c, s, **TARGET),
+        lambda size: AUTH_CALLS + 2,
+    ),
+    "get_org_stats": (
+        lambda c, s: get_org_stats("org-0", c, s),
+        lambda size: AUTH_CALLS + 1 + _pages(size) + size,
+    ),
+    "list_apps": (
+        lambda c, s: list_apps(c, s),
+        lambda size: AUTH_CALLS + _pages(size),
+    ),
+    "stop_all_apps": (
+        lambda c, s: stop_all_apps("org-0", c, s),
+        lambda size: AUTH_CALLS + 1 + _pages(size) + size,
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def report():
+    measures = []
+    yield measures
+
+    if REPORT:
+        with open(REPORT, "w") as f:
+            json.dump(measures, f, indent=2)
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_benchmark(name: str, size: int, report, monkeypatch):
+    monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+    scenario, budget = SCENARIOS[name]
+
+    with FakeCloudFoundry() as cf:
+        cf.seed(spaces=2, apps=size // 2, routes=2, bindings=2, instances=2)
+        cf.latency = LATENCY
+
+        start = time.perf_counter()
+        scenario(cf.configuration(), cf.secrets())
+        wall_time = time.perf_counter() - start
+
+    measure = {
+        "scenario": name,
+        "apps": size,
+        "latency": LATENCY,
+        "calls": cf.call_count(),
+        "budget": budget(size),
+        "wall_time": wall_time,
+    }
+    report.append(measure)
+
+    message = "{s} made {c} calls against a budget of {b} for {a} apps".format(
+        s=name, c=measure["calls"], b=measure["budget"], a=size
+    )
+    assert measure["calls"] <= measure["budget"], message
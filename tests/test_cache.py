@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from chaoscf.cache import TTLCache
+
+
+def test_entries_expire_after_their_ttl():
+    cache = TTLCache(ttl=10)
+    with patch("chaoscf.cache.time.monotonic", return_value=100):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=20)
+
+    with patch("chaoscf.cache.time.monotonic", return_value=115):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_discard_entries_matching_a_predicate():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.discard(lambda k, v: v % 2) == 2
+    assert len(cache) == 1
+    assert cache.get("b") == 2
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import gc
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+from chaoslib.exceptions import FailedActivity
+
+import chaoscf
+import chaoscf.api
+import chaoscf.session
+from chaoscf import aio
+from chaoscf.actions import stop_all_apps, stop_app
+from chaoscf.api import get_app_by_name, get_bind_by_name
+from chaoscf.cassette import CassetteMiss, _save
+from chaoscf.probes import get_app_stats, list_apps
+from chaoscf.session import close_sessions
+
+
+def _forget():
+    chaoscf.clear_tokens()
+    chaoscf._api_info.clear()
+    chaoscf.api._resolved.clear()
+
+
+def _record(cf_server, path):
+    cf_server.seed(spaces=2, apps=3, instances=2)
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_cassette_mode="record"
+    )
+    stop_app("app-1", configuration, cf_server.secrets(), space_name="space-1")
+    stats = get_app_stats("app-2", configuration, cf_server.secrets())
+    close_sessions()
+    return stats
+
+
+def test_replay_answers_without_calling_the_api(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    recorded_stats = _record(cf_server, path)
+    calls = cf_server.call_count()
+    _forget()
+
+    configuration = cf_server.configuration(cf_cassette_path=str(path))
+    stop_app("app-1", configuration, cf_server.secrets(), space_name="space-1")
+    stats = get_app_stats("app-2", configuration, cf_server.secrets())
+
+    assert stats == recorded_stats
+    assert cf_server.call_count() == calls
+
+
+def test_cassette_holds_no_credentials(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    _record(cf_server, path)
+
+    content = path.read_text()
+    assert "fake-token" not in content
+    assert "username=admin" not in content
+    assert "password=admin" not in content
+    assert "<scrubbed>" in content
+    assert len(json.loads(content)["interactions"]) == cf_server.call_count()
+
+
+def test_cassette_holds_no_binding_credentials_nor_app_environment(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    space_guid = cf_server.add_space("space-0", cf_server.add_org("org-0"))
+    app_guid = cf_server.add_app(
+        "app-0", space_guid, environment={"STRIPE_KEY": "sk_live_4242"}
+    )
+    cf_server.add_binding(
+        "db",
+        app_guid,
+        credentials={"uri": "postgres://u:S3cr3t@h/db", "api_key": "k3y-0f-db"},
+    )
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_cassette_mode="record"
+    )
+
+    bind = get_bind_by_name("db", configuration, cf_server.secrets(), app_name="app-0")
+    close_sessions()
+
+    assert bind["entity"]["credentials"]["api_key"] == "k3y-0f-db"
+    content = path.read_text()
+    for secret in ("S3cr3t", "k3y-0f-db", "STRIPE_KEY", "sk_live_4242"):
+        assert secret not in content
+
+
+def test_cassette_is_saved_once_when_the_session_is_closed(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    with patch("chaoscf.cassette._save", autospec=True, side_effect=_save) as save:
+        _record(cf_server, path)
+        close_sessions()
+
+    assert save.call_count == 1
+    assert path.exists()
+
+
+def test_cassette_is_saved_when_the_session_is_never_closed(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    cf_server.seed(apps=1)
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_cassette_mode="record"
+    )
+    list_apps(configuration, cf_server.secrets())
+
+    # drop the session without closing it, as when no control is declared
+    chaoscf.session._sessions.clear()
+    gc.collect()
+
+    interactions = json.loads(path.read_text())["interactions"]
+    assert len(interactions) == cf_server.call_count()
+
+
+def test_replay_never_fans_out_asynchronously(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    cf_server.seed(apps=3, routes=0, bindings=0)
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_cassette_mode="record", cf_async_fan_out=True
+    )
+    recorded = stop_all_apps("org-0", configuration, cf_server.secrets())
+    close_sessions()
+    _forget()
+    cf_server.reset_requests()
+
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_async_fan_out=True
+    )
+    replayed = stop_all_apps("org-0", configuration, cf_server.secrets())
+
+    assert [r["guid"] for r in replayed] == [r["guid"] for r in recorded]
+    assert cf_server.call_count() == 0
+
+
+def test_asynchronous_client_refuses_cassettes(cf_server, tmp_path):
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(tmp_path / "cassette.json")
+    )
+
+    with pytest.raises(FailedActivity) as x:
+        aio.run(aio.call_api("/v2/apps", configuration, cf_server.secrets()))
+    assert "cassette" in str(x.value)
+    assert cf_server.call_count() == 0
+
+
+def test_cassette_may_be_compressed(cf_server, tmp_path):
+    path = tmp_path / "cassette.json.gz"
+    _record(cf_server, path)
+
+    with gzip.open(str(path), "rb") as f:
+        cassette = json.loads(f.read().decode("utf-8"))
+    assert cassette["version"] == 1
+
+
+def test_replaying_unknown_request_fails(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    _record(cf_server, path)
+    _forget()
+
+    configuration = cf_server.configuration(cf_cassette_path=str(path))
+    with pytest.raises(CassetteMiss):
+        get_app_by_name("app-0", configuration, cf_server.secrets())
+
+
+def test_streamed_responses_are_recorded_and_replayed(cf_server, tmp_path):
+    path = tmp_path / "cassette.json"
+    cf_server.seed(apps=3)
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_cassette_mode="record", cf_stream_responses=True
+    )
+    recorded = list_apps(configuration, cf_server.secrets(), fields=["name"])
+    close_sessions()
+    _forget()
+
+    configuration = cf_server.configuration(
+        cf_cassette_path=str(path), cf_stream_responses=True
+    )
+    assert list_apps(configuration, cf_server.secrets(), fields=["name"]) == recorded
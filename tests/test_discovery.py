@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+import json
+from unittest.mock import patch
+
 import pytest
 
 from chaoscf import __version__, discover
+from chaoscf.manifest import build_manifest, load_manifest, write_manifest
 
 
 def test_discover_extension_capabilities():
@@ -9,3 +13,37 @@ def test_discover_extension_capabilities():
     assert discovery["extension"]["name"] == "chaostoolkit-cloud-foundry"
     assert discovery["extension"]["version"] == __version__
     assert len(discovery["activities"]) > 0
+
+
+def test_activity_manifest_is_up_to_date():
+    manifest = load_manifest(__version__)
+
+    assert manifest is not None, "run `make manifest` to generate it"
+    live = json.loads(json.dumps(build_manifest()))
+    assert manifest == live, "run `make manifest` to update it"
+
+
+@patch("chaoscf.manifest.build_manifest", autospec=True)
+def test_discover_reads_the_manifest(build_manifest):
+    discovery = discover(discover_system=False)
+
+    assert discovery["activities"] == load_manifest(__version__)
+    build_manifest.assert_not_called()
+
+
+@patch("chaoscf.manifest.load_manifest", autospec=True, return_value=None)
+def test_discover_falls_back_to_introspection(load_manifest):
+    discovery = discover(discover_system=False)
+
+    names = [a["name"] for a in discovery["activities"]]
+    assert "stop_app" in names
+    assert "list_apps" in names
+
+
+def test_manifest_of_another_version_is_ignored(tmp_path):
+    path = str(tmp_path / "activities.json")
+    write_manifest("0.0.1", path)
+
+    assert load_manifest("0.0.1", path)
+    assert load_manifest(__version__, path) is None
+    assert load_manifest(__version__, str(tmp_path / "missing.json")) is None
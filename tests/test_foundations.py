@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import pytest
+from chaoslib.exceptions import FailedActivity
+from fixtures.server import FakeCloudFoundry
+
+import chaoscf.actions
+import chaoscf.multi_actions
+import chaoscf.multi_probes
+import chaoscf.probes
+from chaoscf.foundations import get_foundations
+from chaoscf.multi_actions import stop_app
+from chaoscf.multi_probes import list_apps
+
+
+@pytest.fixture
+def other_cf_server(cf_server):
+    with FakeCloudFoundry() as server:
+        yield server
+
+
+def _configuration(*servers, **extra):
+    configuration = {
+        "cf_verify_ssl": False,
+        "cf_foundations": {
+            name: {"cf_api_url": server.url}
+            for name, server in zip(["eu", "us"], servers)
+        },
+    }
+    configuration.update(extra)
+    return configuration
+
+
+def test_multi_modules_mirror_the_activities():
+    assert chaoscf.multi_actions.__all__ == chaoscf.actions.__all__
+    assert chaoscf.multi_probes.__all__ == chaoscf.probes.__all__
+
+
+def test_foundations_are_merged_over_the_shared_settings():
+    configuration = {
+        "cf_verify_ssl": False,
+        "cf_foundations": {
+            "eu": {"cf_api_url": "https://eu"},
+            "us": {"cf_api_url": "https://us", "cf_verify_ssl": True},
+        },
+    }
+    secrets = {
+        "cf_username": "user",
+        "cf_foundations": {"us": {"cf_username": "us-user"}},
+    }
+
+    foundations = get_foundations(configuration, secrets)
+
+    assert foundations == {
+        "eu": (
+            {"cf_api_url": "https://eu", "cf_verify_ssl": False},
+            {"cf_username": "user"},
+        ),
+        "us": (
+            {"cf_api_url": "https://us", "cf_verify_ssl": True},
+            {"cf_username": "us-user"},
+        ),
+    }
+    assert list(get_foundations(configuration, secrets, ["us"])) == ["us"]
+
+
+@pytest.mark.parametrize(
+    "configuration,names",
+    [
+        ({"cf_api_url": "https://api"}, None),
+        ({"cf_foundations": {"eu": {"cf_api_url": "https://eu"}}}, ["us"]),
+        ({"cf_foundations": {"eu": {"cf_verify_ssl": False}}}, None),
+    ],
+)
+def test_invalid_foundations_are_rejected(configuration, names):
+    with pytest.raises(FailedActivity):
+        get_foundations(configuration, {}, names)
+
+
+def test_actions_run_on_every_foundation(cf_server, other_cf_server):
+    for server in (cf_server, other_cf_server):
+        server.seed(apps=2, routes=0, bindings=0)
+
+    results = stop_app(
+        "app-1", _configuration(cf_server, other_cf_server), cf_server.secrets()
+    )
+
+    assert sorted(results) == ["eu", "us"]
+    assert all(r["status"] == "succeeded" for r in results.values())
+    for server in (cf_server, other_cf_server):
+        assert server.call_count("POST", "/oauth/token") == 1
+        assert server.call_count("PUT", "/v2/apps/:guid") == 1
+        assert server.connections == 1
+
+
+def test_failures_are_reported_per_foundation(cf_server, other_cf_server):
+    cf_server.seed(apps=3, routes=0, bindings=0)
+    other_cf_server.seed(apps=1, routes=0, bindings=0)
+    configuration = _configuration(cf_server, other_cf_server)
+
+    results = list_apps(configuration, cf_server.secrets(), fields=["name"])
+    assert results["eu"]["result"]["total_results"] == 3
+    assert results["us"]["result"]["total_results"] == 1
+
+    cf_server.fail("GET", "/v2/apps", status=500)
+    results = list_apps(configuration, cf_server.secrets())
+    assert results["eu"]["status"] == "failed"
+    assert results["us"]["status"] == "succeeded"
+
+
+def test_actions_fail_once_every_foundation_was_tried(cf_server, other_cf_server):
+    cf_server.seed(apps=3, routes=0, bindings=0)
+    other_cf_server.seed(apps=1, routes=0, bindings=0)
+    configuration = _configuration(cf_server, other_cf_server)
+
+    with pytest.raises(FailedActivity) as x:
+        stop_app("app-2", configuration, cf_server.secrets())
+
+    assert str(x.value).startswith("stop_app failed on 1 of 2 foundation(s): 'us': ")
+    assert "app-2" in str(x.value)
+    assert cf_server.call_count("PUT", "/v2/apps/:guid") == 1
+    assert other_cf_server.call_count("PUT", "/v2/apps/:guid") == 0
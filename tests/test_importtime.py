@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of importing the modules chaostoolkit resolves activities from, as
+measured by `python -X importtime` in a fresh interpreter.
+
+HTTP clients are only imported once a call is made, so that short-lived
+chaos processes don't pay for them upfront. Run `make importtime` to see
+the full breakdown.
+"""
+
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# imported on first use only, see `chaoscf.session` and `chaoscf.get_tokens`
+DEFERRED_MODULES = [
+    "aiohttp",
+    "asyncio",
+    "oauthlib",
+    "requests",
+    "requests_oauthlib",
+    "urllib3",
+]
+
+
+def _importtime(statement: str) -> Dict[str, int]:
+    """
+    Cumulative import time, in microseconds, of every module imported by
+    the statement.
+    """
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+
+    timings = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+
+@pytest.mark.parametrize("module", ["chaoscf.actions", "chaoscf.probes"])
+def test_importing_activities_defers_http_clients(module: str):
+    timings = _importtime("import {m}".format(m=module))
+
+    assert module in timings
+    assert [m for m in DEFERRED_MODULES if m in timings] == []
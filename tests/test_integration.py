@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import pytest
+from chaoslib.exceptions import FailedActivity
+
+from chaoscf.actions import (
+    remove_routes_from_app,
+    start_app,
+    stop_all_apps,
+    terminate_random_instances,
+    terminate_some_random_instance,
+    unbind_service_from_app,
+    unmap_route_from_app,
+)
+from chaoscf.api import get_app_by_name, get_apps_for_org, list_resources
+from chaoscf.metrics import get_metrics
+from chaoscf.probes import get_app_stats, get_org_stats, list_apps, sample_app_stats
+
+
+def test_list_apps_reads_every_page(cf_server):
+    cf_server.seed(apps=250, routes=0, bindings=0)
+
+    apps = list_apps(cf_server.configuration(), cf_server.secrets())
+
+    assert apps["total_results"] == 250
+    assert len(apps["resources"]) == 250
+    assert cf_server.call_count("GET", "/v2/apps") == 3
+
+
+def test_list_apps_streams_every_page_keeping_some_fields(cf_server):
+    cf_server.seed(apps=250, routes=0, bindings=0)
+
+    apps = list_apps(
+        cf_server.configuration(cf_stream_responses=True),
+        cf_server.secrets(),
+        fields=["name", "state"],
+    )
+
+    assert apps["total_results"] == 250
+    assert cf_server.call_count("GET", "/v2/apps") == 3
+    app = apps["resources"][0]
+    assert sorted(app["entity"]) == ["name", "state"]
+    assert app["metadata"]["guid"] in cf_server.apps
+
+
+def test_get_apps_for_org_streams_the_apps(cf_server):
+    cf_server.seed(orgs=2, spaces=2, apps=3, routes=0, bindings=0)
+    configuration = cf_server.configuration(cf_stream_responses=True)
+
+    streamed = get_apps_for_org("org-1", configuration, cf_server.secrets())
+    loaded = get_apps_for_org("org-1", cf_server.configuration(), cf_server.secrets())
+
+    assert streamed == loaded
+    assert streamed["total_results"] == 6
+
+
+def test_stop_all_apps_stops_every_app_of_the_org(cf_server):
+    cf_server.seed(orgs=2, spaces=2, apps=60, routes=0, bindings=0)
+
+    results = stop_all_apps(
+        "org-1", cf_server.configuration(), cf_server.secrets(), max_workers=5
+    )
+
+    assert len(results) == 120
+    assert all(r["status"] == "succeeded" for r in results)
+    stopped = [a for a in cf_server.apps.values() if a["state"] == "STOPPED"]
+    assert len(stopped) == 120
+    assert cf_server.call_count("PUT", "/v2/apps/:guid") == 120
+
+
+def test_get_org_stats_aggregates_every_started_instance(cf_server):
+    cf_server.seed(orgs=2, spaces=2, apps=5, routes=0, bindings=0, instances=3)
+    org_guid = next(g for g, o in cf_server.orgs.items() if o["name"] == "org-1")
+    apps = [
+        a
+        for a in cf_server.apps.values()
+        if cf_server.spaces[a["space_guid"]]["org_guid"] == org_guid
+    ]
+    apps[0]["state"] = "STOPPED"
+
+    stats = get_org_stats(
+        "org-1", cf_server.configuration(), cf_server.secrets(), max_workers=4
+    )
+
+    assert len(stats["samples"]) == 9 * 3
+    assert stats["failures"] == []
+    assert cf_server.call_count("GET", "/v2/apps/:guid/stats") == 9
+    cpu = [s["cpu"] for s in stats["samples"]]
+    assert stats["aggregates"]["cpu"]["count"] == 27
+    assert stats["aggregates"]["cpu"]["max"] == max(cpu)
+    assert stats["aggregates"]["cpu"]["mean"] == pytest.approx(sum(cpu) / 27)
+    assert stats["aggregates"]["mem"]["p50"] <= stats["aggregates"]["mem"]["p99"]
+
+
+def test_get_org_stats_reports_failures(cf_server):
+    cf_server.seed(spaces=1, apps=2, routes=0, bindings=0, instances=2)
+    guid = next(iter(cf_server.apps))
+    cf_server.fail("GET", "/v2/apps/{g}/stats".format(g=guid), status=500)
+
+    stats = get_org_stats("org-0", cf_server.configuration(), cf_server.secrets())
+
+    assert len(stats["samples"]) == 2
+    assert [f["guid"] for f in stats["failures"]] == [guid]
+    assert stats["aggregates"]["disk"]["count"] == 2
+
+
+def test_sample_app_stats_through_one_connection(cf_server):
+    cf_server.seed(apps=1, routes=0, bindings=0, instances=2)
+
+    result = sample_app_stats(
+        "app-0",
+        cf_server.configuration(),
+        cf_server.secrets(),
+        duration=0.04,
+        interval=0.02,
+    )
+
+    assert result["polls"] == 3
+    assert sorted(result["instances"]) == ["0", "1"]
+    assert result["summary"]["mem"]["count"] == 6
+    assert cf_server.call_count("GET", "/v2/apps") == 1
+    assert cf_server.call_count("GET", "/v2/apps/:guid/stats") == 3
+    assert cf_server.connections == 1
+
+
+def test_calls_reuse_kept_alive_connections(cf_server):
+    cf_server.seed(apps=10, routes=0, bindings=0)
+    configuration = cf_server.configuration()
+
+    for _ in range(10):
+        list_resources("/v2/apps", configuration, cf_server.secrets())
+
+    assert cf_server.call_count() == 12
+    assert cf_server.connections == 1
+
+
+def test_remove_routes_from_app(cf_server):
+    cf_server.seed(spaces=2, apps=3, routes=2)
+    app = next(
+        a
+        for a in cf_server.apps.values()
+        if a["name"] == "app-1"
+        and cf_server.spaces[a["space_guid"]]["name"] == "space-1"
+    )
+
+    remove_routes_from_app(
+        "app-1",
+        "app-1-1",
+        cf_server.configuration(),
+        cf_server.secrets(),
+        org_name="org-0",
+        space_name="space-1",
+    )
+
+    assert [cf_server.routes[g]["host"] for g in app["route_guids"]] == ["app-1"]
+    assert cf_server.call_count("DELETE", "/v2/apps/:guid/routes/:guid") == 1
+
+
+def test_unmap_route_from_app_reads_every_page_of_routes(cf_server):
+    space_guid = cf_server.add_space("space-0", cf_server.add_org("org-0"))
+    app_guid = cf_server.add_app("app-0", space_guid)
+    for r in range(150):
+        cf_server.add_route("host-{r}".format(r=r), space_guid, app_guid)
+
+    unmap_route_from_app(
+        "app-0", "host-140", cf_server.configuration(), cf_server.secrets()
+    )
+
+    hosts = [
+        cf_server.routes[g]["host"] for g in cf_server.apps[app_guid]["route_guids"]
+    ]
+    assert len(hosts) == 149
+    assert "host-140" not in hosts
+    assert cf_server.call_count("GET", "/v2/apps/:guid/routes") == 2
+
+
+def test_unbind_service_from_app(cf_server):
+    cf_server.seed(apps=2, bindings=3)
+
+    unbind_service_from_app(
+        "app-0", "binding-2", cf_server.configuration(), cf_server.secrets()
+    )
+
+    assert len(cf_server.bindings) == 5
+    assert cf_server.call_count("DELETE", "/v2/service_bindings/:guid") == 1
+
+
+def test_unbind_missing_service_fails(cf_server):
+    cf_server.seed(apps=1, bindings=1)
+
+    with pytest.raises(FailedActivity):
+        unbind_service_from_app(
+            "app-0", "binding-9", cf_server.configuration(), cf_server.secrets()
+        )
+
+
+def test_terminate_some_random_instance(cf_server):
+    cf_server.seed(apps=1, instances=4)
+
+    terminate_some_random_instance(
+        "app-0", cf_server.configuration(), cf_server.secrets()
+    )
+
+    assert cf_server.call_count("DELETE", "/v2/apps/:guid/instances/:index") == 1
+
+
+def test_terminate_random_instances_by_count(cf_server):
+    cf_server.seed(apps=1, instances=5)
+
+    results = terminate_random_instances(
+        "app-0", cf_server.configuration(), cf_server.secrets(), count=3
+    )
+
+    indexes = [r["index"] for r in results]
+    assert len(set(indexes)) == 3
+    assert indexes == sorted(indexes)
+    assert all(0 <= i < 5 for i in indexes)
+    assert all(r["status"] == "succeeded" for r in results)
+    assert all(r["duration"] >= 0 for r in results)
+    assert cf_server.call_count("GET", "/v2/apps") == 1
+    assert cf_server.call_count("GET", "/v2/apps/:guid/instances") == 1
+    assert cf_server.call_count("DELETE", "/v2/apps/:guid/instances/:index") == 3
+
+
+def test_terminate_random_instances_by_percentage_through_v3(cf_server):
+    cf_server.seed(apps=1, instances=5)
+
+    results = terminate_random_instances(
+        "app-0",
+        cf_server.configuration(cf_api_version="v3"),
+        cf_server.secrets(),
+        percentage=50,
+    )
+
+    assert len(results) == 3
+    assert cf_server.call_count("GET", "/v3/processes/:guid/stats") == 1
+    assert cf_server.call_count("DELETE", "/v3/processes/:guid/instances/:index") == 3
+
+
+def test_terminate_random_instances_reports_failures(cf_server):
+    cf_server.seed(apps=1, instances=2)
+    cf_server.fail("DELETE", "/v2/apps/[^/]+/instances/1", status=500)
+
+    results = terminate_random_instances(
+        "app-0", cf_server.configuration(), cf_server.secrets(), count=10
+    )
+
+    assert [r["index"] for r in results] == [0, 1]
+    assert [r["status"] for r in results] == ["succeeded", "failed"]
+    assert "500" in results[1]["error"]
+
+
+def test_terminate_random_instances_needs_count_or_percentage(cf_server):
+    with pytest.raises(FailedActivity):
+        terminate_random_instances(
+            "app-0", cf_server.configuration(), cf_server.secrets()
+        )
+    with pytest.raises(FailedActivity):
+        terminate_random_instances(
+            "app-0",
+            cf_server.configuration(),
+            cf_server.secrets(),
+            count=1,
+            percentage=1,
+        )
+
+
+@pytest.mark.parametrize("count", [0, -1])
+def test_terminate_random_instances_needs_a_positive_count(cf_server, count):
+    cf_server.seed(apps=1, routes=0, bindings=0, instances=2)
+
+    with pytest.raises(FailedActivity) as x:
+        terminate_random_instances(
+            "app-0", cf_server.configuration(), cf_server.secrets(), count=count
+        )
+    assert "count must be 1 at least" in str(x.value)
+    assert cf_server.call_count("DELETE") == 0
+
+
+def test_start_app_through_v3(cf_server):
+    cf_server.seed(spaces=2, apps=2)
+    for app in cf_server.apps.values():
+        app["state"] = "STOPPED"
+
+    start_app(
+        "app-1",
+        cf_server.configuration(cf_api_version="v3"),
+        cf_server.secrets(),
+        org_name="org-0",
+        space_name="space-0",
+    )
+
+    started = [a for a in cf_server.apps.values() if a["state"] == "STARTED"]
+    assert len(started) == 1
+    assert started[0]["name"] == "app-1"
+    assert cf_server.spaces[started[0]["space_guid"]]["name"] == "space-0"
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+def test_transient_failures_are_retried(sleep, cf_server):
+    cf_server.seed(apps=1, instances=2)
+    cf_server.fail("POST", "/oauth/token", status=502)
+    cf_server.fail("GET", "/v2/apps/[^/]+/stats", status=503, times=2)
+
+    stats = get_app_stats("app-0", cf_server.configuration(), cf_server.secrets())
+
+    assert sorted(stats) == ["0", "1"]
+    assert cf_server.call_count("GET", "/v2/apps/:guid/stats") == 3
+    assert sleep.call_count == 3
+
+
+def test_failures_are_reported(cf_server):
+    cf_server.seed(apps=1)
+    cf_server.fail("GET", "/v2/apps", status=500)
+
+    with pytest.raises(FailedActivity) as x:
+        get_app_by_name("app-0", cf_server.configuration(), cf_server.secrets())
+    assert "500" in str(x.value)
+
+
+def test_latency_is_injected(cf_server):
+    cf_server.seed(apps=1)
+    cf_server.latency = 0.05
+    configuration = cf_server.configuration()
+    secrets = cf_server.secrets()
+
+    get_app_by_name("app-0", configuration, secrets)
+
+    endpoint = next(e for e in get_metrics()["endpoints"] if e["path"] == "/v2/apps")
+    assert endpoint["latency"]["min"] >= 0.05
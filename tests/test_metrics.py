@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests_mock
+from chaoslib.exceptions import FailedActivity
+from fixtures import config, responses, secrets
+
+from chaoscf.api import call_api
+from chaoscf.control import (
+    after_activity_control,
+    after_experiment_control,
+    before_activity_control,
+)
+from chaoscf.metrics import (
+    Metrics,
+    add_hook,
+    get_metrics,
+    path_template,
+    registry,
+    remove_hook,
+)
+
+APP_GUID = "fa6e7b9b-3b3f-4e33-a8b3-a7b8a2d8e4d1"
+
+
+def test_path_template_replaces_guids_and_indexes():
+    assert (
+        path_template("/v2/apps/{g}/instances/3".format(g=APP_GUID))
+        == "/v2/apps/:guid/instances/:index"
+    )
+    assert path_template("/v2/apps?q=name:x") == "/v2/apps"
+    assert path_template("/v3/apps") == "/v3/apps"
+
+
+def test_summary_has_percentiles_per_endpoint():
+    metrics = Metrics()
+    for i in range(1, 101):
+        metrics.record("get", "/v2/apps", 200, 10, i / 1000)
+    metrics.record("DELETE", "/v2/apps/{g}".format(g=APP_GUID), 404, 5, 0.5)
+
+    summary = metrics.summary()
+    assert summary["calls"] == 101
+    assert summary["bytes"] == 1005
+    assert summary["errors"] == 1
+
+    delete, get = summary["endpoints"]
+    assert delete["path"] == "/v2/apps/:guid"
+    assert delete["statuses"] == {"404": 1}
+    assert get["method"] == "GET"
+    assert get["latency"]["min"] == 0.001
+    assert get["latency"]["p50"] == 0.05
+    assert get["latency"]["p95"] == 0.095
+    assert get["latency"]["p99"] == 0.099
+    assert get["latency"]["max"] == 0.1
+
+
+def test_hooks_are_called_with_each_call():
+    hook = MagicMock()
+    add_hook(hook)
+    try:
+        registry.record("GET", "/v2/apps", 200, 1, 0.1)
+    finally:
+        remove_hook(hook)
+
+    hook.assert_called_once()
+    assert hook.call_args[0][0]["path"] == "/v2/apps"
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_records_calls(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps)
+        m.get("https://example.com/v2/apps/{g}".format(g=APP_GUID), status_code=404)
+
+        call_api("/v2/apps", config.config, secrets.secrets)
+        with pytest.raises(FailedActivity):
+            call_api("/v2/apps/{g}".format(g=APP_GUID), config.config, secrets.secrets)
+
+    summary = get_metrics()
+    assert summary["calls"] == 2
+    assert summary["errors"] == 1
+    assert [e["path"] for e in summary["endpoints"]] == [
+        "/v2/apps",
+        "/v2/apps/:guid",
+    ]
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_records_nothing_when_disabled(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps)
+        call_api("/v2/apps", dict(config.config, cf_metrics=False), secrets.secrets)
+
+    assert get_metrics()["calls"] == 0
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_metrics_are_attached_to_the_journal(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", json=responses.apps)
+
+        before_activity_control({"name": "list-apps"}, config.config)
+        call_api("/v2/apps", config.config, secrets.secrets)
+        after_activity_control({"name": "list-apps"}, {}, config.config)
+        call_api("/v2/apps", config.config, secrets.secrets)
+
+    journal = {}
+    after_experiment_control({}, journal, config.config, secrets.secrets)
+
+    extension = journal["extensions"][0]
+    assert extension["name"] == "chaoscf"
+    assert extension["metrics"]["calls"] == 2
+    assert extension["metrics"]["activities"]["list-apps"]["calls"] == 1
+    assert get_metrics()["calls"] == 0
@@ -1,12 +1,31 @@
 # -*- coding: utf-8 -*-
 from unittest.mock import MagicMock, patch
 
+import pytest
+from chaoslib.exceptions import FailedActivity
 from fixtures import config, responses, secrets
 
-from chaoscf.probes import list_apps
+from chaoscf.probes import list_apps, sample_app_stats, wait_for_app_state
 
 
-@patch("chaoscf.probes.call_api", autospec=True)
+class Clock:
+    """
+    Stand-in for the `time` module whose `sleep` only moves time forward.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@patch("chaoscf.api.call_api", autospec=True)
 def test_list_apps(call_api):
     call_api.return_value = responses.FakeResponse(
         status_code=200, text=None, json=lambda: responses.apps
@@ -14,3 +33,140 @@ def test_list_apps(call_api):
 
     apps = list_apps(config.config, secrets.secrets)
     assert apps["total_results"] == 1
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_wait_for_app_state_polls_until_instances_run(get_app_by_name, call_api, clock):
+    get_app_by_name.return_value = responses.app
+    call_api.side_effect = [
+        FailedActivity("failed to call: 400 => staging"),
+        responses.FakeResponse(json=lambda: {"0": {"state": "STARTING"}}),
+        responses.FakeResponse(
+            json=lambda: {"0": {"state": "RUNNING"}, "1": {"state": "STARTING"}}
+        ),
+        responses.FakeResponse(
+            json=lambda: {"0": {"state": "RUNNING"}, "1": {"state": "RUNNING"}}
+        ),
+    ]
+
+    result = wait_for_app_state("my-app", config.config, secrets.secrets)
+
+    assert result == {"state": "RUNNING", "instances": 2, "polls": 4, "duration": 2.375}
+    assert clock.sleeps == [0.5, 0.75, 1.125]
+    get_app_by_name.assert_called_once()
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_wait_for_app_state_may_wait_for_some_instances_only(
+    get_app_by_name, call_api, clock
+):
+    get_app_by_name.return_value = responses.app
+    call_api.return_value = responses.FakeResponse(
+        json=lambda: {"0": {"state": "RUNNING"}, "1": {"state": "CRASHED"}}
+    )
+
+    result = wait_for_app_state("my-app", config.config, secrets.secrets, instances=1)
+
+    assert result["instances"] == 1
+    assert result["polls"] == 1
+    assert clock.sleeps == []
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_wait_for_app_state_fails_at_the_deadline(get_app_by_name, call_api, clock):
+    get_app_by_name.return_value = responses.app
+    call_api.return_value = responses.FakeResponse(
+        json=lambda: {"0": {"state": "CRASHED"}}
+    )
+
+    with pytest.raises(FailedActivity) as x:
+        wait_for_app_state(
+            "my-app", config.config, secrets.secrets, timeout=30, max_interval=4
+        )
+
+    assert "did not reach RUNNING within 30s" in str(x.value)
+    assert sum(clock.sleeps) == 30
+    assert max(clock.sleeps) == 4
+
+
+def _stats(cpu_0, cpu_1=None):
+    def instance(cpu):
+        if cpu is None:
+            return {"state": "DOWN"}
+        usage = {"cpu": cpu, "mem": 1024, "disk": 2048}
+        return {"state": "RUNNING", "stats": {"usage": usage}}
+
+    return responses.FakeResponse(
+        json=lambda: {"0": instance(cpu_0), "1": instance(cpu_1)}
+    )
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_sample_app_stats_over_a_window(get_app_by_name, call_api, clock):
+    get_app_by_name.return_value = responses.app
+    call_api.side_effect = [
+        _stats(0.1, 0.2),
+        FailedActivity("failed to call: 503"),
+        _stats(0.3),
+        _stats(0.5, 0.4),
+    ]
+
+    result = sample_app_stats(
+        "my-app", config.config, secrets.secrets, duration=3, interval=1
+    )
+
+    get_app_by_name.assert_called_once()
+    assert clock.sleeps == [1, 1, 1]
+    assert result["polls"] == 4
+    assert result["errors"] == 1
+    assert result["duration"] == 3
+    assert result["instances"]["0"]["series"] == {
+        "t": [0, 2, 3],
+        "cpu": [0.1, 0.3, 0.5],
+        "mem": [1024, 1024, 1024],
+        "disk": [2048, 2048, 2048],
+    }
+    assert result["instances"]["1"]["series"]["cpu"] == [0.2, None, 0.4]
+    assert result["instances"]["1"]["summary"]["cpu"]["count"] == 2
+    assert result["summary"]["cpu"]["max"] == 0.5
+    assert result["summary"]["cpu"]["count"] == 5
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_sample_app_stats_keeps_the_last_samples(get_app_by_name, call_api, clock):
+    get_app_by_name.return_value = responses.app
+    call_api.side_effect = [_stats(i / 10, i / 10) for i in range(6)]
+
+    result = sample_app_stats(
+        "my-app", config.config, secrets.secrets, duration=10, interval=2, max_samples=2
+    )
+
+    assert result["polls"] == 6
+    assert result["instances"]["0"]["series"]["t"] == [8, 10]
+    assert result["instances"]["0"]["series"]["cpu"] == [0.4, 0.5]
+
+
+@patch("chaoscf.probes.time", new_callable=Clock)
+@patch("chaoscf.probes.call_api", autospec=True)
+@patch("chaoscf.probes.get_app_by_name", autospec=True)
+def test_sample_app_stats_fails_when_no_poll_succeeded(
+    get_app_by_name, call_api, clock
+):
+    get_app_by_name.return_value = responses.app
+    call_api.side_effect = FailedActivity("failed to call: 400 => stopped")
+
+    with pytest.raises(FailedActivity):
+        sample_app_stats(
+            "my-app", config.config, secrets.secrets, duration=2, interval=1
+        )
+    assert call_api.call_count == 3
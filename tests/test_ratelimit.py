@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from chaoslib.exceptions import FailedActivity
+from fixtures import config, responses, secrets
+
+from chaoscf.api import call_api
+from chaoscf.ratelimit import RateLimiter, get_rate_limiter
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_bucket_lets_bursts_through_then_paces_calls(time):
+    time.monotonic.return_value = 100.0
+    limiter = RateLimiter(rate=2, burst=2)
+
+    limiter.acquire()
+    limiter.acquire()
+    time.sleep.assert_not_called()
+
+    limiter.acquire()
+    time.sleep.assert_called_once_with(0.5)
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_bucket_refills_over_time(time):
+    time.monotonic.return_value = 100.0
+    limiter = RateLimiter(rate=2, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+
+    time.monotonic.return_value = 101.0
+    limiter.acquire()
+    limiter.acquire()
+    time.sleep.assert_not_called()
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_exhausted_quota_waits_for_reset(time):
+    time.monotonic.return_value = 100.0
+    time.time.return_value = 5000.0
+    limiter = RateLimiter()
+
+    limiter.update(200, {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "5010"})
+    limiter.acquire()
+    time.sleep.assert_not_called()
+
+    limiter.acquire()
+    time.sleep.assert_called_once_with(10.0)
+
+    time.sleep.reset_mock()
+    time.monotonic.return_value = 110.0
+    limiter.acquire()
+    time.sleep.assert_not_called()
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_wait_longer_than_max_wait_fails(time):
+    time.monotonic.return_value = 100.0
+    time.time.return_value = 5000.0
+    limiter = RateLimiter(max_wait=60)
+
+    limiter.update(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "8600"})
+    with pytest.raises(FailedActivity) as x:
+        limiter.acquire()
+    assert "cf_rate_limit_max_wait" in str(x.value)
+    time.sleep.assert_not_called()
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_bucket_gives_the_slot_back_when_the_wait_is_too_long(time):
+    time.monotonic.return_value = 100.0
+    limiter = RateLimiter(rate=1, burst=1, max_wait=0.5)
+    limiter.acquire()
+
+    with pytest.raises(FailedActivity):
+        limiter.acquire()
+
+    time.monotonic.return_value = 101.0
+    limiter.acquire()
+    time.sleep.assert_not_called()
+
+
+@patch("chaoscf.ratelimit.time", autospec=True)
+def test_throttled_call_holds_calls_for_retry_after(time):
+    time.monotonic.return_value = 100.0
+    time.time.return_value = 5000.0
+    limiter = RateLimiter()
+
+    limiter.update(429, {"Retry-After": "3"})
+    limiter.acquire()
+    time.sleep.assert_called_once_with(3.0)
+
+
+def test_limiter_is_shared_per_api_url():
+    limiter = get_rate_limiter(dict(config.config, cf_rate_limit=5))
+    assert limiter.rate == 5.0
+    assert get_rate_limiter(config.config) is limiter
+    assert get_rate_limiter({"cf_api_url": "https://other.example.com"}) is not limiter
+    assert limiter.max_wait == 60.0
+
+
+@patch("chaoscf.ratelimit.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_sends_throttled_call_again(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [
+                {"status_code": 429, "headers": {"Retry-After": "2"}},
+                {"status_code": 200, "json": responses.apps},
+            ],
+        )
+
+        r = call_api("/v2/apps", config.config, secrets.secrets)
+        assert r.status_code == 200
+        assert m.call_count == 2
+
+    assert sleep.call_args_list[0][0][0] == 2.0
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import pytest
+import requests
+import requests_mock
+from chaoslib.exceptions import FailedActivity
+from fixtures import config, responses, secrets
+
+from chaoscf import get_tokens
+from chaoscf.api import call_api
+from chaoscf.retry import RetryPolicy, get_retry_policy
+
+
+def test_policy_is_read_from_configuration():
+    policy = get_retry_policy(
+        {
+            "cf_retry_attempts": 5,
+            "cf_retry_backoff_base": 0.1,
+            "cf_retry_backoff_max": 2,
+        }
+    )
+    assert policy.attempts == 5
+    assert policy.backoff_base == 0.1
+    assert policy.backoff_max == 2.0
+
+
+def test_only_idempotent_methods_are_retried():
+    policy = RetryPolicy(attempts=2)
+    assert policy.can_retry("GET", 0, 503)
+    assert policy.can_retry("PUT", 1, 502)
+    assert policy.can_retry("DELETE", 0)
+    assert not policy.can_retry("POST", 0, 503)
+    assert not policy.can_retry("POST", 0)
+    assert policy.can_retry("POST", 0, 429)
+    assert not policy.can_retry("GET", 0, 500)
+    assert not policy.can_retry("GET", 2, 503)
+    assert policy.can_retry("POST", 0, 503, idempotent=True)
+    assert not policy.can_retry("PUT", 0, 503, idempotent=False)
+
+
+def test_retry_after_longer_than_backoff_max_is_not_waited_for():
+    policy = RetryPolicy(backoff_max=30)
+    assert policy.can_retry("GET", 0, 503, {"Retry-After": "30"})
+    assert not policy.can_retry("GET", 0, 503, {"Retry-After": "31"})
+    assert not policy.can_retry("POST", 0, 429, {"Retry-After": "3600"})
+
+
+@patch("chaoscf.retry.random.uniform", autospec=True)
+def test_delay_is_capped_full_jitter(uniform):
+    uniform.side_effect = lambda low, high: high
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=3)
+
+    assert [policy.delay(a) for a in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    assert all(c[0][0] == 0 for c in uniform.call_args_list)
+    assert policy.delay(0, retry_after=2) == 2
+    assert policy.delay(0, retry_after=10) == 3
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_retries_transient_failures(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [
+                {"status_code": 502},
+                {"status_code": 503, "headers": {"Retry-After": "7"}},
+                {"status_code": 200, "json": responses.apps},
+            ],
+        )
+
+        r = call_api("/v2/apps", config.config, secrets.secrets)
+        assert r.status_code == 200
+        assert m.call_count == 3
+
+    assert sleep.call_count == 2
+    assert sleep.call_args_list[0][0][0] <= 0.5
+    assert sleep.call_args_list[1][0][0] == 7.0
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_gives_up_after_configured_attempts(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", status_code=504)
+
+        with pytest.raises(FailedActivity):
+            call_api(
+                "/v2/apps", dict(config.config, cf_retry_attempts=2), secrets.secrets
+            )
+        assert m.call_count == 3
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_gives_up_when_retry_after_is_too_long(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            status_code=503,
+            headers={"Retry-After": "120"},
+        )
+
+        with pytest.raises(FailedActivity):
+            call_api("/v2/apps", config.config, secrets.secrets)
+        assert m.call_count == 1
+    sleep.assert_not_called()
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_does_not_retry_post(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.post("https://example.com/v2/apps", status_code=503)
+
+        with pytest.raises(FailedActivity):
+            call_api("/v2/apps", config.config, secrets.secrets, method="POST")
+        assert m.call_count == 1
+    sleep.assert_not_called()
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_retries_connection_errors(auth, sleep):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/apps",
+            [
+                {"exc": requests.exceptions.ConnectionError},
+                {"status_code": 200, "json": responses.apps},
+            ],
+        )
+
+        r = call_api("/v2/apps", config.config, secrets.secrets)
+        assert r.status_code == 200
+        assert m.call_count == 2
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+def test_get_tokens_retries_transient_failures(sleep):
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v2/info",
+            [{"status_code": 503}, {"json": responses.info_response}],
+        )
+        m.post(
+            "https://uaa.example.com/oauth/token",
+            [
+                {"status_code": 502},
+                {"json": responses.auth_response},
+            ],
+        )
+
+        tokens = get_tokens(
+            "https://example.com", "someone", "secret", configuration=config.config
+        )
+
+        assert tokens["access_token"] == "my-token"
+        assert m.call_count == 4
+    assert sleep.call_count == 2
+
+
+@patch("chaoscf.retry.time.sleep", autospec=True)
+def test_get_tokens_gives_up_after_configured_attempts(sleep):
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/info", json=responses.info_response)
+        m.post("https://uaa.example.com/oauth/token", status_code=503)
+
+        with pytest.raises(FailedActivity) as x:
+            get_tokens(
+                "https://example.com",
+                "someone",
+                "secret",
+                configuration=dict(config.config, cf_retry_attempts=1),
+            )
+        assert "failed to auth against Cloud Foundry" in str(x.value)
+        assert m.call_count == 3
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import requests_mock
+from fixtures import config, responses, secrets
+
+from chaoscf.api import call_api
+from chaoscf.control import after_experiment_control
+from chaoscf.session import DEFAULT_POOL_SIZE, close_sessions, get_session
+
+
+def test_session_is_shared_per_api_url():
+    session = get_session(config.config)
+    assert get_session(dict(config.config)) is session
+    assert get_session({"cf_api_url": "https://other.example.com"}) is not session
+
+
+def test_session_is_shared_per_ssl_verification():
+    session = get_session(config.config)
+    other = get_session(dict(config.config, cf_verify_ssl=False))
+    assert other is not session
+    assert other.verify is False
+
+
+def test_session_pool_size_can_be_configured():
+    session = get_session(config.config)
+    adapter = session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == DEFAULT_POOL_SIZE
+    close_sessions()
+
+    session = get_session(dict(config.config, cf_http_pool_size=42))
+    adapter = session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 42
+
+
+def test_close_sessions_drops_them():
+    session = get_session(config.config)
+    close_sessions()
+    assert get_session(config.config) is not session
+
+
+def test_after_experiment_control_closes_sessions():
+    session = get_session(config.config)
+    after_experiment_control({}, {}, config.config, secrets.secrets)
+    assert get_session(config.config) is not session
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_call_api_goes_through_the_shared_session(auth):
+    auth.return_value = responses.auth_response
+    session = get_session(config.config)
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v2/apps", status_code=200, json=responses.apps)
+        with patch.object(session, "request", wraps=session.request) as request:
+            call_api("/v2/apps", config.config, secrets.secrets)
+            call_api("/v2/apps", config.config, secrets.secrets)
+        assert request.call_count == 2
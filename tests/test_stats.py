@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from chaoscf.stats import RingBuffer, percentile, summarize
+
+
+def test_percentile_is_the_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_summarize():
+    summary = summarize([4, 1, 3, 2])
+
+    assert summary == {
+        "count": 4,
+        "min": 1,
+        "mean": 2.5,
+        "p50": 2,
+        "p95": 4,
+        "p99": 4,
+        "max": 4,
+    }
+
+
+def test_summarize_nothing():
+    summary = summarize([], percentiles=[90])
+
+    assert summary == {"count": 0, "min": None, "mean": None, "p90": None, "max": None}
+
+
+def test_ring_buffer_keeps_the_last_values():
+    buffer = RingBuffer(3)
+    assert len(buffer) == 0
+    assert buffer.values() == []
+
+    buffer.append(1)
+    buffer.append(2)
+    assert buffer.values() == [1.0, 2.0]
+
+    for value in range(3, 8):
+        buffer.append(value)
+    assert len(buffer) == 3
+    assert buffer.values() == [5.0, 6.0, 7.0]
+
+
+def test_ring_buffer_holds_a_value_at_least():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
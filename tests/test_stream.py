@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from chaoscf.stream import iter_array_items
+
+
+def _chunks(document, size):
+    content = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    for start in range(0, len(content), size):
+        end = start + size
+        yield content[start:end]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 1 << 20])
+def test_items_are_read_from_any_chunking(size):
+    page = {
+        "total_results": 1234,
+        "next_url": None,
+        "resources": [
+            {"name": "äpp-{i}".format(i=i), "env": {"A": i}} for i in range(20)
+        ],
+        "after": [1.5, True, None],
+    }
+
+    rest = {}
+    items = list(iter_array_items(_chunks(page, size), rest=rest))
+
+    assert items == page["resources"]
+    assert rest == {"total_results": 1234, "next_url": None, "after": [1.5, True, None]}
+
+
+def test_numbers_are_read_whatever_chunk_boundaries_cut_them():
+    # written out as json.dumps would not keep the exponents
+    content = b'{"resources": [1.5, 23.25, -7e3, 0.125E-2], "total_results": 4e1}'
+    page = json.loads(content.decode("utf-8"))
+
+    for first in range(1, len(content)):
+        for second in range(first, len(content)):
+            chunks = [content[:first], content[first:second], content[second:]]
+            rest = {}
+            items = list(iter_array_items(chunks, rest=rest))
+            assert items == page["resources"], chunks
+            assert rest == {"total_results": page["total_results"]}, chunks
+
+
+def test_items_are_yielded_before_the_document_is_complete():
+    def chunks():
+        yield b'{"resources": [{"n": 1}, '
+        yield b'{"n": 2}'
+        raise AssertionError("read too far")
+
+    items = iter_array_items(chunks())
+
+    assert next(items) == {"n": 1}
+
+
+def test_missing_or_empty_array_yields_nothing():
+    assert list(iter_array_items([b"{}"])) == []
+    assert list(iter_array_items([b'{"resources": [ ]}'])) == []
+
+    rest = {}
+    assert list(iter_array_items([b'{"pagination": {"next": null}}'], rest=rest)) == []
+    assert rest == {"pagination": {"next": None}}
+
+
+@pytest.mark.parametrize(
+    "content", [b"[1, 2]", b'{"resources": [1, 2', b'{"resources": [1 2]}', b""]
+)
+def test_invalid_documents_are_rejected(content):
+    with pytest.raises(ValueError):
+        list(iter_array_items([content]))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from chaoslib.exceptions import FailedActivity
+from fixtures import config, responses, secrets
+
+import chaoscf.api
+from chaoscf.actions import stop_all_apps, stop_app, terminate_app_instance
+from chaoscf.v3 import get_app_by_name, is_enabled, iter_apps
+
+configuration = dict(config.config, cf_api_version="v3")
+
+org = {"guid": "org-guid", "name": "my-org"}
+space = {"guid": "space-guid", "name": "my-space"}
+app = {"guid": "app-guid", "name": "my-app", "state": "STARTED"}
+
+
+def page(resources, next_href=None):
+    return {
+        "pagination": {
+            "total_results": len(resources),
+            "next": {"href": next_href} if next_href else None,
+        },
+        "resources": resources,
+    }
+
+
+def test_v3_is_enabled_by_configuration():
+    assert is_enabled(configuration)
+    assert not is_enabled(config.config)
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_iter_apps_filters_many_names_at_once(auth):
+    auth.return_value = responses.auth_response
+    other = dict(app, guid="other-guid", name="other-app")
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v3/organizations?names=my-org",
+            json=page([org]),
+            complete_qs=True,
+        )
+        m.get(
+            "https://example.com/v3/apps?names=my-app,other-app"
+            "&organization_guids=org-guid&per_page=100",
+            json=page([app, other]),
+            complete_qs=True,
+        )
+
+        apps = list(
+            iter_apps(
+                configuration,
+                secrets.secrets,
+                names=["my-app", "other-app"],
+                org_name="my-org",
+            )
+        )
+
+    assert [a["guid"] for a in apps] == ["app-guid", "other-guid"]
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_iter_apps_follows_absolute_next_links(auth):
+    auth.return_value = responses.auth_response
+    next_href = "https://example.com/v3/apps?page=2&per_page=100"
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v3/apps?per_page=100",
+            json=page([app], next_href),
+            complete_qs=True,
+        )
+        m.get(next_href, json=page([app]), complete_qs=True)
+
+        apps = list(iter_apps(configuration, secrets.secrets))
+
+    assert len(apps) == 2
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_stop_app(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v3/apps", json=page([app]))
+        m.post("https://example.com/v3/apps/app-guid/actions/stop", json=app)
+
+        stop_app("my-app", configuration, secrets.secrets)
+
+        assert m.request_history[-1].method == "POST"
+        assert m.call_count == 2
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_terminate_app_instance(auth):
+    auth.return_value = responses.auth_response
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v3/apps", json=page([app]))
+        m.delete(
+            "https://example.com/v3/processes/app-guid/instances/1", status_code=204
+        )
+
+        terminate_app_instance("my-app", 1, configuration, secrets.secrets)
+
+        assert m.request_history[-1].method == "DELETE"
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_stop_all_apps_lists_once_then_stops_each_app(auth):
+    auth.return_value = responses.auth_response
+    apps = [dict(app, guid="guid-{i}".format(i=i)) for i in range(20)]
+
+    with requests_mock.mock() as m:
+        m.get("https://example.com/v3/organizations", json=page([org]))
+        m.get("https://example.com/v3/apps", json=page(apps))
+        m.post(requests_mock.ANY, json=app)
+
+        results = stop_all_apps("my-org", configuration, secrets.secrets)
+
+        assert m.call_count == 2 + len(apps)
+
+    assert all(r["status"] == "succeeded" for r in results)
+
+
+@patch("chaoscf.api.auth", autospec=True)
+def test_get_app_by_name_includes_space_and_org_in_one_call(auth):
+    auth.return_value = responses.auth_response
+    v3_app = dict(app, relationships={"space": {"data": {"guid": "space-guid"}}})
+    v3_space = dict(
+        space, relationships={"organization": {"data": {"guid": "org-guid"}}}
+    )
+    body = dict(page([v3_app]), included={"spaces": [v3_space], "organizations": [org]})
+
+    with requests_mock.mock() as m:
+        m.get(
+            "https://example.com/v3/apps?names=my-app&include=space.organization"
+            "&per_page=100",
+            json=body,
+            complete_qs=True,
+        )
+
+        found = get_app_by_name(
+            "my-app",
+            configuration,
+            secrets.secrets,
+            org_name="my-org",
+            space_name="my-space",
+        )
+        assert found["guid"] == "app-guid"
+        assert m.call_count == 1
+
+        chaoscf.api._resolved.clear()
+        with pytest.raises(FailedActivity):
+            get_app_by_name(
+                "my-app",
+                configuration,
+                secrets.secrets,
+                org_name="other-org",
+                space_name="my-space",
+            )